@@ -0,0 +1,204 @@
+import ipaddress
+from typing import Dict, List, Tuple, Optional, Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy потрібен лише для колоночної аналітики; решта програми працює без нього
+    np = None
+
+# Колонки SecurityEvents, які можна завантажити в масиви
+ANALYTICS_COLUMNS = ('timestamp', 'source_id', 'event_type_id', 'ip_address', 'username')
+
+# Одиниці часу в мікросекундах (час у масивах - int64 мікросекунд від EPOCH, як у компактному форматі)
+MICROSECONDS_PER_MINUTE = 60 * 1000000
+MICROSECONDS_PER_HOUR = 60 * MICROSECONDS_PER_MINUTE
+MICROSECONDS_PER_DAY = 24 * MICROSECONDS_PER_HOUR
+
+def require_numpy():
+    """Перевірити, що NumPy встановлено (інакше - ImportError з підказкою)"""
+    if np is None:
+        raise ImportError("Колоночна аналітика потребує NumPy: pip install numpy")
+
+def _small_uint_dtype(max_value: int):
+    """Найменший беззнаковий тип, у який вміщається max_value"""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def encode_categories(values: Sequence[Any]) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Значення -> (коди int32, масив категорій у порядку кодів); None отримує код -1"""
+    index = {None: -1}
+    codes = np.fromiter((index.setdefault(value, len(index) - 1) for value in values),
+                        dtype=np.int32, count=len(values))
+    del index[None]
+    categories = np.empty(len(index), dtype=object)
+    categories[:] = list(index)
+    return codes, categories
+
+def _ip_text_and_int(value: Any) -> Tuple[str, int]:
+    """Збережене значення IP (текст або INTEGER/BLOB компактного формату) -> (текст, IPv4 як ціле або 0)"""
+    if isinstance(value, int):
+        return str(ipaddress.IPv4Address(value)), value
+    if isinstance(value, bytes):
+        return str(ipaddress.IPv6Address(value)), 0
+    try:
+        return value, int(ipaddress.IPv4Address(value))
+    except ValueError:
+        return value, 0
+
+class EventColumns:
+    """Колонки подій як масиви NumPy (позиція в масивах - одна подія).
+
+    Масиви (columns): timestamp - int64 мікросекунд від EPOCH; source_id та event_type_id -
+    найменший беззнаковий тип, що вміщає значення; ip - IPv4 як uint32 (0 - адреси немає або
+    це IPv6); ip_code та username_code - коди категорій int32 (-1 - значення немає).
+    Таблиці категорій (categories): ip_address та username - значення за кодом.
+    """
+    
+    def __init__(self, columns: Dict[str, 'np.ndarray'], categories: Dict[str, 'np.ndarray']):
+        self.columns = columns
+        self.categories = categories
+    
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+    
+    def __getitem__(self, name: str) -> 'np.ndarray':
+        return self.columns[name]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+    
+    def filter(self, mask: 'np.ndarray') -> 'EventColumns':
+        """Підмножина подій за булевою маскою або індексами (таблиці категорій спільні)"""
+        return EventColumns({name: column[mask] for name, column in self.columns.items()}, self.categories)
+    
+    def decode(self, name: str, codes: 'np.ndarray') -> List[Any]:
+        """Коди категорій (ip_code, username_code) -> значення"""
+        table = self.categories['ip_address' if name == 'ip_code' else 'username']
+        return [table[code] if code >= 0 else None for code in codes.tolist()]
+    
+    @classmethod
+    def from_rows(cls, names: Sequence[str], rows: List[tuple]) -> 'EventColumns':
+        """Побудувати масиви з рядків SELECT (порядок колонок - names)"""
+        require_numpy()
+        values = list(zip(*rows)) if rows else [() for _ in names]
+        columns, categories = {}, {}
+        
+        for name, column in zip(names, values):
+            if name == 'timestamp':
+                if column and isinstance(column[0], int):
+                    # Компактний формат уже зберігає мікросекунди від EPOCH
+                    columns[name] = np.fromiter(column, dtype=np.int64, count=len(column))
+                else:
+                    columns[name] = np.array(column, dtype='datetime64[us]').astype(np.int64)
+            elif name in ('source_id', 'event_type_id'):
+                ids = np.fromiter(column, dtype=np.int64, count=len(column))
+                columns[name] = ids.astype(_small_uint_dtype(int(ids.max()) if len(ids) else 0))
+            elif name == 'ip_address':
+                codes, stored = encode_categories(column)
+                decoded = [_ip_text_and_int(value) for value in stored]
+                texts = np.empty(len(decoded), dtype=object)
+                texts[:] = [text for text, _ in decoded]
+                # Додатковий 0 у кінці: код -1 (немає адреси) індексує саме його
+                ipv4 = np.array([number for _, number in decoded] + [0], dtype=np.uint32)
+                columns['ip'] = ipv4[codes]
+                columns['ip_code'] = codes
+                categories['ip_address'] = texts
+            elif name == 'username':
+                columns['username_code'], categories['username'] = encode_categories(column)
+            else:
+                raise ValueError(f"Невідома колонка: {name}")
+        return cls(columns, categories)
+
+def group_count(*keys: 'np.ndarray', weights: Optional['np.ndarray'] = None
+                ) -> Tuple[Tuple['np.ndarray', ...], 'np.ndarray']:
+    """Групування за однією або кількома колонками: (унікальні значення кожної колонки, кількість подій
+    у групі або сума weights)"""
+    require_numpy()
+    if len(keys) == 1:
+        unique, inverse = np.unique(keys[0], return_inverse=True)
+        return (unique,), np.bincount(inverse, weights=weights, minlength=len(unique))
+    
+    # Кілька колонок: коди кожної колонки об'єднуються в один int64-ключ
+    uniques, inverses = zip(*(np.unique(key, return_inverse=True) for key in keys))
+    combined = np.ravel_multi_index(inverses, tuple(len(unique) for unique in uniques))
+    groups, inverse = np.unique(combined, return_inverse=True)
+    positions = np.unravel_index(groups, tuple(len(unique) for unique in uniques))
+    counts = np.bincount(inverse, weights=weights, minlength=len(groups))
+    return tuple(unique[position] for unique, position in zip(uniques, positions)), counts
+
+def group_rate(keys: 'np.ndarray', mask: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """Частка подій з mask у кожній групі (напр. частка невдалих входів кожної IP): (ключі, частка, всього)"""
+    require_numpy()
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(unique))
+    hits = np.bincount(inverse, weights=mask.astype(np.float64), minlength=len(unique))
+    return unique, hits / totals, totals
+
+def time_histogram(timestamps: 'np.ndarray', bucket: int = MICROSECONDS_PER_HOUR,
+                   start: Optional[int] = None, end: Optional[int] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Кількість подій у кошиках по bucket мікросекунд на [start, end): (початки кошиків, кількість).
+
+    Без start кошики вирівнюються по bucket від найранішої події (для годин і хвилин -
+    по межах годин і хвилин).
+    """
+    require_numpy()
+    if start is None:
+        start = int(timestamps.min()) // bucket * bucket if len(timestamps) else 0
+    if end is None:
+        end = int(timestamps.max()) + 1 if len(timestamps) else start
+    selected = timestamps[(timestamps >= start) & (timestamps < end)]
+    buckets = -(-(end - start) // bucket)
+    counts = np.bincount((selected - start) // bucket, minlength=buckets)
+    return start + np.arange(buckets, dtype=np.int64) * bucket, counts
+
+def sliding_window_counts(timestamps: 'np.ndarray', window: int,
+                          keys: Optional['np.ndarray'] = None) -> 'np.ndarray':
+    """Для кожної події - кількість подій того ж ключа за вікно (t - window, t] (включно з нею).
+
+    Час замінюється рангом серед унікальних моментів, тож ключ групи і ранг часу
+    вміщаються в один int64 без переповнення; обидві межі вікна знаходяться
+    бінарним пошуком у відсортованому масиві - O(n log n) без циклів Python.
+    """
+    require_numpy()
+    moments = np.unique(timestamps)
+    rank = np.searchsorted(moments, timestamps)
+    lower_rank = np.searchsorted(moments, timestamps - window, side='right')
+    if keys is None:
+        offset = 0
+    else:
+        _, group = np.unique(keys, return_inverse=True)
+        offset = group.astype(np.int64) * len(moments)
+    composite = offset + rank
+    ordered = np.sort(composite)
+    return (np.searchsorted(ordered, composite, side='right')
+            - np.searchsorted(ordered, offset + lower_rank, side='left'))
+
+def max_window_counts(timestamps: 'np.ndarray', window: int,
+                      keys: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    """Найбільша кількість подій ключа в будь-якому вікні window мікросекунд: (ключі, максимум)"""
+    require_numpy()
+    counts = sliding_window_counts(timestamps, window, keys)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    maximums = np.zeros(len(unique), dtype=np.int64)
+    np.maximum.at(maximums, inverse, counts)
+    return unique, maximums
+
+def inter_arrival_times(timestamps: 'np.ndarray', keys: Optional['np.ndarray'] = None) -> 'np.ndarray':
+    """Для кожної події - час від попередньої події того ж ключа (мікросекунди), -1 для першої"""
+    require_numpy()
+    if keys is None:
+        order = np.argsort(timestamps, kind='stable')
+    else:
+        order = np.lexsort((timestamps, keys))
+    ordered = timestamps[order]
+    deltas = np.full(len(ordered), -1, dtype=np.int64)
+    deltas[1:] = np.diff(ordered)
+    if keys is not None and len(ordered) > 1:
+        ordered_keys = keys[order]
+        deltas[1:][ordered_keys[1:] != ordered_keys[:-1]] = -1
+    result = np.empty_like(deltas)
+    result[order] = deltas
+    return result
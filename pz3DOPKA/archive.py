@@ -0,0 +1,280 @@
+import os
+import re
+import sys
+import json
+import mmap
+import zlib
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, compress
+from typing import Dict, List, Tuple, Optional, Any, Callable, Iterable, Iterator, Sequence
+
+# Кількість подій в одному файлі архіву
+ARCHIVE_CHUNK_ROWS = 65536
+
+# Рівень стиснення zlib для колонок архіву
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Розширення файлів архіву
+ARCHIVE_SUFFIX = '.evc'
+
+# Заголовок файлу: сигнатура, довжина JSON-опису колонок (uint32, little-endian), JSON
+ARCHIVE_MAGIC = b'SECEVC01'
+_HEADER_LENGTH = struct.Struct('<I')
+
+# Кодування колонок: цілі числа, цілі числа у вигляді різниць із попереднім (для
+# відсортованого часу різниці малі й добре стискаються) та текст (довжини + байти UTF-8)
+CODECS = ('int', 'int-delta', 'text')
+
+def _encode_ints(values: Sequence[int]) -> bytes:
+    """Цілі числа -> байти int64"""
+    return array('q', values).tobytes()
+
+def _decode_ints(data: bytes, swap: bool) -> array:
+    """Байти int64 -> array('q')"""
+    values = array('q')
+    values.frombytes(data)
+    if swap:
+        values.byteswap()
+    return values
+
+def _encode_text(values: Sequence[Any]) -> bytes:
+    """Рядки (None дозволено) -> довжини int32, кількість і номери значень None (int32), байти UTF-8 підряд"""
+    encoded = [b'' if value is None else value.encode('utf-8') for value in values]
+    nulls = array('i', (index for index, value in enumerate(values) if value is None))
+    return (array('i', map(len, encoded)).tobytes() + array('i', [len(nulls)]).tobytes() + nulls.tobytes()
+            + b''.join(encoded))
+
+def _text_layout(data: bytes, rows: int, swap: bool) -> Tuple[set, List[int]]:
+    """Номери значень None та межі значень текстової колонки: значення i - data[ends[i]:ends[i + 1]]"""
+    header = array('i')
+    header.frombytes(data[:(rows + 1) * header.itemsize])
+    if swap:
+        header.byteswap()
+    null_count = header[rows]
+    nulls = array('i')
+    nulls.frombytes(data[(rows + 1) * nulls.itemsize:(rows + 1 + null_count) * nulls.itemsize])
+    if swap:
+        nulls.byteswap()
+    del header[rows]
+    return set(nulls), list(accumulate(header, initial=(rows + 1 + null_count) * nulls.itemsize))
+
+def _decode_text(data: bytes, rows: int, swap: bool, indices: Optional[Sequence[int]] = None) -> List[Any]:
+    """Зворотне перетворення до _encode_text (лише для рядків indices, якщо задано)"""
+    nulls, ends = _text_layout(data, rows, swap)
+    if indices is None:
+        indices = range(rows)
+    return [None if index in nulls else data[ends[index]:ends[index + 1]].decode('utf-8') for index in indices]
+
+def write_chunk(path: str, columns: Dict[str, Tuple[str, Sequence[Any]]]) -> int:
+    """Записати колонки (назва -> (кодування, значення)) у файл архіву; повертає розмір файлу.
+
+    Файл спершу пишеться у тимчасовий, синхронізується на диск і лише потім
+    перейменовується, тож частково записаних файлів з робочою назвою не буває.
+    """
+    rows = None
+    blocks, descriptions = [], {}
+    offset = 0
+    for name, (codec, values) in columns.items():
+        if codec not in CODECS:
+            raise ValueError(f"Невідоме кодування колонки: {codec}")
+        if rows is None:
+            rows = len(values)
+        elif len(values) != rows:
+            raise ValueError("Усі колонки мають містити однакову кількість значень")
+        
+        if codec == 'text':
+            raw = _encode_text(values)
+        elif codec == 'int-delta':
+            deltas = [current - previous for previous, current in zip([0] + list(values[:-1]), values)]
+            raw = _encode_ints(deltas)
+        else:
+            raw = _encode_ints(values)
+        block = zlib.compress(raw, ARCHIVE_COMPRESSION_LEVEL)
+        descriptions[name] = {'codec': codec, 'offset': offset, 'length': len(block)}
+        if codec == 'int-delta':
+            # Відсортовану колонку (час) можна фільтрувати за діапазоном бінарним пошуком
+            descriptions[name]['sorted'] = all(delta >= 0 for delta in deltas[1:])
+        blocks.append(block)
+        offset += len(block)
+    
+    header = json.dumps({'rows': rows or 0, 'byteorder': sys.byteorder, 'columns': descriptions}).encode('utf-8')
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(ARCHIVE_MAGIC)
+        file.write(_HEADER_LENGTH.pack(len(header)))
+        file.write(header)
+        for block in blocks:
+            file.write(block)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+    return os.path.getsize(path)
+
+class ChunkFile:
+    """Файл архіву, відображений у пам'ять (mmap): читаються й розпаковуються лише потрібні колонки"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Порожній файл не відображається - це не файл архіву
+            self._file.close()
+            raise ValueError(f"Пошкоджений файл архіву: {path}")
+        
+        if self._map[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f"Пошкоджений файл архіву: {path}")
+        header_start = len(ARCHIVE_MAGIC) + _HEADER_LENGTH.size
+        header_length, = _HEADER_LENGTH.unpack_from(self._map, len(ARCHIVE_MAGIC))
+        header = json.loads(self._map[header_start:header_start + header_length])
+        self.rows: int = header['rows']
+        self.columns: Dict[str, Dict[str, Any]] = header['columns']
+        self._swap = header['byteorder'] != sys.byteorder
+        self._data_start = header_start + header_length
+        self._unpacked: Dict[str, bytes] = {}
+    
+    def __enter__(self) -> 'ChunkFile':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Звільнити відображення та файл"""
+        self._map.close()
+        self._file.close()
+    
+    def _raw(self, name: str) -> bytes:
+        """Розпаковані байти колонки (читається лише її ділянка файлу; розпаковується один раз)"""
+        raw = self._unpacked.get(name)
+        if raw is None:
+            description = self.columns[name]
+            start = self._data_start + description['offset']
+            with memoryview(self._map) as view:
+                raw = self._unpacked[name] = zlib.decompress(view[start:start + description['length']])
+        return raw
+    
+    def read_column(self, name: str, indices: Optional[Sequence[int]] = None) -> Sequence[Any]:
+        """Значення колонки (лише для рядків indices, якщо задано)"""
+        codec = self.columns[name]['codec']
+        raw = self._raw(name)
+        if codec == 'text':
+            return _decode_text(raw, self.rows, self._swap, indices)
+        values = _decode_ints(raw, self._swap)
+        if codec == 'int-delta':
+            values = list(accumulate(values))
+        return values if indices is None else [values[index] for index in indices]
+    
+    def sorted_range(self, name: str, low: Optional[int], high: Optional[int]) -> range:
+        """Рядки відсортованої цілочисельної колонки зі значеннями в [low, high) - бінарним пошуком"""
+        values = self.read_column(name)
+        start = bisect_left(values, low) if low is not None else 0
+        end = bisect_left(values, high) if high is not None else len(values)
+        return range(start, end)
+    
+    def rows_containing(self, name: str, needle: bytes) -> List[int]:
+        """Рядки текстової колонки, що містять needle (байти UTF-8 у нижньому регістрі ASCII, як LIKE у SQLite).
+
+        Підрядок шукається одним проходом по всьому розпакованому блоку колонки, а позиції
+        збігів переводяться в номери рядків бінарним пошуком, тож значення не декодуються.
+        """
+        raw = self._raw(name)
+        _, ends = _text_layout(raw, self.rows, self._swap)
+        data = raw.lower()
+        matches = []
+        position = data.find(needle, ends[0])
+        while position != -1:
+            index = bisect_right(ends, position) - 1
+            if position + len(needle) <= ends[index + 1]:
+                matches.append(index)
+                # Інші збіги в тому ж значенні вже не потрібні
+                position = data.find(needle, ends[index + 1])
+            else:
+                # Збіг перетинає межу двох значень
+                position = data.find(needle, position + 1)
+        return matches
+    
+    def rows_like(self, name: str, pattern: str) -> List[int]:
+        """Рядки текстової колонки, що відповідають шаблону LIKE (% - будь-який рядок, _ - один символ,
+        без урахування регістру ASCII, як у SQLite).
+
+        Шаблон '%слово%' перевіряється лише пошуком підрядка. Для інших шаблонів підрядком
+        відбираються кандидати за найдовшою частиною без символів підстановки, і лише вони
+        декодуються та перевіряються регулярним виразом.
+        """
+        inner = pattern[1:-1]
+        if len(pattern) > 2 and pattern[0] == '%' and pattern[-1] == '%' and not _LIKE_WILDCARDS.search(inner):
+            return self.rows_containing(name, inner.encode('utf-8').lower())
+        
+        needle = max(_LIKE_WILDCARDS.split(pattern), key=len).encode('utf-8').lower()
+        candidates = self.rows_containing(name, needle) if needle else range(self.rows)
+        matcher = _like_regex(pattern).fullmatch
+        return [index for index, value in zip(candidates, self.read_column(name, candidates))
+                if value is not None and matcher(value)]
+
+_LIKE_WILDCARDS = re.compile('[%_]')
+
+def _like_regex(pattern: str) -> re.Pattern:
+    """Шаблон LIKE -> регулярний вираз (re.ASCII: без урахування регістру лише для латиниці, як у SQLite)"""
+    return re.compile(''.join('.*' if char == '%' else '.' if char == '_' else re.escape(char) for char in pattern),
+                      re.DOTALL | re.IGNORECASE | re.ASCII)
+
+def _predicate(operator: str, operand: Any) -> Callable[[Any], bool]:
+    """Перевірка значення для фільтра 'range' або 'in' (None не проходить жоден)"""
+    if operator == 'range':
+        low, high = operand
+        return lambda value: value is not None and (low is None or value >= low) and (high is None or value < high)
+    if operator == 'in':
+        # Метод множини викликається без інтерпретатора Python на кожне значення
+        return frozenset(value for value in operand if value is not None).__contains__
+    raise ValueError(f"Невідомий оператор фільтра: {operator}")
+
+def _select_rows(chunk: ChunkFile, filters: Sequence[Tuple[str, str, Any]]) -> Sequence[int]:
+    """Номери рядків файлу, що проходять усі фільтри (читаються лише колонки фільтрів, по одній,
+    поки лишаються кандидати)"""
+    selected = range(chunk.rows)
+    for column, operator, operand in filters:
+        if operator == 'like':
+            matches = chunk.rows_like(column, operand)
+            selected = sorted(set(selected).intersection(matches)) if len(selected) < chunk.rows else matches
+        elif operator == 'range' and chunk.columns[column].get('sorted'):
+            found = chunk.sorted_range(column, *operand)
+            selected = [index for index in selected if index in found] if len(selected) < chunk.rows else found
+        else:
+            values = chunk.read_column(column, selected if len(selected) < chunk.rows else None)
+            selected = list(compress(selected, map(_predicate(operator, operand), values)))
+        if not selected:
+            break
+    return selected
+
+def scan_chunks(paths: Iterable[str], columns: Sequence[str],
+                filters: Sequence[Tuple[str, str, Any]] = (), tail: Optional[int] = None) -> Iterator[Tuple[Any, ...]]:
+    """Рядки (значення columns) з файлів архіву, що проходять усі фільтри.
+
+    Фільтр - (колонка, оператор, значення): 'range' - (від, до) з невключеною верхньою
+    межею, 'in' - множина значень, 'like' - шаблон SQL LIKE без урахування регістру ASCII.
+    Спершу читаються колонки фільтрів, а решта колонок розпаковується лише для файлів,
+    де є збіги, і декодується лише для них. tail - лише останні tail збігів кожного файлу
+    (для файлів, упорядкованих за часом, - найновіші).
+    """
+    for path in paths:
+        with ChunkFile(path) as chunk:
+            selected = _select_rows(chunk, filters)
+            if tail is not None:
+                selected = selected[max(len(selected) - tail, 0):]
+            if not selected:
+                continue
+            
+            yield from zip(*(chunk.read_column(column, selected) for column in columns))
+
+def count_chunks(paths: Iterable[str], filters: Sequence[Tuple[str, str, Any]] = ()) -> int:
+    """Кількість рядків файлів архіву, що проходять усі фільтри (без читання інших колонок і побудови рядків)"""
+    total = 0
+    for path in paths:
+        with ChunkFile(path) as chunk:
+            total += len(_select_rows(chunk, filters))
+    return total
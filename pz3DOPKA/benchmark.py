@@ -0,0 +1,491 @@
+"""
+Мікробенчмарки системи управління подіями безпеки
+Запуск: python benchmark.py [лог-файл] [кількість_повторів]
+        python benchmark.py --queries <файл_БД> [кількість_повторів]
+        python benchmark.py --syslog <файл_БД> [кількість_повідомлень] [udp|tcp]
+        python benchmark.py --analytics <файл_БД> [кількість_повторів]
+        python benchmark.py --generate <лог-файл> [кількість_рядків] [seed]
+        python benchmark.py --suite [кількість_рядків] [--seed N] [--repeats N] [--json файл] [--baseline файл]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import platform
+import tempfile
+import contextlib
+from itertools import accumulate
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import analytics
+from analytics import np
+from log_manager import LogParser
+from db_mgr import SecurityEventsDB
+from sec_manager import SecurityEventsManager
+from syslog_receiver import SyslogReceiver, send_syslog_load, SYSLOG_HOST, SYSLOG_PORT
+
+# Файл за замовчуванням - Apache-логи з лабораторної роботи 2
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lb2', 'apache_logs.txt')
+
+def read_lines(file_path: str) -> List[str]:
+    """Прочитати рядки файлу в пам'ять (щоб не міряти дисковий ввід-вивід)"""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        return file.readlines()
+
+def benchmark_parse_lines(parser: LogParser, lines: List[str], repeats: int = 3) -> Dict[str, Any]:
+    """Виміряти швидкість LogParser.parse_log_line (найкращий результат з кількох повторів)"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for line in lines:
+            parser.parse_log_line(line)
+        best = min(best, time.perf_counter() - start)
+    
+    return {
+        'lines': len(lines),
+        'seconds': best,
+        'lines_per_sec': len(lines) / best if best > 0 else 0.0
+    }
+
+def benchmark_timestamps(parser: LogParser, lines: List[str], repeats: int = 3) -> Dict[str, Any]:
+    """Виміряти швидкість лише LogParser.parse_timestamp"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for line in lines:
+            parser.parse_timestamp(line)
+        best = min(best, time.perf_counter() - start)
+    
+    return {
+        'lines': len(lines),
+        'seconds': best,
+        'lines_per_sec': len(lines) / best if best > 0 else 0.0
+    }
+
+def benchmark_queries(db: SecurityEventsDB, repeats: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Виміряти затримку стандартних запитів SecurityEventsDB (найкращий результат з кількох повторів)"""
+    queries = {
+        'get_failed_logins_24h': db.get_failed_logins_24h,
+        'detect_brute_force_attacks': db.detect_brute_force_attacks,
+        'get_critical_events_week': db.get_critical_events_week,
+    }
+    
+    results = {}
+    for name, query in queries.items():
+        best = float('inf')
+        rows = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = len(query())
+            best = min(best, time.perf_counter() - start)
+        results[name] = {'rows': rows, 'seconds': best}
+    return results
+
+def main_queries(db_path: str, repeats: int):
+    """Запуск бенчмарку запитів до БД"""
+    db = SecurityEventsDB(db_path)
+    print(f"🗃️ БД: {db_path}")
+    for name, result in benchmark_queries(db, repeats).items():
+        print(f"⏱️ {name}: {result['rows']} рядків за {result['seconds'] * 1000:.1f} мс")
+    db.close()
+
+def benchmark_analytics(db: SecurityEventsDB, repeats: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Колоночна аналітика NumPy проти еквівалентного SQL (найкращий результат з кількох повторів).
+
+    Для кожного сценарію - час SQL-запиту та час векторизованого примітиву над уже
+    завантаженими масивами; окремо - час завантаження колонок (load_event_columns).
+    """
+    failed = [event_type['id'] for event_type in db.get_event_types() if event_type['type_name'] == 'Login Failed']
+    sql = db.analytics_reference_sql(failed)
+    conn = db.get_connection()
+    
+    load_seconds, columns = _best_of(db.load_event_columns, repeats)
+    has_ip = columns['ip_code'] >= 0
+    failures = columns.filter(np.isin(columns['event_type_id'], failed) & has_ip)
+    
+    vectorised = {
+        'hourly_histogram': lambda: analytics.time_histogram(columns['timestamp']),
+        'failure_rate_per_ip': lambda: analytics.group_rate(columns['ip_code'][has_ip],
+                                                            np.isin(columns['event_type_id'][has_ip], failed)),
+        'brute_force_max_per_hour': lambda: analytics.max_window_counts(
+            failures['timestamp'], analytics.MICROSECONDS_PER_HOUR, failures['ip_code']),
+        'inter_arrival_per_ip': lambda: analytics.inter_arrival_times(failures['timestamp'], failures['ip_code']),
+    }
+    
+    results = {'load_columns': {'rows': len(columns), 'seconds': load_seconds}}
+    for name, query in sql.items():
+        sql_seconds, rows = _best_of(lambda: conn.execute(query).fetchall(), repeats)
+        numpy_seconds, _ = _best_of(vectorised[name], repeats)
+        results[name] = {'rows': len(rows), 'sql_seconds': sql_seconds, 'numpy_seconds': numpy_seconds}
+    return results
+
+def main_analytics(db_path: str, repeats: int):
+    """Запуск порівняння колоночної аналітики NumPy з SQL"""
+    if np is None:
+        print("❌ Для бенчмарку аналітики потрібен NumPy: pip install numpy")
+        return
+    db = SecurityEventsDB(db_path)
+    print(f"🗃️ БД: {db_path}")
+    results = benchmark_analytics(db, repeats)
+    load = results.pop('load_columns')
+    print(f"⏱️ load_event_columns: {load['rows']} подій за {load['seconds'] * 1000:.1f} мс")
+    for name, result in results.items():
+        print(f"⏱️ {name}: SQL {result['sql_seconds'] * 1000:.1f} мс, NumPy {result['numpy_seconds'] * 1000:.1f} мс "
+              f"(x{result['sql_seconds'] / result['numpy_seconds']:.1f}), {result['rows']} рядків SQL")
+    db.close()
+
+def benchmark_syslog(manager: SecurityEventsManager, count: int, protocol: str = 'udp',
+                     source_name: str = 'Firewall_A') -> Dict[str, Any]:
+    """Надіслати count повідомлень локальним генератором (окремий процес) у SyslogReceiver"""
+    receiver = SyslogReceiver(manager, source_name, udp=protocol == 'udp', tcp=protocol == 'tcp')
+    
+    async def run() -> Dict[str, Any]:
+        await receiver.start()
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            load = await loop.run_in_executor(pool, send_syslog_load, count, SYSLOG_HOST, SYSLOG_PORT, protocol)
+        if protocol == 'tcp':
+            # TCP не втрачає повідомлень - чекаємо, доки всі пройдуть зворотний тиск
+            while receiver.received < count:
+                await asyncio.sleep(0.05)
+        else:
+            # Даємо вичитати з буфера сокета те, що генератор уже надіслав
+            await asyncio.sleep(0.2)
+        received_in = receiver.get_stats()['elapsed']
+        await receiver.stop()
+        return {**load, 'receive_elapsed': received_in}
+    
+    load = asyncio.run(run())
+    stats = receiver.get_stats()
+    return {
+        'sent': load['sent'],
+        'send_rate': load['messages_per_sec'],
+        'received': stats['received'],
+        'receive_rate': stats['received'] / load['receive_elapsed'],
+        'dropped': stats['dropped'],
+        'lost': load['sent'] - stats['received'] - stats['dropped'],
+        'written': stats['written'],
+        'write_rate': stats['written'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0,
+        'max_queued': stats['max_queued'],
+    }
+
+def main_syslog(db_path: str, count: int, protocol: str):
+    """Запуск бенчмарку мережевого приймача syslog"""
+    manager = SecurityEventsManager(db_path)
+    print(f"🗃️ БД: {db_path}, {count} повідомлень по {protocol.upper()}")
+    result = benchmark_syslog(manager, count, protocol)
+    manager.close()
+    
+    print(f"⏱️ Надіслано: {result['sent']} ({result['send_rate']:.0f} пов./с)")
+    print(f"⏱️ Прийнято в чергу: {result['received']} ({result['receive_rate']:.0f} пов./с), "
+          f"максимум у черзі: {result['max_queued']}")
+    print(f"⏱️ Відкинуто (черга заповнена): {result['dropped']}, втрачено в сокеті: {result['lost']}")
+    print(f"⏱️ Записано в БД: {result['written']} ({result['write_rate']:.0f} записів/с)")
+
+# Синтетичний корпус логів: кількість атакуючих IP, внутрішніх IP та користувачів,
+# показник розподілу Ціпфа (частота k-ї за популярністю адреси ~ 1 / k^s)
+CORPUS_ATTACKERS = 5000
+CORPUS_INTERNAL_HOSTS = 2000
+CORPUS_USERS = 3000
+CORPUS_ZIPF_EXPONENT = 1.1
+CORPUS_CHUNK_LINES = 10000
+# Частка рядків, з яких починається серія невдалих входів з однієї IP (атака підбору пароля)
+CORPUS_BURST_PROBABILITY = 0.002
+CORPUS_BURST_LENGTH = (6, 40)
+
+# Види рядків корпусу та їх ваги
+CORPUS_KINDS = ('success', 'failed', 'scan', 'malware', 'info')
+CORPUS_KIND_WEIGHTS = (40, 30, 8, 2, 20)
+
+# Сповільнення сценарію відносно базового запуску, яке вважається регресією (частка)
+REGRESSION_THRESHOLD = 0.2
+# Мінімальне абсолютне сповільнення (с), щоб шум суб-мілісекундних запитів не давав хибних регресій
+REGRESSION_MIN_SECONDS = 0.002
+
+def _zipf_cum_weights(count: int, exponent: float = CORPUS_ZIPF_EXPONENT) -> List[float]:
+    """Кумулятивні ваги розподілу Ціпфа для random.choices"""
+    return list(accumulate(1.0 / rank ** exponent for rank in range(1, count + 1)))
+
+def generate_log_corpus(file_path: str, lines: int, seed: int = 42, days: int = 7,
+                        end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Швидко згенерувати відтворюваний лог-файл (той самий seed - той самий вміст відносно end).
+
+    Атакуючі IP та цільові користувачі мають розподіл Ціпфа (кілька дуже активних
+    адрес і довгий хвіст), частина невдалих входів іде серіями з однієї IP за кілька
+    секунд. Час рівномірно наростає за останні days днів до end (за замовчуванням - зараз).
+    Рядки формуються пакетами по CORPUS_CHUNK_LINES і записуються одним write.
+    """
+    rng = random.Random(seed)
+    end = (end or datetime.now()).replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start).total_seconds() / max(lines, 1)
+    
+    attackers = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                 for _ in range(CORPUS_ATTACKERS)]
+    internal = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                for _ in range(CORPUS_INTERNAL_HOSTS)]
+    users = ['root', 'admin', 'test', 'oracle', 'postgres'] + [f"user{index:04d}" for index in range(CORPUS_USERS)]
+    attacker_weights = _zipf_cum_weights(len(attackers))
+    user_weights = _zipf_cum_weights(len(users))
+    kind_weights = list(accumulate(CORPUS_KIND_WEIGHTS))
+    malware = ['Trojan.Win32.Generic', 'Backdoor.Linux.Mirai', 'Ransomware.WannaCry', 'Virus.Win32.Sality']
+    
+    written = 0
+    failed = 0
+    bursts = 0
+    time_cache = (None, None)
+    offset = 0.0
+    
+    with open(file_path, 'w', encoding='utf-8') as file:
+        while written < lines:
+            count = min(CORPUS_CHUNK_LINES, lines - written)
+            kinds = rng.choices(CORPUS_KINDS, cum_weights=kind_weights, k=count)
+            attacker_ips = rng.choices(attackers, cum_weights=attacker_weights, k=count)
+            target_users = rng.choices(users, cum_weights=user_weights, k=count)
+            hosts = rng.choices(internal, k=count)
+            randoms = [rng.random() for _ in range(count)]
+            
+            chunk = []
+            index = 0
+            while index < count:
+                # Форматуємо час лише при зміні секунди
+                second = int(offset)
+                if time_cache[0] != second:
+                    time_cache = (second, (start + timedelta(seconds=second)).strftime('%Y-%m-%d %H:%M:%S'))
+                stamp = time_cache[1]
+                kind = kinds[index]
+                ip = attacker_ips[index]
+                user = target_users[index]
+                
+                if randoms[index] < CORPUS_BURST_PROBABILITY:
+                    # Серія невдалих входів з однієї IP протягом кількох секунд
+                    length = min(rng.randint(*CORPUS_BURST_LENGTH), count - index)
+                    for burst_index in range(length):
+                        chunk.append(f"{stamp} sshd[{4000 + burst_index}]: authentication failure for user "
+                                     f"{target_users[(index + burst_index) % count]} from {ip} port 22\n")
+                    failed += length
+                    bursts += 1
+                    index += length
+                    offset += step * length
+                    continue
+                
+                if kind == 'success':
+                    line = f"{stamp} sshd[{index % 30000}]: Login success for user {user} from {hosts[index]}\n"
+                elif kind == 'failed':
+                    line = f"{stamp} sshd[{index % 30000}]: Failed login for user {user} from {ip} port 22\n"
+                    failed += 1
+                elif kind == 'scan':
+                    line = f"{stamp} firewall: Port scan detected from {ip} to {hosts[index]}\n"
+                elif kind == 'malware':
+                    line = (f"{stamp} CRITICAL: Malware {malware[index % len(malware)]} detected on "
+                            f"workstation {hosts[index]}\n")
+                else:
+                    line = f"{stamp} sshd[{index % 30000}]: Connection closed by {hosts[index]} port {1024 + index % 60000}\n"
+                chunk.append(line)
+                index += 1
+                offset += step
+            
+            file.write(''.join(chunk))
+            written += count
+    
+    return {'lines': written, 'failed_logins': failed, 'bursts': bursts, 'seed': seed,
+            'start': start.isoformat(), 'end': end.isoformat()}
+
+def _best_of(function, repeats: int) -> Tuple[float, Any]:
+    """Найкращий час виконання function() з кількох повторів та її останній результат"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run_suite(lines: int, seed: int = 42, repeats: int = 3, work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Повний набір сценаріїв на синтетичному корпусі: генерація, парсинг, імпорт, запити, пошук.
+
+    Повертає словник meta + results (список сценаріїв з seconds, items та rate).
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix='pz3_bench_')
+    log_path = os.path.join(work_dir, f'corpus_{lines}_{seed}.log')
+    db_path = os.path.join(work_dir, f'bench_{lines}_{seed}.db')
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    
+    results = []
+    
+    def record(scenario: str, seconds: float, items: int):
+        results.append({'scenario': scenario, 'seconds': seconds, 'items': items,
+                        'rate': items / seconds if seconds > 0 else 0.0})
+    
+    start = time.perf_counter()
+    corpus = generate_log_corpus(log_path, lines, seed)
+    record('generate', time.perf_counter() - start, corpus['lines'])
+    
+    parser = LogParser()
+    parser.set_format(parser.sniff_format(log_path))
+    seconds, parsed = _best_of(lambda: sum(1 for _ in parser.iter_log_file(log_path)), repeats)
+    record('parse', seconds, parsed)
+    
+    manager = SecurityEventsManager(db_path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            imported = manager.import_logs_from_file(log_path, 'Firewall_A')
+            record('ingest', time.perf_counter() - start, imported)
+        
+        db = manager.db
+        scenarios = {
+            'query.failed_logins_24h.page': lambda: db.get_failed_logins_24h(10),
+            'query.failed_logins_24h.count': db.count_failed_logins_24h,
+            'query.brute_force.page': lambda: db.detect_brute_force_attacks(10),
+            'query.brute_force.count': db.count_brute_force_attacks,
+            'query.critical_week.page': lambda: db.get_critical_events_week(10),
+            'query.critical_week.count': db.count_critical_events_week,
+            'query.event_counts': db.get_event_counts,
+            'search.keyword.page': lambda: db.search_events_by_keyword('Mirai', 10),
+            'search.keyword.count': lambda: db.count_events_by_keyword('Mirai'),
+            'search.ranked.recent': lambda: db.search_events_ranked('authentication failure', 10, order_by='recent'),
+            'search.ranked.rank': lambda: db.search_events_ranked('authentication failure', 10, order_by='rank'),
+            'search.ranked.count': lambda: db.count_events_ranked('authentication failure'),
+        }
+        for scenario, query in scenarios.items():
+            seconds, result = _best_of(query, repeats)
+            record(scenario, seconds, result if isinstance(result, int) else len(result))
+        
+        # Колоночна аналітика - лише якщо встановлено NumPy
+        if np is not None:
+            for scenario, result in benchmark_analytics(db, repeats).items():
+                if 'seconds' in result:
+                    record(f'analytics.{scenario}', result['seconds'], result['rows'])
+                    continue
+                record(f'analytics.{scenario}.sql', result['sql_seconds'], result['rows'])
+                record(f'analytics.{scenario}.numpy', result['numpy_seconds'], result['rows'])
+    finally:
+        manager.close()
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'lines': lines,
+            'seed': seed,
+            'repeats': repeats,
+            'corpus': corpus,
+            'db_size': os.path.getsize(db_path),
+        },
+        'results': results
+    }
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """Сценарії, що сповільнились більше ніж на threshold (частка) відносно baseline"""
+    baseline_seconds = {result['scenario']: result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = baseline_seconds.get(result['scenario'])
+        if (before and result['seconds'] > before * (1 + threshold)
+                and result['seconds'] - before > REGRESSION_MIN_SECONDS):
+            regressions.append({'scenario': result['scenario'], 'baseline': before,
+                                'current': result['seconds'], 'ratio': result['seconds'] / before})
+    return regressions
+
+def main_suite(args: List[str]):
+    """Запуск набору сценаріїв: --suite [рядків] [--seed N] [--repeats N] [--json файл] [--baseline файл]"""
+    def option(name: str, default: Optional[str]) -> Optional[str]:
+        if name in args and args.index(name) + 1 < len(args):
+            return args[args.index(name) + 1]
+        return default
+    
+    lines = int(args[0]) if args and args[0].isdigit() else 100000
+    seed = int(option('--seed', '42'))
+    repeats = int(option('--repeats', '3'))
+    json_path = option('--json', None)
+    baseline_path = option('--baseline', None)
+    
+    print(f"🧪 Набір бенчмарків: {lines} рядків, seed {seed}")
+    report = run_suite(lines, seed, repeats)
+    for result in report['results']:
+        print(f"⏱️ {result['scenario']}: {result['seconds'] * 1000:.1f} мс, {result['items']} "
+              f"({result['rate']:.0f}/с)")
+    
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"💾 Результати збережено: {json_path}")
+    
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as file:
+            regressions = compare_results(json.load(file), report)
+        for regression in regressions:
+            print(f"⚠️ Регресія {regression['scenario']}: {regression['baseline'] * 1000:.1f} мс -> "
+                  f"{regression['current'] * 1000:.1f} мс (x{regression['ratio']:.2f})")
+        if regressions:
+            sys.exit(1)
+        print("✅ Регресій не виявлено")
+
+def main():
+    """Запуск мікробенчмарку парсера"""
+    if len(sys.argv) >= 3 and sys.argv[1] == '--queries':
+        repeats = int(sys.argv[3]) if len(sys.argv) >= 4 and sys.argv[3].isdigit() else 3
+        main_queries(sys.argv[2], repeats)
+        return
+    
+    if len(sys.argv) >= 3 and sys.argv[1] == '--analytics':
+        repeats = int(sys.argv[3]) if len(sys.argv) >= 4 and sys.argv[3].isdigit() else 3
+        main_analytics(sys.argv[2], repeats)
+        return
+    
+    if len(sys.argv) >= 3 and sys.argv[1] == '--syslog':
+        count = int(sys.argv[3]) if len(sys.argv) >= 4 and sys.argv[3].isdigit() else 100000
+        protocol = sys.argv[4] if len(sys.argv) >= 5 and sys.argv[4] in ('udp', 'tcp') else 'udp'
+        main_syslog(sys.argv[2], count, protocol)
+        return
+    
+    if len(sys.argv) >= 3 and sys.argv[1] == '--generate':
+        lines = int(sys.argv[3]) if len(sys.argv) >= 4 and sys.argv[3].isdigit() else 100000
+        seed = int(sys.argv[4]) if len(sys.argv) >= 5 and sys.argv[4].isdigit() else 42
+        start = time.perf_counter()
+        corpus = generate_log_corpus(sys.argv[2], lines, seed)
+        elapsed = time.perf_counter() - start
+        print(f"📄 Згенеровано {corpus['lines']} рядків у {sys.argv[2]} за {elapsed:.2f} с "
+              f"({corpus['lines'] / elapsed:.0f} рядків/с), невдалих входів: {corpus['failed_logins']}, "
+              f"серій атак: {corpus['bursts']}")
+        return
+    
+    if len(sys.argv) >= 2 and sys.argv[1] == '--suite':
+        main_suite(sys.argv[2:])
+        return
+    
+    file_path = sys.argv[1] if len(sys.argv) >= 2 else DEFAULT_LOG_FILE
+    repeats = int(sys.argv[2]) if len(sys.argv) >= 3 and sys.argv[2].isdigit() else 3
+    
+    lines = read_lines(file_path)
+    print(f"📄 Файл: {file_path}")
+    
+    # Загальний перебір паттернів дат та зафіксований формат (автовизначення)
+    generic_parser = LogParser()
+    sniffed_parser = LogParser()
+    sniffed_parser.set_format(sniffed_parser.sniff_format(file_path))
+    
+    for label, parser in [('загальний', generic_parser), (f"формат {sniffed_parser.active_format}", sniffed_parser)]:
+        result = benchmark_parse_lines(parser, lines, repeats)
+        print(f"⏱️ parse_log_line ({label}): {result['lines']} рядків за {result['seconds']:.3f} с "
+              f"({result['lines_per_sec']:.0f} рядків/с)")
+    
+    result = benchmark_timestamps(LogParser(), lines, repeats)
+    print(f"⏱️ parse_timestamp (загальний): {result['lines']} рядків за {result['seconds']:.3f} с "
+          f"({result['lines_per_sec']:.0f} рядків/с)")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,318 @@
 import sqlite3
 import os
+import re
+import time
+import threading
+import ipaddress
+import hashlib
+import heapq
+import itertools
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Iterator, Union, Sequence, Callable
+from metrics import METRICS, metric_key, timed
+from sketches import SpaceSaving, HyperLogLog, TOPK_CAPACITY
+from analytics import EventColumns, ANALYTICS_COLUMNS, require_numpy
+from archive import ARCHIVE_CHUNK_ROWS, ARCHIVE_SUFFIX, write_chunk, scan_chunks, count_chunks
+
+# Розмір пакета за замовчуванням для масового імпорту подій
+DEFAULT_BATCH_SIZE = 1000
+
+# Розмір сторінки за замовчуванням для повнотекстового пошуку
+DEFAULT_SEARCH_LIMIT = 10
+
+# Мінімальна довжина ключового слова, яку обслуговує триграмний FTS5-індекс
+FTS_MIN_KEYWORD_LENGTH = 3
+
+# Налаштування SQLite для кожного з'єднання: WAL дозволяє читачам працювати
+# паралельно з імпортом, synchronous=NORMAL у WAL не робить fsync на кожен commit
+CONNECTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,        # ~64 МБ (від'ємне значення - у КБ)
+    'mmap_size': 268435456,      # 256 МБ
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # мс очікування на блокування замість помилки "database is locked"
+}
+
+# Колонки EventSources, додані після першої версії схеми (міграція старих БД через ALTER TABLE)
+SOURCE_COLUMNS = (
+    ('log_format', 'TEXT'),
+    ('follow_path', 'TEXT'),
+    ('follow_inode', 'INTEGER'),
+    ('follow_offset', 'INTEGER'),
+)
+
+# Помилки окремого рядка (а не БД): пакет з такою помилкою записується повторно по одному рядку,
+# і пропускаються лише хибні рядки
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, ValueError, TypeError, OverflowError)
+
+# Скільки повідомлень про пропущені хибні рядки повертає масовий запис
+BULK_ERRORS_KEPT = 10
+
+# Ідемпотентний імпорт: скільки часу пам'ятати лічильники повторів однакових рядків після того,
+# як час подій файлу пішов далі. Стан залежить лише від послідовності подій файлу, тож повторний
+# імпорт того самого файлу (або його початку) дає ті самі хеші; рядки, що запізнюються більше
+# ніж на вікно, нумеруються заново
+DEDUP_REORDER_WINDOW = timedelta(hours=1)
+
+# Скільки хешів перевіряти одним запитом IN (...) - з запасом до SQLITE_MAX_VARIABLE_NUMBER (999
+# у старих збірках SQLite)
+HASH_LOOKUP_CHUNK = 900
+
+# Зведені (rollup) лічильники подій за джерелом, типом та IP: гранулярність, таблиця,
+# довжина ключа інтервалу (префікс ISO-часу 'YYYY-MM-DDTHH:MM') та тривалість інтервалу -
+# від найгрубшої до найдрібнішої
+ROLLUP_LEVELS = (
+    ('day', 'RollupDay', 10, timedelta(days=1)),
+    ('hour', 'RollupHour', 13, timedelta(hours=1)),
+    ('minute', 'RollupMinute', 16, timedelta(minutes=1)),
+)
+
+# Колонки, за якими можна групувати зведення
+ROLLUP_GROUP_COLUMNS = ('source_id', 'event_type_id', 'ip_address')
+
+# Ключі метрик запису в БД
+_INSERT_SECONDS = metric_key('db_insert_seconds')
+_COMMIT_SECONDS = metric_key('db_commit_seconds')
+_ROWS_INSERTED = metric_key('db_rows_inserted_total')
+_ROWS_DUPLICATE = metric_key('db_rows_duplicate_total')
+
+# Секціонування SecurityEvents за часом: окрема таблиця (зі своїми індексами та FTS) на день або місяць
+PARTITION_GRANULARITIES = ('day', 'month')
+
+# Найбільша кількість членів одного складеного SELECT у SQLite (SQLITE_MAX_COMPOUND_SELECT):
+# довші UNION ALL над секціями розбиваються на вкладені підзапити
+MAX_COMPOUND_SELECT = 500
+
+# Колонки подій звичайного формату (у порядку таблиці SecurityEvents) та колонки, що зберігаються в архіві
+EVENT_COLUMNS = ('id', 'timestamp', 'source_id', 'event_type_id', 'message', 'ip_address', 'username', 'content_hash')
+ARCHIVE_COLUMNS = EVENT_COLUMNS[:-1]
+
+# Компактний формат зберігання: час - мікросекунди від EPOCH (наївний datetime без часового поясу)
+EPOCH = datetime(1970, 1, 1)
+
+# Змінні частини повідомлення (числа) замінюються на цей символ у шаблоні
+MESSAGE_PLACEHOLDER = '\x00'
+_NUMBER_RE = re.compile(r'\d+')
+
+def encode_timestamp(timestamp: datetime) -> int:
+    """datetime -> ціле число мікросекунд від EPOCH"""
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+def decode_timestamp(value: Optional[int]) -> Optional[str]:
+    """Мікросекунди від EPOCH -> ISO-рядок (як у звичайному форматі БД)"""
+    if value is None:
+        return None
+    return (EPOCH + timedelta(microseconds=value)).isoformat()
+
+def encode_ip(ip_address: Optional[str]) -> Union[int, bytes, str, None]:
+    """IPv4 -> INTEGER, IPv6 -> BLOB (16 байт); некоректні адреси зберігаються як є"""
+    if ip_address is None:
+        return None
+    try:
+        ip = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return ip_address
+    return int(ip) if ip.version == 4 else ip.packed
+
+@lru_cache(maxsize=65536)
+def decode_ip(value: Union[int, bytes, str, None]) -> Optional[str]:
+    """Зворотне перетворення до encode_ip"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return str(ipaddress.IPv6Address(value))
+    return str(ipaddress.IPv4Address(value))
+
+def split_message(message: str) -> Tuple[str, Optional[str]]:
+    """Розділити повідомлення на шаблон (числа замінено) та параметри (числа через кому)"""
+    if MESSAGE_PLACEHOLDER in message:
+        return message, None
+    params = _NUMBER_RE.findall(message)
+    if not params:
+        return message, None
+    return _NUMBER_RE.sub(MESSAGE_PLACEHOLDER, message), ','.join(params)
+
+def join_message(template: str, params: Optional[str]) -> str:
+    """Відновити повідомлення з шаблону та параметрів"""
+    if params is None:
+        return template
+    parts = template.split(MESSAGE_PLACEHOLDER)
+    values = params.split(',')
+    return ''.join(part + value for part, value in zip(parts, values)) + parts[-1]
+
+def union_all(selects: Sequence[str]) -> str:
+    """Об'єднати SELECT-и через UNION ALL; понад MAX_COMPOUND_SELECT - групами у вкладених підзапитах.
+
+    Порядок SELECT-ів (а отже й параметрів запиту) зберігається.
+    """
+    while len(selects) > MAX_COMPOUND_SELECT:
+        selects = [f"SELECT * FROM ({' UNION ALL '.join(selects[start:start + MAX_COMPOUND_SELECT])})"
+                   for start in range(0, len(selects), MAX_COMPOUND_SELECT)]
+    return ' UNION ALL '.join(selects)
+
+def content_hash(source_id: int, timestamp: datetime, message: str, occurrence: int = 0) -> int:
+    """64-бітний хеш вмісту події для ідемпотентного імпорту (знакове ціле, як INTEGER у SQLite).
+
+    occurrence - номер повтору події з тим самим джерелом, часом і повідомленням у межах
+    імпорту, щоб справжні повтори (дві однакові спроби входу за секунду) не зливалися в одну.
+    """
+    digest = hashlib.blake2b(f"{source_id}\x1f{timestamp.isoformat()}\x1f{occurrence}\x1f{message}".encode(),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+class OccurrenceCounter:
+    """Номери повторів однакових подій одного потоку (файлу) для content_hash.
+
+    Лічильники ключуються за (час, хеш) і видаляються, коли час подій іде далі
+    ніж на window, тож пам'ять залежить від кількості подій у вікні, а не у файлі.
+    """
+    
+    def __init__(self, window: timedelta = DEDUP_REORDER_WINDOW):
+        self.window = window
+        self._counts: Dict[datetime, Dict[int, int]] = {}
+        self._timestamps: List[datetime] = []  # Купа часів, для яких є лічильники
+        self._latest: Optional[datetime] = None
+    
+    def next(self, timestamp: datetime, event_hash: int) -> int:
+        """Номер чергової появи події (0 - перша)"""
+        if self._latest is None or timestamp > self._latest:
+            self._latest = timestamp
+            horizon = timestamp - self.window
+            while self._timestamps and self._timestamps[0] < horizon:
+                del self._counts[heapq.heappop(self._timestamps)]
+        
+        counts = self._counts.get(timestamp)
+        if counts is None:
+            counts = self._counts[timestamp] = {}
+            heapq.heappush(self._timestamps, timestamp)
+        occurrence = counts.get(event_hash, 0)
+        counts[event_hash] = occurrence + 1
+        return occurrence
+
+class BulkInsertError(Exception):
+    """Помилка масового запису; inserted - кількість подій, зафіксованих у БД до помилки"""
+    
+    def __init__(self, message: str, inserted: int):
+        super().__init__(message)
+        self.inserted = inserted
+
+class ArchivedMatches:
+    """Збіги запиту в архіві: тимчасова таблиця із завантаженими подіями (table, None - не завантажено
+    жодної) та кількість решти збігів, що рахується лише на вимогу (rest)"""
+    
+    def __init__(self, table: Optional[str], paths: List[str], filters: List[Tuple[str, str, Any]],
+                 loaded: int, complete: bool):
+        self.table = table
+        self.paths = paths
+        self.filters = filters
+        self.loaded = loaded
+        self.complete = complete
+    
+    def rest(self) -> int:
+        """Кількість збігів, не завантажених у таблицю (файли проходяться лише колонками фільтрів)"""
+        if self.complete:
+            return 0
+        return count_chunks(self.paths, self.filters) - self.loaded
+
+# Запит подій: колонки, FROM... (з WHERE/GROUP BY), параметри, ORDER BY та архівні збіги
+EventQuery = Tuple[str, str, tuple, str, Optional[ArchivedMatches]]
 
 class SecurityEventsDB:
     """Клас для роботи з базою даних подій безпеки"""
     
-    def __init__(self, db_path: str = "security_events.db"):
+    def __init__(self, db_path: str = "security_events.db", compact: bool = False, populate: bool = True,
+                 partitioning: Optional[str] = None):
+        if partitioning is not None and partitioning not in PARTITION_GRANULARITIES:
+            raise ValueError(f"Секціонування має бути одним з: {', '.join(PARTITION_GRANULARITIES)}")
+        if compact and partitioning:
+            raise ValueError("Компактний формат не підтримує секціонування")
+        
         self.db_path = db_path
+        self.fts_enabled = False
+        # Компактний формат (час - INTEGER, IP - INTEGER/BLOB, повідомлення - шаблон + параметри).
+        # Для нової БД задається параметром, для існуючої - визначається за схемою
+        self.compact = compact
+        self._template_ids = {}
+        # Секціонування за часом ('day', 'month' або None); для існуючої БД - зі збережених налаштувань
+        self.partitioning = partitioning
+        self._partitions = set()  # Секції, існування яких уже перевірено при вставці
+        # Довготривалі з'єднання: одне на потік (sqlite3.Connection не можна ділити між потоками)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Номери тимчасових таблиць архівних подій (своя таблиця на кожен запит)
+        self._archive_table_ids = itertools.count(1)
         self.init_database()
-        self.populate_initial_data()
+        if populate:
+            self.populate_initial_data()
     
     def get_connection(self) -> sqlite3.Connection:
-        """Отримати з'єднання з базою даних"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Дозволяє доступ до колонок за іменем
+        """Отримати з'єднання поточного потоку (створюється один раз і перевикористовується)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=CONNECTION_PRAGMAS['busy_timeout'] / 1000)
+            conn.row_factory = sqlite3.Row  # Дозволяє доступ до колонок за іменем
+            for pragma, value in CONNECTION_PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            
+            # Функції декодування компактного формату (використовуються в запитах, VIEW та тригерах)
+            conn.create_function('decode_timestamp', 1, decode_timestamp, deterministic=True)
+            conn.create_function('decode_ip', 1, decode_ip, deterministic=True)
+            conn.create_function('join_message', 2, join_message, deterministic=True)
+            
+            self._local.conn = conn
+            self._local.transaction_depth = 0
+            self._local.stale_archive_tables = []
+            with self._connections_lock:
+                self._connections.append(conn)
         return conn
     
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Транзакція на з'єднанні поточного потоку: commit при успіху, rollback при помилці.
+
+        Вкладені виклики виконуються в межах зовнішньої транзакції.
+        """
+        conn = self.get_connection()
+        if self._local.transaction_depth > 0:
+            self._local.transaction_depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.transaction_depth -= 1
+            return
+        
+        self._local.transaction_depth = 1
+        try:
+            with conn:
+                yield conn
+                if METRICS.enabled:
+                    # Явний commit, щоб виміряти його затримку (вихід з with conn тоді нічого не фіксує)
+                    with METRICS.timer(_COMMIT_SECONDS, histogram=True):
+                        conn.commit()
+        except Exception:
+            # Відкочені шаблони повідомлень та секції не повинні лишатися в кеші
+            self._template_ids.clear()
+            self._partitions.clear()
+            raise
+        finally:
+            self._local.transaction_depth = 0
+    
+    def close(self):
+        """Закрити всі з'єднання, відкриті цим об'єктом"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # З'єднання іншого потоку
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
     def init_database(self):
         """Ініціалізація бази даних та створення таблиць"""
         conn = self.get_connection()
@@ -28,10 +324,22 @@ class SecurityEventsDB:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT UNIQUE NOT NULL,
                 location TEXT NOT NULL,
-                type TEXT NOT NULL
+                type TEXT NOT NULL,
+                log_format TEXT,
+                follow_path TEXT,
+                follow_inode INTEGER,
+                follow_offset INTEGER
             )
         ''')
         
+        # Міграція старих БД: формат дати логів джерела (кеш автовизначення)
+        # та контрольна точка стеження за файлом (--follow)
+        cursor.execute("PRAGMA table_info(EventSources)")
+        columns = [row['name'] for row in cursor.fetchall()]
+        for column, column_type in SOURCE_COLUMNS:
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE EventSources ADD COLUMN {column} {column_type}')
+        
         # Створення таблиці EventTypes
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS EventTypes (
@@ -41,28 +349,748 @@ class SecurityEventsDB:
             )
         ''')
         
-        # Створення таблиці SecurityEvents
+        # Імпортовані файли (SHA-256 вмісту) для пропуску повторного ідемпотентного імпорту
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS SecurityEvents (
+            CREATE TABLE IF NOT EXISTS ImportedFiles (
+                source_id INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                events INTEGER,
+                imported_at DATETIME NOT NULL,
+                PRIMARY KEY (source_id, sha256),
+                FOREIGN KEY (source_id) REFERENCES EventSources (id)
+            )
+        ''')
+        
+        # Формат існуючої БД: секціонована має таблицю Settings, інакше формат таблиці
+        # SecurityEvents визначається за її колонками
+        cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('Settings', 'SecurityEvents')")
+        existing = {row['name'] for row in cursor.fetchall()}
+        if 'Settings' in existing:
+            # Секціонована БД: події лише в секціях SecurityEvents_*
+            cursor.execute("SELECT value FROM Settings WHERE key = 'partitioning'")
+            self.partitioning = cursor.fetchone()['value']
+            self.compact = False
+        elif 'SecurityEvents' in existing:
+            cursor.execute("PRAGMA table_info(SecurityEvents)")
+            self.compact = 'template_id' in [column['name'] for column in cursor.fetchall()]
+            self.partitioning = None
+        
+        if self.partitioning:
+            self._init_partitions(cursor)
+        else:
+            if self.compact:
+                self._create_compact_tables(cursor)
+            else:
+                self._create_events_table(cursor, 'SecurityEvents')
+            self._migrate_events_table(cursor, 'SecurityEvents')
+            
+            self._create_event_indexes(cursor, 'SecurityEvents', 'idx')
+            
+            # Повнотекстовий індекс для пошуку за ключовими словами
+            self.fts_enabled = self._init_fulltext_index(cursor, 'SecurityEvents', 'SecurityEventsFTS')
+        
+        # Лічильники подій для статистики
+        self._init_event_counters(cursor)
+        # Зведення за хвилинами, годинами та днями для запитів за діапазонами часу
+        self._init_rollups(cursor)
+        
+        # Найактивніші IP та користувачі (підсумки Space-Saving) по годинних вікнах
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS HeavyHitterWindows (
+                kind TEXT NOT NULL,
+                hour TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                floor INTEGER NOT NULL,
+                PRIMARY KEY (kind, hour)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS HeavyHitters (
+                kind TEXT NOT NULL,
+                hour TEXT NOT NULL,
+                item TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                error INTEGER NOT NULL,
+                PRIMARY KEY (kind, hour, item)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Файли колонкового архіву старих подій з часом найранішої та найпізнішої події файлу
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ArchiveChunks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL UNIQUE,
+                start_ts TEXT NOT NULL,
+                end_ts TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        
+        # Кількість різних IP та користувачів (підсумки HyperLogLog) по джерелах і годинних вікнах
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS DistinctSketches (
+                source_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                hour TEXT NOT NULL,
+                registers BLOB NOT NULL,
+                PRIMARY KEY (kind, hour, source_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        conn.commit()
+    
+    def _create_events_table(self, cursor, table: str, autoincrement: bool = True):
+        """Створення таблиці подій звичайного формату (SecurityEvents або секції)"""
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY{' AUTOINCREMENT' if autoincrement else ''},
                 timestamp DATETIME NOT NULL,
                 source_id INTEGER NOT NULL,
                 event_type_id INTEGER NOT NULL,
                 message TEXT NOT NULL,
                 ip_address TEXT,
                 username TEXT,
+                content_hash INTEGER,
                 FOREIGN KEY (source_id) REFERENCES EventSources (id),
                 FOREIGN KEY (event_type_id) REFERENCES EventTypes (id)
             )
         ''')
+    
+    def _create_event_indexes(self, cursor, table: str, prefix: str):
+        """Створення індексів таблиці подій для оптимізації запитів"""
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {prefix}_timestamp ON {table}(timestamp)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {prefix}_ip_address ON {table}(ip_address)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {prefix}_username ON {table}(username)')
+        # Складений покривний індекс для запитів "тип події + часовий діапазон":
+        # get_failed_logins_24h та get_critical_events_week читають лише потрібний діапазон часу,
+        # а detect_brute_force_attacks обслуговується індексом повністю (ip_address теж у ньому)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {prefix}_type_timestamp_ip ON {table}(event_type_id, timestamp, ip_address)')
+        # Унікальність хешу вмісту для ідемпотентного імпорту; звичайні вставки хеш не заповнюють,
+        # тож частковий індекс не займає місця для них
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {prefix}_content_hash ON {table}(content_hash) '
+                       f'WHERE content_hash IS NOT NULL')
+    
+    def _migrate_events_table(self, cursor, table: str) -> bool:
+        """Додати в таблицю подій старої БД колонку content_hash (True - таблицю змінено)"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if 'content_hash' in [row['name'] for row in cursor.fetchall()]:
+            return False
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN content_hash INTEGER')
+        return True
+    
+    def _init_partitions(self, cursor):
+        """Службові таблиці секціонованої БД: налаштування та реєстр секцій"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Settings (
+                key TEXT PRIMARY KEY,
+                value
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO Settings (key, value) VALUES ('partitioning', ?)", (self.partitioning,))
+        # ID подій спільні для всіх секцій (на них посилаються FTS-індекси та запити за id)
+        cursor.execute("INSERT OR IGNORE INTO Settings (key, value) VALUES ('next_event_id', 1)")
+        
+        # Секція містить події з часом у [start_ts, end_ts)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Partitions (
+                name TEXT PRIMARY KEY,
+                start_ts TEXT NOT NULL,
+                end_ts TEXT NOT NULL
+            )
+        ''')
         
-        # Створення індексів для оптимізації запитів
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON SecurityEvents(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ip_address ON SecurityEvents(ip_address)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_username ON SecurityEvents(username)')
+        # Міграція секцій старої БД: колонка та індекс content_hash
+        cursor.execute('SELECT name FROM Partitions')
+        for row in cursor.fetchall():
+            if self._migrate_events_table(cursor, row['name']):
+                self._create_event_indexes(cursor, row['name'], f"idx_{row['name']}")
         
-        conn.commit()
-        conn.close()
+        # Старі БД мали VIEW SecurityEvents над усіма секціями. UNION ALL у SQLite обмежений
+        # MAX_COMPOUND_SELECT членами, тож з 501-ю секцією VIEW не створювався і вставка падала;
+        # усі запити читають секції через _events_source
+        cursor.execute('DROP VIEW IF EXISTS SecurityEvents')
+        
+        # Перевіряємо, чи доступний FTS5 з триграмами (FTS-таблиці створюються разом із секціями)
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.SecurityEventsFTS_probe USING fts5(message, tokenize='trigram')")
+            cursor.execute("DROP TABLE temp.SecurityEventsFTS_probe")
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            self.fts_enabled = False
+    
+    def _partition_bounds(self, timestamp: datetime) -> Tuple[str, datetime, datetime]:
+        """Назва секції та межі її періоду [start, end) для часу події"""
+        if self.partitioning == 'day':
+            start = datetime(timestamp.year, timestamp.month, timestamp.day)
+            return f"SecurityEvents_{start:%Y%m%d}", start, start + timedelta(days=1)
+        
+        start = datetime(timestamp.year, timestamp.month, 1)
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        return f"SecurityEvents_{start:%Y%m}", start, end
+    
+    def _ensure_partition(self, conn, timestamp: datetime) -> str:
+        """Назва секції для часу події (секція створюється за потреби, виклик усередині транзакції)"""
+        name, start, end = self._partition_bounds(timestamp)
+        if name in self._partitions:
+            return name
+        
+        cursor = conn.execute('SELECT 1 FROM Partitions WHERE name = ?', (name,))
+        if cursor.fetchone() is None:
+            self._create_events_table(cursor, name, autoincrement=False)
+            self._create_event_indexes(cursor, name, f'idx_{name}')
+            if self.fts_enabled:
+                self._init_fulltext_index(cursor, name, self._fts_table(name))
+            self._create_counter_triggers(cursor, name)
+            self._create_rollup_triggers(cursor, name)
+            cursor.execute('INSERT INTO Partitions (name, start_ts, end_ts) VALUES (?, ?, ?)',
+                           (name, start.isoformat(), end.isoformat()))
+        
+        self._partitions.add(name)
+        return name
+    
+    def _fts_table(self, partition: str) -> str:
+        """Назва FTS-таблиці секції"""
+        return partition.replace('SecurityEvents', 'SecurityEventsFTS', 1)
+    
+    def _union_partitions(self, names: List[str]) -> str:
+        """SELECT, що об'єднує задані секції (або порожній результат з тими ж колонками)"""
+        if not names:
+            return ("SELECT NULL AS id, NULL AS timestamp, NULL AS source_id, NULL AS event_type_id, "
+                    "NULL AS message, NULL AS ip_address, NULL AS username, NULL AS content_hash WHERE 0")
+        return union_all([f'SELECT * FROM {name}' for name in names])
+    
+    def _partitions_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """Секції, період яких перетинається з [start, end)"""
+        start_ts = start.isoformat() if start else None
+        end_ts = end.isoformat() if end else None
+        cursor = self.get_connection().execute('''
+            SELECT name FROM Partitions
+            WHERE (? IS NULL OR end_ts > ?) AND (? IS NULL OR start_ts < ?)
+            ORDER BY start_ts
+        ''', (start_ts, start_ts, end_ts, end_ts))
+        return [row['name'] for row in cursor.fetchall()]
+    
+    def _events_source(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> str:
+        """Джерело подій для FROM: у секціонованій БД - лише секції, що перетинаються з [start, end)
+        (без меж - усі секції)"""
+        if not self.partitioning:
+            return 'SecurityEvents'
+        
+        names = self._partitions_between(start, end)
+        if len(names) == 1:
+            return names[0]
+        return f'({self._union_partitions(names)})'
+    
+    def _fulltext_tables(self) -> List[Tuple[str, str]]:
+        """Пари (таблиця подій, FTS-таблиця); у секціонованій БД - по одній на секцію"""
+        if not self.partitioning:
+            return [('SecurityEvents', 'SecurityEventsFTS')]
+        return [(name, self._fts_table(name)) for name in self._partitions_between()]
+    
+    def get_partitions(self) -> List[Dict[str, Any]]:
+        """Секції БД з межами періоду та кількістю подій (з таблиці лічильників)"""
+        if not self.partitioning:
+            return []
+        
+        cursor = self.get_connection().execute('''
+            SELECT p.name, p.start_ts, p.end_ts,
+                   (SELECT COALESCE(SUM(count), 0) FROM EventCounters ec
+                    WHERE ec.day >= substr(p.start_ts, 1, 10) AND ec.day < substr(p.end_ts, 1, 10)) as events
+            FROM Partitions p
+            ORDER BY p.start_ts
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def drop_partitions_before(self, cutoff: datetime) -> List[str]:
+        """Політика зберігання: видалити секції, що повністю старші за cutoff.
+
+        Секція видаляється цілком (DROP TABLE разом з індексами, тригерами та FTS-таблицею),
+        тож час не залежить від кількості подій у ній. Повертає назви видалених секцій.
+        """
+        if not self.partitioning:
+            raise ValueError("Видалення секцій доступне лише для секціонованої БД")
+        
+        with self.transaction() as conn:
+            cursor = conn.execute('SELECT name, start_ts, end_ts FROM Partitions WHERE end_ts <= ? ORDER BY start_ts',
+                                  (cutoff.isoformat(),))
+            partitions = cursor.fetchall()
+            
+            for partition in partitions:
+                self._drop_partition(conn, partition['name'])
+                conn.execute('DELETE FROM EventCounters WHERE day >= ? AND day < ?',
+                             (partition['start_ts'][:10], partition['end_ts'][:10]))
+                # Межі секцій вирівняні по днях, тож зведення періоду видаляються цілими інтервалами
+                for _, table, key_length, _ in ROLLUP_LEVELS:
+                    conn.execute(f'DELETE FROM {table} WHERE bucket >= ? AND bucket < ?',
+                                 (partition['start_ts'][:key_length], partition['end_ts'][:key_length]))
+                for table in ('HeavyHitters', 'HeavyHitterWindows', 'DistinctSketches'):
+                    conn.execute(f'DELETE FROM {table} WHERE hour >= ? AND hour < ?',
+                                 (partition['start_ts'][:13], partition['end_ts'][:13]))
+        
+        return [partition['name'] for partition in partitions]
+    
+    def _drop_partition(self, conn, name: str):
+        """Видалити таблицю секції з FTS-таблицею та запис у Partitions (зведення й лічильники не змінюються)"""
+        conn.execute(f'DROP TABLE IF EXISTS {self._fts_table(name)}')
+        conn.execute(f'DROP TABLE {name}')
+        conn.execute('DELETE FROM Partitions WHERE name = ?', (name,))
+        self._partitions.discard(name)
+    
+    def _archive_directory(self) -> str:
+        """Каталог архіву за замовчуванням: поруч з файлом БД (events.db -> events_archive)"""
+        return os.path.splitext(os.path.abspath(self.db_path))[0] + '_archive'
+    
+    def archive_events_before(self, cutoff: datetime, directory: Optional[str] = None,
+                              chunk_rows: int = ARCHIVE_CHUNK_ROWS) -> Dict[str, Any]:
+        """Перенести події, старші за cutoff, у колонковий архів на диску (файли по chunk_rows подій).
+
+        Файли архіву записуються до зміни БД, а реєстрація файлів у ArchiveChunks і видалення
+        подій виконуються однією транзакцією, тож після збою подія є або в БД, або в архіві.
+        У секціонованій БД архівуються та видаляються (DROP TABLE) лише секції, повністю
+        старші за cutoff. Архівування - не політика зберігання: лічильники, зведення та скетчі
+        за архівований період не змінюються, тож --stats і --summary рахують і архівовані події.
+        Повертає кількість файлів (chunks), подій (events) та байт (bytes).
+        """
+        if self.compact:
+            raise ValueError("Архів подій не підтримує компактний формат")
+        
+        directory = directory or self._archive_directory()
+        os.makedirs(directory, exist_ok=True)
+        conn = self.get_connection()
+        # Події, вставлені під час архівування, не видаляються без запису в архів
+        if self.partitioning:
+            max_id = conn.execute("SELECT value - 1 FROM Settings WHERE key = 'next_event_id'").fetchone()[0]
+        else:
+            max_id = conn.execute('SELECT MAX(id) FROM SecurityEvents').fetchone()[0] or 0
+        if self.partitioning:
+            cursor = conn.execute('SELECT name FROM Partitions WHERE end_ts <= ? ORDER BY start_ts',
+                                  (cutoff.isoformat(),))
+            tables = [row['name'] for row in cursor.fetchall()]
+        else:
+            tables = ['SecurityEvents']
+        
+        chunks = []
+        for table in tables:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(f'''
+                SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {table}
+                WHERE timestamp < ? AND id <= ?
+                ORDER BY timestamp, id
+            ''', (cutoff.isoformat(), max_id))
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                chunks.append(self._write_archive_chunk(directory, rows))
+        
+        with self.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO ArchiveChunks (path, start_ts, end_ts, rows, size) VALUES (?, ?, ?, ?, ?)
+            ''', chunks)
+            for table in tables:
+                # Секція, у яку після читання max_id вставили нові події, не видаляється цілком:
+                # з неї видаляються лише заархівовані рядки
+                if self.partitioning and conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0] <= max_id:
+                    self._drop_partition(conn, table)
+                else:
+                    self._delete_archived_rows(conn, table, cutoff, max_id)
+        
+        return {'chunks': len(chunks), 'events': sum(chunk[3] for chunk in chunks),
+                'bytes': sum(chunk[4] for chunk in chunks), 'directory': directory}
+    
+    def _delete_archived_rows(self, conn, table: str, cutoff: datetime, max_id: int):
+        """Видалити з таблиці подій заархівовані рядки, не змінюючи лічильників і зведень.
+
+        Тригери лічильників і зведень на видалення знімаються на час DELETE і створюються
+        знову в тій самій транзакції (FTS-індекс оновлюється як звичайно).
+        """
+        conn.execute(f'DROP TRIGGER IF EXISTS {table}_counters_delete')
+        conn.execute(f'DROP TRIGGER IF EXISTS {table}_rollup_delete')
+        conn.execute(f'DELETE FROM {table} WHERE timestamp < ? AND id <= ?', (cutoff.isoformat(), max_id))
+        cursor = conn.cursor()
+        self._create_counter_triggers(cursor, table)
+        self._create_rollup_triggers(cursor, table)
+    
+    def _write_archive_chunk(self, directory: str, rows: List[tuple]) -> Tuple[str, str, str, int, int]:
+        """Записати пакет подій у файл архіву; повертає рядок для ArchiveChunks"""
+        ids, timestamps, source_ids, event_type_ids, messages, ip_addresses, usernames = zip(*rows)
+        encoded = [encode_timestamp(datetime.fromisoformat(timestamp)) for timestamp in timestamps]
+        path = os.path.join(directory, f"events_{decode_timestamp(encoded[0])[:10].replace('-', '')}_{ids[0]}"
+                                       f"{ARCHIVE_SUFFIX}")
+        size = write_chunk(path, {
+            'id': ('int-delta', ids),
+            'timestamp': ('int-delta', encoded),
+            'source_id': ('int', source_ids),
+            'event_type_id': ('int', event_type_ids),
+            'message': ('text', messages),
+            'ip_address': ('text', ip_addresses),
+            'username': ('text', usernames),
+        })
+        # Шляхи зберігаються відносно каталогу БД, щоб БД з архівом можна було перенести
+        relative = os.path.relpath(path, os.path.dirname(os.path.abspath(self.db_path)))
+        return relative, decode_timestamp(min(encoded)), decode_timestamp(max(encoded)), len(rows), size
+    
+    def get_archive_chunks(self) -> List[Dict[str, Any]]:
+        """Файли архіву з часом найранішої та найпізнішої події, кількістю подій і розміром"""
+        cursor = self.get_connection().execute('''
+            SELECT path, start_ts, end_ts, rows, size FROM ArchiveChunks ORDER BY start_ts
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def _archive_files(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Tuple[str, str]]:
+        """Файли архіву (шлях, час найпізнішої події), проміжок часу подій яких перетинається з [start, end),
+        від найновіших"""
+        start_ts = start.isoformat() if start else None
+        end_ts = end.isoformat() if end else None
+        cursor = self.get_connection().execute('''
+            SELECT path, end_ts FROM ArchiveChunks
+            WHERE (? IS NULL OR end_ts >= ?) AND (? IS NULL OR start_ts < ?)
+            ORDER BY end_ts DESC
+        ''', (start_ts, start_ts, end_ts, end_ts))
+        base = os.path.dirname(os.path.abspath(self.db_path))
+        return [(os.path.join(base, row['path']), row['end_ts']) for row in cursor.fetchall()]
+    
+    def _load_archived_events(self, start: Optional[datetime], end: Optional[datetime],
+                              filters: Iterable[Tuple[str, str, Any]] = (),
+                              newest: Optional[int] = None) -> Optional[ArchivedMatches]:
+        """Завантажити з архіву події [start, end), що проходять filters, у нову тимчасову таблицю.
+
+        Файли відбираються за часом з ArchiveChunks без відкриття, а з файлів читаються
+        лише колонки фільтрів і, за наявності збігів, решта колонок. Рядки передаються в
+        таблицю потоком, без списку в пам'яті. newest - завантажити лише newest найновіших
+        збігів (для сторінки, упорядкованої за спаданням часу, досить offset + limit): файли
+        читаються від найновіших і перебір зупиняється, щойно решта файлів старша за відібране.
+        Таблиця своя для кожного запиту, тож одночасно відкриті iter_* не заважають одне
+        одному; після виконання запиту її звільняє _release_archive_table. None - в архіві
+        немає файлів за цей час.
+        """
+        if self.compact:
+            return None
+        files = self._archive_files(start, end)
+        if not files:
+            return None
+        
+        time_range = (encode_timestamp(start) if start else None, encode_timestamp(end) if end else None)
+        filters = [('timestamp', 'range', time_range), *filters]
+        paths = [path for path, _ in files]
+        if newest is None:
+            matches = scan_chunks(paths, ARCHIVE_COLUMNS, filters)
+        else:
+            matches = self._newest_archived(files, filters, newest)
+        rows = ((event_id, decode_timestamp(timestamp), *rest, None) for event_id, timestamp, *rest in matches)
+        
+        table, loaded = None, 0
+        first = next(rows, None)
+        if first is not None:
+            table = f'ArchivedEvents{next(self._archive_table_ids)}'
+            with self.transaction() as conn:
+                conn.execute(f"CREATE TEMP TABLE {table} ({', '.join(EVENT_COLUMNS)})")
+                loaded = conn.executemany(f"INSERT INTO temp.{table} VALUES ({', '.join('?' * len(EVENT_COLUMNS))})",
+                                          itertools.chain([first], rows)).rowcount
+        return ArchivedMatches(table, paths, filters, loaded, newest is None)
+    
+    def _newest_archived(self, files: List[Tuple[str, str]], filters: List[Tuple[str, str, Any]],
+                         newest: int) -> List[tuple]:
+        """newest найновіших (за часом, потім id) рядків архіву, що проходять filters"""
+        if newest <= 0:
+            return []
+        heap = []
+        for path, end_ts in files:
+            # Файли впорядковані за спаданням найпізнішого часу: решта не містить новіших подій
+            if len(heap) == newest and encode_timestamp(datetime.fromisoformat(end_ts)) <= heap[0][0]:
+                break
+            # Файл записано впорядкованим за часом, тож з кожного досить останніх newest збігів
+            for row in scan_chunks([path], ARCHIVE_COLUMNS, filters, tail=newest):
+                entry = (row[1], row[0], row)
+                if len(heap) < newest:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        return [row for _, _, row in heap]
+    
+    def _release_archive_table(self, archived: Optional[ArchivedMatches]):
+        """Видалити тимчасову таблицю архівних подій виконаного запиту.
+
+        Поки на з'єднанні читає інший курсор (незавершений iter_*), SQLite не дозволяє
+        DROP TABLE - тоді таблиця видаляється при наступному звільненні.
+        """
+        conn = self.get_connection()
+        stale = self._local.stale_archive_tables
+        if archived and archived.table:
+            stale.append(archived.table)
+        while stale:
+            try:
+                conn.execute(f'DROP TABLE IF EXISTS temp.{stale[-1]}')
+            except sqlite3.OperationalError:
+                break
+            stale.pop()
+    
+    @staticmethod
+    def _with_archive(source: str, archived: Optional[ArchivedMatches]) -> str:
+        """Джерело подій для FROM, доповнене завантаженими архівними подіями"""
+        if not archived or not archived.table:
+            return source
+        columns = ', '.join(EVENT_COLUMNS)
+        return f'(SELECT {columns} FROM {source} UNION ALL SELECT {columns} FROM temp.{archived.table})'
+    
+    def _create_compact_tables(self, cursor):
+        """Створення таблиць компактного формату"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS MessageTemplates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                template TEXT UNIQUE NOT NULL
+            )
+        ''')
+        
+        # timestamp - мікросекунди від 1970-01-01, ip_address - INTEGER (IPv4) або BLOB (IPv6),
+        # повідомлення - посилання на шаблон + числові параметри
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS SecurityEvents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                source_id INTEGER NOT NULL,
+                event_type_id INTEGER NOT NULL,
+                template_id INTEGER NOT NULL,
+                message_params TEXT,
+                ip_address,
+                username TEXT,
+                content_hash INTEGER,
+                FOREIGN KEY (source_id) REFERENCES EventSources (id),
+                FOREIGN KEY (event_type_id) REFERENCES EventTypes (id),
+                FOREIGN KEY (template_id) REFERENCES MessageTemplates (id)
+            )
+        ''')
+        
+        # Декодоване текстове подання подій (джерело вмісту для FTS-індексу)
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS SecurityEventsText AS
+            SELECT se.id AS id, join_message(mt.template, se.message_params) AS message,
+                   se.username AS username, decode_ip(se.ip_address) AS ip_address
+            FROM SecurityEvents se
+            JOIN MessageTemplates mt ON mt.id = se.template_id
+        ''')
+    
+    def _day_expr(self, column: str) -> str:
+        """SQL-вираз дня (YYYY-MM-DD) для колонки часу в поточному форматі"""
+        if self.compact:
+            return f"date({column} / 1000000, 'unixepoch')"
+        return f"substr({column}, 1, 10)"
+    
+    def _message_expr(self, alias: str = 'se') -> str:
+        """SQL-вираз тексту повідомлення"""
+        if self.compact:
+            return (f"(SELECT join_message(template, {alias}.message_params) "
+                    f"FROM MessageTemplates WHERE id = {alias}.template_id)")
+        return f"{alias}.message"
+    
+    def _event_columns(self, alias: str = 'se') -> str:
+        """Колонки події для SELECT (у компактному форматі - декодовані до звичайного вигляду)"""
+        if not self.compact:
+            return f"{alias}.*"
+        return (f"{alias}.id, decode_timestamp({alias}.timestamp) as timestamp, {alias}.source_id, "
+                f"{alias}.event_type_id, {self._message_expr(alias)} as message, "
+                f"decode_ip({alias}.ip_address) as ip_address, {alias}.username, {alias}.content_hash")
+    
+    def _decoded(self, expr: str, decoder: str) -> str:
+        """Обгорнути SQL-вираз функцією декодування (лише в компактному форматі)"""
+        return f"{decoder}({expr})" if self.compact else expr
+    
+    def _time_param(self, timestamp: datetime) -> Union[str, int]:
+        """Значення часу для параметра запиту в поточному форматі"""
+        return encode_timestamp(timestamp) if self.compact else timestamp.isoformat()
+    
+    def _init_event_counters(self, cursor):
+        """Створення таблиці лічильників подій (джерело, тип, день) та тригерів для її оновлення"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'EventCounters'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS EventCounters (
+                source_id INTEGER NOT NULL,
+                event_type_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source_id, event_type_id, day)
+            ) WITHOUT ROWID
+        ''')
+        
+        # У секціонованій БД тригери створюються для кожної секції
+        if self.partitioning:
+            return
+        
+        self._create_counter_triggers(cursor, 'SecurityEvents')
+        
+        # Міграція існуючої БД: рахуємо події, записані до появи лічильників
+        if not exists:
+            cursor.execute(f'''
+                INSERT INTO EventCounters (source_id, event_type_id, day, count)
+                SELECT source_id, event_type_id, {self._day_expr('timestamp')}, COUNT(*)
+                FROM SecurityEvents
+                GROUP BY source_id, event_type_id, {self._day_expr('timestamp')}
+            ''')
+    
+    def _create_counter_triggers(self, cursor, table: str):
+        """Тригери оновлення лічильників подій для таблиці подій"""
+        new_day, old_day = self._day_expr('new.timestamp'), self._day_expr('old.timestamp')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_counters_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO EventCounters (source_id, event_type_id, day, count)
+                VALUES (new.source_id, new.event_type_id, {new_day}, 1)
+                ON CONFLICT (source_id, event_type_id, day) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_counters_delete AFTER DELETE ON {table} BEGIN
+                UPDATE EventCounters SET count = count - 1
+                WHERE source_id = old.source_id AND event_type_id = old.event_type_id
+                AND day = {old_day};
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_counters_update
+            AFTER UPDATE OF source_id, event_type_id, timestamp ON {table} BEGIN
+                UPDATE EventCounters SET count = count - 1
+                WHERE source_id = old.source_id AND event_type_id = old.event_type_id
+                AND day = {old_day};
+                INSERT INTO EventCounters (source_id, event_type_id, day, count)
+                VALUES (new.source_id, new.event_type_id, {new_day}, 1)
+                ON CONFLICT (source_id, event_type_id, day) DO UPDATE SET count = count + 1;
+            END
+        ''')
+    
+    def _minute_expr(self, column: str) -> str:
+        """SQL-вираз хвилини (YYYY-MM-DDTHH:MM) для колонки часу в поточному форматі"""
+        if self.compact:
+            return f"strftime('%Y-%m-%dT%H:%M', {column} / 1000000, 'unixepoch')"
+        return f"substr({column}, 1, 16)"
+    
+    def _init_rollups(self, cursor):
+        """Створення зведених таблиць (день, година, хвилина) та тригерів оновлення хвилинних зведень.
+
+        Вставка подій оновлює лише RollupMinute і позначає годину в RollupDirtyHours;
+        годинні та денні зведення перераховуються з дрібніших у compact_rollups.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'RollupMinute'")
+        exists = cursor.fetchone() is not None
+        
+        # Подія без IP зберігається з ip_address = '' (колонки первинного ключа не можуть бути NULL)
+        for _, table, _, _ in ROLLUP_LEVELS:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT NOT NULL,
+                    source_id INTEGER NOT NULL,
+                    event_type_id INTEGER NOT NULL,
+                    ip_address TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket, source_id, event_type_id, ip_address)
+                ) WITHOUT ROWID
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS RollupDirtyHours (
+                hour TEXT PRIMARY KEY
+            ) WITHOUT ROWID
+        ''')
+        
+        if self.partitioning:
+            cursor.execute('SELECT name FROM Partitions')
+            for row in cursor.fetchall():
+                self._create_rollup_triggers(cursor, row['name'])
+        else:
+            self._create_rollup_triggers(cursor, 'SecurityEvents')
+        
+        # Міграція існуючої БД: зводимо події, записані до появи зведень
+        if not exists:
+            cursor.execute(f'''
+                INSERT INTO RollupMinute (bucket, source_id, event_type_id, ip_address, count)
+                SELECT {self._minute_expr('timestamp')}, source_id, event_type_id,
+                       COALESCE({self._decoded('ip_address', 'decode_ip')}, ''), COUNT(*)
+                FROM {self._events_source()}
+                GROUP BY 1, 2, 3, 4
+            ''')
+            cursor.execute('INSERT INTO RollupDirtyHours (hour) SELECT DISTINCT substr(bucket, 1, 13) FROM RollupMinute')
+    
+    def _create_rollup_triggers(self, cursor, table: str):
+        """Тригери оновлення хвилинних зведень для таблиці подій"""
+        ip = "COALESCE(decode_ip({}.ip_address), '')" if self.compact else "COALESCE({}.ip_address, '')"
+        new_minute, old_minute = self._minute_expr('new.timestamp'), self._minute_expr('old.timestamp')
+        increment = f'''
+                INSERT INTO RollupMinute (bucket, source_id, event_type_id, ip_address, count)
+                VALUES ({new_minute}, new.source_id, new.event_type_id, {ip.format('new')}, 1)
+                ON CONFLICT (bucket, source_id, event_type_id, ip_address) DO UPDATE SET count = count + 1;
+                INSERT OR IGNORE INTO RollupDirtyHours (hour) VALUES (substr({new_minute}, 1, 13));'''
+        decrement = f'''
+                UPDATE RollupMinute SET count = count - 1
+                WHERE bucket = {old_minute} AND source_id = old.source_id
+                AND event_type_id = old.event_type_id AND ip_address = {ip.format('old')};
+                INSERT OR IGNORE INTO RollupDirtyHours (hour) VALUES (substr({old_minute}, 1, 13));'''
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table} BEGIN{increment}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_delete AFTER DELETE ON {table} BEGIN{decrement}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup_update
+            AFTER UPDATE OF source_id, event_type_id, timestamp, ip_address ON {table} BEGIN{decrement}{increment}
+            END
+        ''')
+    
+    def _init_fulltext_index(self, cursor, table: str, fts_table: str) -> bool:
+        """Створення FTS5-індексу (триграми) над message/username/ip_address та тригерів синхронізації"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+        exists = cursor.fetchone() is not None
+        
+        # У компактному форматі індексується декодований текст (VIEW SecurityEventsText)
+        content = 'SecurityEventsText' if self.compact else table
+        try:
+            # Триграмний токенізатор обслуговує і MATCH, і LIKE '%слово%'
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                    message, username, ip_address,
+                    content='{content}', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite зібрано без FTS5 (або без триграм) - пошук працює через LIKE
+            return False
+        
+        new_values = (f"new.id, {self._message_expr('new')}, new.username, "
+                      f"{'decode_ip(new.ip_address)' if self.compact else 'new.ip_address'}")
+        old_values = (f"old.id, {self._message_expr('old')}, old.username, "
+                      f"{'decode_ip(old.ip_address)' if self.compact else 'old.ip_address'}")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, message, username, ip_address)
+                VALUES ({new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, message, username, ip_address)
+                VALUES ('delete', {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, message, username, ip_address)
+                VALUES ('delete', {old_values});
+                INSERT INTO {fts_table} (rowid, message, username, ip_address)
+                VALUES ({new_values});
+            END
+        ''')
+        
+        # Міграція існуючої БД: індексуємо події, записані до появи FTS-таблиці
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        
+        return True
     
     def populate_initial_data(self):
         """Заповнення початковими даними"""
@@ -101,12 +1129,11 @@ class SecurityEventsDB:
             ''', event_sources)
         
         # Перевіряємо, чи є дані в SecurityEvents
-        cursor.execute("SELECT COUNT(*) FROM SecurityEvents")
+        cursor.execute(f"SELECT COUNT(*) FROM {self._events_source()}")
         if cursor.fetchone()[0] == 0:
             self._insert_test_events(cursor)
         
         conn.commit()
-        conn.close()
     
     def _insert_test_events(self, cursor):
         """Вставка тестових подій безпеки"""
@@ -154,56 +1181,101 @@ class SecurityEventsDB:
                 username = random.choice(['user2', 'workstation1', None])
             
             test_events.append((
-                timestamp.isoformat(),
                 source_id,
                 event_type_id,
                 message,
                 ip_address,
-                username
+                username,
+                timestamp
             ))
         
-        cursor.executemany('''
-            INSERT INTO SecurityEvents (timestamp, source_id, event_type_id, message, ip_address, username)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', test_events)
+        self._insert_events(cursor, test_events)
     
     def register_event_source(self, name: str, location: str, source_type: str) -> int:
         """Реєстрація нового джерела подій"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO EventSources (name, location, type) VALUES (?, ?, ?)
-            ''', (name, location, source_type))
-            
-            source_id = cursor.lastrowid
-            conn.commit()
-            return source_id
+            with self.transaction() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO EventSources (name, location, type) VALUES (?, ?, ?)
+                ''', (name, location, source_type))
+                
+                return cursor.lastrowid
             
         except sqlite3.IntegrityError:
             raise ValueError(f"Джерело з назвою '{name}' вже існує")
-        finally:
-            conn.close()
     
     def register_event_type(self, type_name: str, severity: str) -> int:
         """Реєстрація нового типу подій"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO EventTypes (type_name, severity) VALUES (?, ?)
-            ''', (type_name, severity))
-            
-            type_id = cursor.lastrowid
-            conn.commit()
-            return type_id
+            with self.transaction() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO EventTypes (type_name, severity) VALUES (?, ?)
+                ''', (type_name, severity))
+                
+                return cursor.lastrowid
             
         except sqlite3.IntegrityError:
             raise ValueError(f"Тип події '{type_name}' вже існує")
-        finally:
-            conn.close()
+    
+    def get_source_log_format(self, source_id: int) -> Optional[str]:
+        """Отримати збережений формат дати логів джерела"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT log_format FROM EventSources WHERE id = ?', (source_id,))
+        row = cursor.fetchone()
+        return row['log_format'] if row else None
+    
+    def set_source_log_format(self, source_id: int, log_format: Optional[str]):
+        """Зберегти формат дати логів джерела"""
+        with self.transaction() as conn:
+            conn.execute('UPDATE EventSources SET log_format = ? WHERE id = ?', (log_format, source_id))
+    
+    def get_imported_file(self, source_id: int, sha256: str) -> Optional[Dict[str, Any]]:
+        """Запис про вже імпортований для джерела файл з таким SHA-256 (None - не імпортувався)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM ImportedFiles WHERE source_id = ? AND sha256 = ?', (source_id, sha256))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def record_imported_file(self, source_id: int, sha256: str, file_path: str, size: int, events: Optional[int]):
+        """Зберегти SHA-256 повністю імпортованого файлу (events=None - файл імпортовано разом з іншими)"""
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO ImportedFiles (source_id, sha256, file_path, size, events, imported_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (source_id, sha256, file_path, size, events, datetime.now().isoformat()))
+    
+    def get_follow_checkpoint(self, source_id: int) -> Optional[Dict[str, Any]]:
+        """Контрольна точка стеження за файлом джерела: path, inode, offset (None - стеження не було)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT follow_path, follow_inode, follow_offset FROM EventSources WHERE id = ?',
+                       (source_id,))
+        row = cursor.fetchone()
+        if not row or row['follow_path'] is None:
+            return None
+        return {'path': row['follow_path'], 'inode': row['follow_inode'], 'offset': row['follow_offset']}
+    
+    def log_followed_events(self, source_id: int,
+                            events: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                            file_path: str, inode: Optional[int], offset: int) -> int:
+        """Записати пакет подій з файлу разом з контрольною точкою джерела в одній транзакції.
+
+        Після перезапуску читання продовжується з offset без втрат і дублікатів.
+        Повертає кількість записаних подій.
+        """
+        inserted = []
+        with self.transaction() as conn:
+            if events:
+                inserted = self._insert_events(conn, events)
+            conn.execute('''
+                UPDATE EventSources SET follow_path = ?, follow_inode = ?, follow_offset = ? WHERE id = ?
+            ''', (file_path, inode, offset, source_id))
+        return len(inserted)
     
     def log_security_event(self, source_id: int, event_type_id: int, message: str, 
                           ip_address: Optional[str] = None, username: Optional[str] = None,
@@ -212,110 +1284,959 @@ class SecurityEventsDB:
         if timestamp is None:
             timestamp = datetime.now()
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            self._insert_events(conn, [(source_id, event_type_id, message, ip_address, username, timestamp)])
+            # cursor.lastrowid після executemany не заповнюється; у секціях id явний, але це теж rowid
+            return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    
+    def _insert_events(self, conn, events: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                       hashes: Optional[List[int]] = None) -> List[Tuple[int, int, str, Optional[str], Optional[str], datetime]]:
+        """Вставка пакета подій у поточному форматі БД (виклик усередині транзакції).
+
+        hashes - хеші вмісту подій (content_hash): події з уже відомим хешем пропускаються.
+        Повертає вставлені події (без пропущених дублікатів).
+        """
+        total = len(events)
+        with METRICS.timer(_INSERT_SECONDS, histogram=True):
+            if hashes is not None:
+                events, hashes = self._new_events(conn, events, hashes)
+            if events:
+                self._insert_event_rows(conn, events, hashes)
+        if METRICS.enabled:
+            METRICS.inc(_ROWS_INSERTED, len(events))
+            METRICS.inc(_ROWS_DUPLICATE, total - len(events))
+        return events
+    
+    def _new_events(self, conn, events: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                    hashes: List[int]) -> Tuple[List[Tuple[int, int, str, Optional[str], Optional[str], datetime]], List[int]]:
+        """Відкинути події, чий хеш уже є в БД або повторюється в пакеті.
+
+        Так виклик знає, які саме події буде вставлено (для лічильників і детекторів), а ON CONFLICT
+        лишається лише запобіжником.
+        """
+        if self.partitioning:
+            # Хеш включає час події, тож шукати треба лише в секціях періоду пакета
+            timestamps = [event[5] for event in events]
+            tables = self._partitions_between(min(timestamps), max(timestamps) + timedelta(microseconds=1))
+        else:
+            tables = ['SecurityEvents']
         
-        try:
-            cursor.execute('''
-                INSERT INTO SecurityEvents (timestamp, source_id, event_type_id, message, ip_address, username)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (timestamp.isoformat(), source_id, event_type_id, message, ip_address, username))
+        seen = set()
+        unique = sorted(set(hashes))
+        for table in tables:
+            for start in range(0, len(unique), HASH_LOOKUP_CHUNK):
+                chunk = unique[start:start + HASH_LOOKUP_CHUNK]
+                cursor = conn.execute(f'''
+                    SELECT content_hash FROM {table} WHERE content_hash IN ({', '.join('?' * len(chunk))})
+                ''', chunk)
+                seen.update(row[0] for row in cursor.fetchall())
+        
+        new_events = []
+        new_hashes = []
+        for event, event_hash in zip(events, hashes):
+            if event_hash not in seen:
+                seen.add(event_hash)
+                new_events.append(event)
+                new_hashes.append(event_hash)
+        return new_events, new_hashes
+    
+    def _insert_event_rows(self, conn, events: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                           hashes: Optional[List[int]]) -> int:
+        """Вставка пакета подій у звичайну, компактну або секціоновану таблицю"""
+        # Без хешів конфлікт неможливий (NULL не потрапляє в унікальний індекс). ON CONFLICT
+        # пропускає лише відомі хеші - на відміну від OR IGNORE, хибний рядок (NOT NULL) не
+        # зникає мовчки, а відхиляє пакет
+        on_conflict = '' if hashes is None else 'ON CONFLICT DO NOTHING'
+        if hashes is None:
+            hashes = [None] * len(events)
+        
+        if self.partitioning:
+            return self._insert_partitioned_events(conn, events, hashes, on_conflict)
+        
+        if not self.compact:
+            cursor = conn.executemany(f'''
+                INSERT INTO SecurityEvents (timestamp, source_id, event_type_id, message, ip_address, username, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?) {on_conflict}
+            ''', [(timestamp.isoformat(), source_id, event_type_id, message, ip_address, username, event_hash)
+                  for (source_id, event_type_id, message, ip_address, username, timestamp), event_hash
+                  in zip(events, hashes)])
+        else:
+            rows = [(encode_timestamp(timestamp), source_id, event_type_id, *self._encode_message(conn, message),
+                     encode_ip(ip_address), username, event_hash)
+                    for (source_id, event_type_id, message, ip_address, username, timestamp), event_hash
+                    in zip(events, hashes)]
             
-            event_id = cursor.lastrowid
-            conn.commit()
-            return event_id
+            cursor = conn.executemany(f'''
+                INSERT INTO SecurityEvents (timestamp, source_id, event_type_id, template_id, message_params, ip_address,
+                                            username, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?) {on_conflict}
+            ''', rows)
+        
+        # rowcount не враховує рядки, вставлені тригерами (FTS, лічильники)
+        return cursor.rowcount
+    
+    def _insert_partitioned_events(self, conn, events: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                                   hashes: List[Optional[int]], on_conflict: str) -> int:
+        """Вставка пакета подій у секції за часом; ID виділяються одним оновленням лічильника"""
+        # UPDATE першим бере блокування на запис, тож паралельні записувачі не отримають ті самі ID
+        next_id = conn.execute('''
+            UPDATE Settings SET value = value + ? WHERE key = 'next_event_id' RETURNING value
+        ''', (len(events),)).fetchall()[0][0] - len(events)
+        
+        rows_by_partition = {}
+        for (source_id, event_type_id, message, ip_address, username, timestamp), event_hash in zip(events, hashes):
+            partition = self._ensure_partition(conn, timestamp)
+            rows_by_partition.setdefault(partition, []).append(
+                (next_id, timestamp.isoformat(), source_id, event_type_id, message, ip_address, username, event_hash))
+            next_id += 1
+        
+        # Хеш включає час події, тож дублікат завжди потрапляє в ту саму секцію
+        inserted = 0
+        for partition, rows in rows_by_partition.items():
+            inserted += conn.executemany(f'''
+                INSERT INTO {partition} (id, timestamp, source_id, event_type_id, message, ip_address, username, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?) {on_conflict}
+            ''', rows).rowcount
+        
+        return inserted
+    
+    def _encode_message(self, conn, message: str) -> Tuple[int, Optional[str]]:
+        """Повідомлення -> (ID шаблону, параметри) для компактного формату"""
+        template, params = split_message(message)
+        return self._get_template_id(conn, template), params
+    
+    def _get_template_id(self, conn, template: str) -> int:
+        """ID шаблону повідомлення (з кешу або з таблиці MessageTemplates, створюється за потреби)"""
+        template_id = self._template_ids.get(template)
+        if template_id is None:
+            conn.execute('INSERT OR IGNORE INTO MessageTemplates (template) VALUES (?)', (template,))
+            template_id = conn.execute('SELECT id FROM MessageTemplates WHERE template = ?', (template,)).fetchone()[0]
+            self._template_ids[template] = template_id
+        return template_id
+    
+    def log_security_events_bulk(self, events: Iterable[Tuple[int, int, str, Optional[str], Optional[str], Optional[datetime]]],
+                                 batch_size: int = DEFAULT_BATCH_SIZE, dedup: bool = False,
+                                 on_inserted: Optional[Callable[[List[Tuple[int, int, str, Optional[str], Optional[str], datetime]]], None]] = None
+                                 ) -> Dict[str, Any]:
+        """Масовий запис подій безпеки пакетами (одне з'єднання, одна транзакція на пакет).
+
+        Кожна подія - кортеж (source_id, event_type_id, message, ip_address, username, timestamp[, stream]).
+        dedup=True - ідемпотентний запис: події, вже записані раніше в цьому режимі
+        (той самий content_hash), пропускаються, тож повторний імпорт не створює дублікатів.
+        Однакові події нумеруються окремо в кожному stream (наприклад, файлі), тож номер
+        повтору не залежить від того, з якими іншими файлами злито потік.
+        Хибні рядки (ROW_ERRORS) пропускаються, решта пакета записується.
+        on_inserted викликається після фіксації кожного пакета зі списком справді вставлених
+        подій (без дублікатів і хибних рядків).
+        Повертає словник зі статистикою: inserted, duplicates, failed (пропущені хибні рядки),
+        errors (перші BULK_ERRORS_KEPT повідомлень про них), batches, elapsed, rows_per_sec.
+        Інша помилка (читання подій, БД) перериває запис з BulkInsertError, що містить
+        кількість уже зафіксованих подій.
+        """
+        if batch_size < 1:
+            raise ValueError("Розмір пакета має бути додатним числом")
+        
+        inserted = 0
+        total = 0
+        batches = 0
+        errors = []
+        batch = []
+        hashes = [] if dedup else None
+        # Лічильники повторів однакових подій за потоками
+        occurrences: Dict[Any, OccurrenceCounter] = {}
+        start = time.perf_counter()
+        
+        try:
+            for source_id, event_type_id, message, ip_address, username, timestamp, *stream in events:
+                if timestamp is None:
+                    timestamp = datetime.now()
+                batch.append((source_id, event_type_id, message, ip_address, username, timestamp))
+                
+                if dedup:
+                    event_hash = content_hash(source_id, timestamp, message)
+                    stream_key = stream[0] if stream else None
+                    counter = occurrences.get(stream_key)
+                    if counter is None:
+                        counter = occurrences[stream_key] = OccurrenceCounter()
+                    occurrence = counter.next(timestamp, event_hash)
+                    if occurrence:
+                        event_hash = content_hash(source_id, timestamp, message, occurrence)
+                    hashes.append(event_hash)
+                
+                if len(batch) >= batch_size:
+                    rows = self._insert_batch(batch, hashes, errors)
+                    inserted += len(rows)
+                    if on_inserted and rows:
+                        on_inserted(rows)
+                    total += len(batch)
+                    batches += 1
+                    batch = []
+                    hashes = [] if dedup else None
             
+            if batch:
+                rows = self._insert_batch(batch, hashes, errors)
+                inserted += len(rows)
+                if on_inserted and rows:
+                    on_inserted(rows)
+                total += len(batch)
+                batches += 1
+        except Exception as e:
+            # Попередні пакети вже зафіксовані - повідомляємо, скільки саме
+            raise BulkInsertError(str(e), inserted) from e
+        
+        elapsed = time.perf_counter() - start
+        return {
+            'inserted': inserted,
+            'duplicates': total - inserted - len(errors),
+            'failed': len(errors),
+            'errors': [str(error) for error in errors[:BULK_ERRORS_KEPT]],
+            'batches': batches,
+            'elapsed': elapsed,
+            'rows_per_sec': total / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def _insert_batch(self, batch: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]],
+                      hashes: Optional[List[int]], errors: List[Exception]
+                      ) -> List[Tuple[int, int, str, Optional[str], Optional[str], datetime]]:
+        """Записати пакет в одній транзакції; повертає вставлені події.
+
+        Якщо пакет відхилено через хибний рядок (ROW_ERRORS), він записується повторно
+        по одному рядку, а помилки пропущених рядків додаються в errors.
+        """
+        try:
+            with self.transaction() as conn:  # Одна транзакція на пакет
+                inserted = self._insert_events(conn, batch, hashes)
+        except ROW_ERRORS:
+            inserted = []
+            for index, event in enumerate(batch):
+                try:
+                    with self.transaction() as conn:
+                        inserted += self._insert_events(conn, [event], None if hashes is None else [hashes[index]])
+                except ROW_ERRORS as e:
+                    errors.append(e)
+        return inserted
+    
+    def _get_event_type_ids(self, column: str, value: str) -> List[int]:
+        """ID типів подій за назвою або серйозністю (один запит до маленької таблиці замість JOIN на кожен рядок)"""
+        if column not in ('type_name', 'severity'):
+            raise ValueError("Пошук типів подій можливий лише за type_name або severity")
+        
+        cursor = self.get_connection().execute(f'SELECT id FROM EventTypes WHERE {column} = ?', (value,))
+        return [row['id'] for row in cursor.fetchall()]
+    
+    def _fetch_page(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Виконати запит і повернути сторінку рядків"""
+        try:
+            return self._page_rows(query, limit, offset)
         finally:
-            conn.close()
+            self._release_archive_table(query[4])
     
-    def get_failed_logins_24h(self) -> List[Dict[str, Any]]:
-        """Отримати всі події 'Login Failed' за останні 24 години"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _fetch_page_with_total(self, query: EventQuery, limit: Optional[int] = None,
+                               offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка рядків і загальна кількість результатів одного запиту"""
+        try:
+            rows = self._page_rows(query, limit, offset)
+            return rows, self._page_total(rows, limit, offset, lambda: self._count_rows(query))
+        finally:
+            self._release_archive_table(query[4])
+    
+    @staticmethod
+    def _page_total(rows: List[Dict[str, Any]], limit: Optional[int], offset: int, count: Callable[[], int]) -> int:
+        """Загальна кількість результатів для сторінки rows: неповна сторінка сама дає кількість,
+        і count() (COUNT) викликається лише для повної сторінки (або порожньої при ненульовому зсуві)"""
+        if limit is None or len(rows) < limit:
+            if rows or offset == 0:
+                return offset + len(rows)
+        return count()
+    
+    @staticmethod
+    def _page_end(limit: Optional[int], offset: int) -> Optional[int]:
+        """Скільки перших рядків результату потрібно для сторінки (None - усі)"""
+        return None if limit is None else offset + limit
+    
+    def _page_rows(self, query: EventQuery, limit: Optional[int], offset: int) -> List[Dict[str, Any]]:
+        """Рядки сторінки запиту (без звільнення таблиці архівних подій)"""
+        columns, body, params, order, _ = query
+        sql = f'SELECT {columns} {body} ORDER BY {order}'
+        if limit is not None or offset:
+            # LIMIT -1 - без обмеження кількості (лише пропуск offset рядків)
+            sql += ' LIMIT ? OFFSET ?'
+            params = (*params, -1 if limit is None else limit, offset)
         
+        cursor = self.get_connection().execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def _iter_query(self, query: EventQuery, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Виконати запит і віддавати рядки по одному (читаються з БД пакетами по batch_size)"""
+        columns, body, params, order, archived = query
+        cursor = None
+        try:
+            cursor = self.get_connection().execute(f'SELECT {columns} {body} ORDER BY {order}', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            # Незавершений курсор блокує DROP TABLE
+            if cursor is not None:
+                cursor.close()
+            self._release_archive_table(archived)
+    
+    def _count_query(self, query: EventQuery) -> int:
+        """Кількість рядків результату запиту (без читання самих рядків)"""
+        try:
+            return self._count_rows(query)
+        finally:
+            self._release_archive_table(query[4])
+    
+    def _count_rows(self, query: EventQuery) -> int:
+        """COUNT(*) результату запиту разом з незавантаженими архівними збігами (без звільнення
+        таблиці архівних подій)"""
+        _, body, params, _, archived = query
+        cursor = self.get_connection().execute(f'SELECT COUNT(*) FROM (SELECT 1 {body})', params)
+        return cursor.fetchone()[0] + (archived.rest() if archived else 0)
+    
+    def _failed_logins_query(self, newest: Optional[int] = None) -> EventQuery:
+        """Запит подій 'Login Failed' за останні 24 години (newest - скільки найновіших архівних
+        подій завантажити, None - усі)"""
         twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
+        type_ids = self._get_event_type_ids('type_name', 'Login Failed')
+        archived = self._load_archived_events(twenty_four_hours_ago, None, [('event_type_id', 'in', set(type_ids))],
+                                              newest)
         
-        cursor.execute('''
-            SELECT se.*, es.name as source_name, et.type_name, et.severity
-            FROM SecurityEvents se
+        return (
+            f"{self._event_columns()}, es.name as source_name, et.type_name, et.severity",
+            f'''
+            FROM {self._with_archive(self._events_source(twenty_four_hours_ago), archived)} se
             JOIN EventSources es ON se.source_id = es.id
             JOIN EventTypes et ON se.event_type_id = et.id
-            WHERE et.type_name = 'Login Failed' 
+            WHERE se.event_type_id IN ({','.join('?' * len(type_ids))})
             AND se.timestamp >= ?
-            ORDER BY se.timestamp DESC
-        ''', (twenty_four_hours_ago.isoformat(),))
-        
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+            ''',
+            (*type_ids, self._time_param(twenty_four_hours_ago)),
+            'se.timestamp DESC',
+            archived
+        )
     
-    def detect_brute_force_attacks(self) -> List[Dict[str, Any]]:
-        """Виявити IP-адреси з більше ніж 5 невдалих спроб входу за 1 годину"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    @timed('db_query_seconds', query='failed_logins')
+    def get_failed_logins_24h(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Отримати всі події 'Login Failed' за останні 24 години"""
+        return self._fetch_page(self._failed_logins_query(self._page_end(limit, offset)), limit, offset)
+    
+    @timed('db_query_seconds', query='failed_logins_page')
+    def page_failed_logins_24h(self, limit: Optional[int] = None,
+                               offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка подій 'Login Failed' за останні 24 години та їх загальна кількість"""
+        return self._fetch_page_with_total(self._failed_logins_query(self._page_end(limit, offset)), limit, offset)
+    
+    def iter_failed_logins_24h(self) -> Iterator[Dict[str, Any]]:
+        """Потоково перебрати події 'Login Failed' за останні 24 години"""
+        yield from self._iter_query(self._failed_logins_query())
+    
+    @timed('db_query_seconds', query='failed_logins_count')
+    def count_failed_logins_24h(self) -> int:
+        """Кількість подій 'Login Failed' за останні 24 години"""
+        return self._count_query(self._failed_logins_query(newest=0))
+    
+    def _brute_force_query(self) -> EventQuery:
+        """Запит IP-адрес з більше ніж 5 невдалих спроб входу за 1 годину"""
         one_hour_ago = datetime.now() - timedelta(hours=1)
+        type_ids = self._get_event_type_ids('type_name', 'Login Failed')
+        # Групування потребує всіх архівних подій вікна (вони передаються в таблицю потоком)
+        archived = self._load_archived_events(one_hour_ago, None, [('event_type_id', 'in', set(type_ids))])
         
-        cursor.execute('''
-            SELECT ip_address, COUNT(*) as failed_attempts,
-                   MIN(timestamp) as first_attempt,
-                   MAX(timestamp) as last_attempt
-            FROM SecurityEvents se
-            JOIN EventTypes et ON se.event_type_id = et.id
-            WHERE et.type_name = 'Login Failed'
+        return (
+            f'''{self._decoded('ip_address', 'decode_ip')} as ip_address, COUNT(*) as failed_attempts,
+                   {self._decoded('MIN(timestamp)', 'decode_timestamp')} as first_attempt,
+                   {self._decoded('MAX(timestamp)', 'decode_timestamp')} as last_attempt''',
+            f'''
+            FROM {self._with_archive(self._events_source(one_hour_ago), archived)} se
+            WHERE se.event_type_id IN ({','.join('?' * len(type_ids))})
             AND se.timestamp >= ?
             AND se.ip_address IS NOT NULL
             GROUP BY ip_address
             HAVING COUNT(*) > 5
-            ORDER BY failed_attempts DESC
-        ''', (one_hour_ago.isoformat(),))
-        
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+            ''',
+            (*type_ids, self._time_param(one_hour_ago)),
+            'failed_attempts DESC',
+            archived
+        )
     
-    def get_critical_events_week(self) -> List[Dict[str, Any]]:
-        """Отримати всі критичні події за останній тиждень, згруповані за джерелом"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    @timed('db_query_seconds', query='brute_force')
+    def detect_brute_force_attacks(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Виявити IP-адреси з більше ніж 5 невдалих спроб входу за 1 годину"""
+        return self._fetch_page(self._brute_force_query(), limit, offset)
+    
+    @timed('db_query_seconds', query='brute_force_page')
+    def page_brute_force_attacks(self, limit: Optional[int] = None,
+                                 offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка IP-адрес з більше ніж 5 невдалих спроб входу за 1 годину та їх загальна кількість"""
+        return self._fetch_page_with_total(self._brute_force_query(), limit, offset)
+    
+    def iter_brute_force_attacks(self) -> Iterator[Dict[str, Any]]:
+        """Потоково перебрати IP-адреси з більше ніж 5 невдалих спроб входу за 1 годину"""
+        yield from self._iter_query(self._brute_force_query())
+    
+    @timed('db_query_seconds', query='brute_force_count')
+    def count_brute_force_attacks(self) -> int:
+        """Кількість IP-адрес з більше ніж 5 невдалих спроб входу за 1 годину"""
+        return self._count_query(self._brute_force_query())
+    
+    def _critical_events_query(self) -> EventQuery:
+        """Запит критичних подій за останній тиждень, згрупованих за джерелом"""
         one_week_ago = datetime.now() - timedelta(weeks=1)
+        type_ids = self._get_event_type_ids('severity', 'Critical')
+        # Групування потребує всіх архівних подій тижня (вони передаються в таблицю потоком)
+        archived = self._load_archived_events(one_week_ago, None, [('event_type_id', 'in', set(type_ids))])
         
-        cursor.execute('''
-            SELECT es.name as source_name, es.location, es.type as source_type,
+        return (
+            f'''es.name as source_name, es.location, es.type as source_type,
                    COUNT(*) as critical_events_count,
-                   GROUP_CONCAT(se.message, '; ') as messages
-            FROM SecurityEvents se
+                   GROUP_CONCAT({self._message_expr()}, '; ') as messages''',
+            f'''
+            FROM {self._with_archive(self._events_source(one_week_ago), archived)} se
             JOIN EventSources es ON se.source_id = es.id
-            JOIN EventTypes et ON se.event_type_id = et.id
-            WHERE et.severity = 'Critical'
+            WHERE se.event_type_id IN ({','.join('?' * len(type_ids))})
             AND se.timestamp >= ?
             GROUP BY es.id, es.name, es.location, es.type
-            ORDER BY critical_events_count DESC
-        ''', (one_week_ago.isoformat(),))
+            ''',
+            (*type_ids, self._time_param(one_week_ago)),
+            'critical_events_count DESC',
+            archived
+        )
+    
+    @timed('db_query_seconds', query='critical_week')
+    def get_critical_events_week(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Отримати всі критичні події за останній тиждень, згруповані за джерелом"""
+        return self._fetch_page(self._critical_events_query(), limit, offset)
+    
+    @timed('db_query_seconds', query='critical_week_page')
+    def page_critical_events_week(self, limit: Optional[int] = None,
+                                  offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка джерел з критичними подіями за останній тиждень та їх загальна кількість"""
+        return self._fetch_page_with_total(self._critical_events_query(), limit, offset)
+    
+    def iter_critical_events_week(self) -> Iterator[Dict[str, Any]]:
+        """Потоково перебрати джерела з критичними подіями за останній тиждень"""
+        yield from self._iter_query(self._critical_events_query())
+    
+    @timed('db_query_seconds', query='critical_week_count')
+    def count_critical_events_week(self) -> int:
+        """Кількість джерел з критичними подіями за останній тиждень"""
+        return self._count_query(self._critical_events_query())
+    
+    def _keyword_query(self, keyword: str, newest: Optional[int] = None) -> EventQuery:
+        """Запит подій, що містять ключове слово у повідомленні (newest - скільки найновіших
+        архівних збігів завантажити, None - усі)"""
+        columns = f"{self._event_columns()}, es.name as source_name, et.type_name, et.severity"
+        tables = self._fulltext_tables() if self.fts_enabled and len(keyword) >= FTS_MIN_KEYWORD_LENGTH else []
+        # Той самий шаблон LIKE (з % та _ як символами підстановки) для БД і для архіву
+        pattern = f'%{keyword}%'
+        archived = self._load_archived_events(None, None, [('message', 'like', pattern)], newest)
         
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+        if tables:
+            # LIKE по триграмному FTS-індексу замість повного сканування SecurityEvents
+            # (у секціонованій БД - по індексу кожної секції)
+            matches = union_all([
+                f'SELECT se.* FROM {fts_table} fts JOIN {table} se ON se.id = fts.rowid WHERE fts.message LIKE ?'
+                for table, fts_table in tables])
+            if archived and archived.table:
+                matches += f" UNION ALL SELECT {', '.join(EVENT_COLUMNS)} FROM temp.{archived.table}"
+            body = f'''
+                FROM ({matches}) se
+                JOIN EventSources es ON se.source_id = es.id
+                JOIN EventTypes et ON se.event_type_id = et.id
+            '''
+            return columns, body, (pattern,) * len(tables), 'se.timestamp DESC', archived
+        
+        body = f'''
+            FROM {self._with_archive(self._events_source(), archived)} se
+            JOIN EventSources es ON se.source_id = es.id
+            JOIN EventTypes et ON se.event_type_id = et.id
+            WHERE {self._message_expr()} LIKE ?
+        '''
+        return columns, body, (pattern,), 'se.timestamp DESC', archived
     
-    def search_events_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+    @timed('db_query_seconds', query='keyword')
+    def search_events_by_keyword(self, keyword: str, limit: Optional[int] = None,
+                                 offset: int = 0) -> List[Dict[str, Any]]:
         """Знайти всі події, що містять певне ключове слово у повідомленні"""
+        return self._fetch_page(self._keyword_query(keyword, self._page_end(limit, offset)), limit, offset)
+    
+    @timed('db_query_seconds', query='keyword_page')
+    def page_events_by_keyword(self, keyword: str, limit: Optional[int] = None,
+                               offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка подій з ключовим словом у повідомленні та їх загальна кількість"""
+        return self._fetch_page_with_total(self._keyword_query(keyword, self._page_end(limit, offset)), limit, offset)
+    
+    def iter_events_by_keyword(self, keyword: str) -> Iterator[Dict[str, Any]]:
+        """Потоково перебрати події, що містять ключове слово у повідомленні"""
+        yield from self._iter_query(self._keyword_query(keyword))
+    
+    @timed('db_query_seconds', query='keyword_count')
+    def count_events_by_keyword(self, keyword: str) -> int:
+        """Кількість подій, що містять ключове слово у повідомленні"""
+        return self._count_query(self._keyword_query(keyword, newest=0))
+    
+    @timed('db_query_seconds', query='ranked')
+    def search_events_ranked(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT,
+                             offset: int = 0, order_by: str = 'rank') -> List[Dict[str, Any]]:
+        """Повнотекстовий пошук за message/username/ip_address з пагінацією.
+
+        order_by='rank' - за релевантністю (bm25, рахується для всіх збігів),
+        order_by='recent' - найновіші записи першими (FTS5 зупиняється після limit збігів).
+        """
+        if order_by not in ('rank', 'recent'):
+            raise ValueError("order_by має бути 'rank' або 'recent'")
+        
+        if not self.fts_enabled or len(query) < FTS_MIN_KEYWORD_LENGTH:
+            # Без FTS-індексу (або для коротких слів) - звичайний пошук за ключовим словом
+            return self.search_events_by_keyword(query, limit, offset)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT se.*, es.name as source_name, et.type_name, et.severity
-            FROM SecurityEvents se
+        phrase = self._fts_phrase(query)
+        
+        # rank (bm25) рахуємо лише коли за ним сортуємо - це дорого для частих слів
+        if order_by == 'rank':
+            rank_column, match_order, page_order = 'fts.rank', 'fts.rank', 'rank'
+        else:
+            rank_column, match_order, page_order = 'NULL', 'fts.rowid DESC', 'id DESC'
+        
+        tables = self._fulltext_tables()
+        if not tables:
+            return []
+        
+        # Спочатку сторінка rowid з FTS-індексу, потім JOIN лише для неї. У секціонованій БД
+        # кожна секція віддає не більше offset + limit найкращих збігів (bm25 - в межах секції)
+        matches = union_all([
+            f'SELECT se.*, page.rank as rank FROM ('
+            f'SELECT fts.rowid as event_id, {rank_column} as rank FROM {fts_table} fts '
+            f'WHERE {fts_table} MATCH ? ORDER BY {match_order} LIMIT ?'
+            f') page JOIN {table} se ON se.id = page.event_id'
+            for table, fts_table in tables])
+        cursor.execute(f'''
+            SELECT {self._event_columns()}, es.name as source_name, et.type_name, et.severity, se.rank as rank
+            FROM (
+                {matches}
+                ORDER BY {page_order}
+                LIMIT ? OFFSET ?
+            ) se
             JOIN EventSources es ON se.source_id = es.id
             JOIN EventTypes et ON se.event_type_id = et.id
-            WHERE se.message LIKE ?
-            ORDER BY se.timestamp DESC
-        ''', (f'%{keyword}%',))
+            ORDER BY se.{page_order}
+        ''', (phrase, offset + limit) * len(tables) + (limit, offset))
         
         results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return results
     
+    @timed('db_query_seconds', query='ranked_count')
+    def page_events_ranked(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0,
+                           order_by: str = 'rank') -> Tuple[List[Dict[str, Any]], int]:
+        """Сторінка повнотекстового пошуку та загальна кількість збігів"""
+        rows = self.search_events_ranked(query, limit, offset, order_by)
+        return rows, self._page_total(rows, limit, offset, lambda: self.count_events_ranked(query))
+    
+    def count_events_ranked(self, query: str) -> int:
+        """Кількість збігів повнотекстового пошуку (для підпису "та ще N" під сторінкою результатів)"""
+        if not self.fts_enabled or len(query) < FTS_MIN_KEYWORD_LENGTH:
+            return self.count_events_by_keyword(query)
+        
+        conn = self.get_connection()
+        phrase = self._fts_phrase(query)
+        return sum(conn.execute(f'SELECT COUNT(*) FROM {fts_table} WHERE {fts_table} MATCH ?', (phrase,)).fetchone()[0]
+                   for _, fts_table in self._fulltext_tables())
+    
+    def _fts_phrase(self, query: str) -> str:
+        """Запит як фраза FTS5: лапки екрануються подвоєнням"""
+        return '"' + query.replace('"', '""') + '"'
+    
+    def rebuild_fulltext_index(self):
+        """Перебудувати FTS-індекс з таблиці SecurityEvents (або індекси всіх секцій)"""
+        if not self.fts_enabled:
+            return
+        
+        with self.transaction() as conn:
+            for _, fts_table in self._fulltext_tables():
+                conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+    
+    def convert_to_compact(self, target_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+        """Скопіювати БД у новий файл компактного формату (ID джерел, типів та подій зберігаються).
+
+        Повертає словник: events, source_size, target_size (байти).
+        """
+        if os.path.exists(target_path):
+            raise ValueError(f"Файл '{target_path}' вже існує")
+        
+        target = SecurityEventsDB(target_path, compact=True, populate=False)
+        try:
+            conn = self.get_connection()
+            with target.transaction() as target_conn:
+                target_conn.executemany(
+                    'INSERT INTO EventTypes (id, type_name, severity) VALUES (?, ?, ?)',
+                    conn.execute('SELECT id, type_name, severity FROM EventTypes').fetchall())
+                columns = ', '.join(['id', 'name', 'location', 'type'] + [column for column, _ in SOURCE_COLUMNS])
+                target_conn.executemany(
+                    f'INSERT INTO EventSources ({columns}) VALUES ({", ".join("?" * (4 + len(SOURCE_COLUMNS)))})',
+                    conn.execute(f'SELECT {columns} FROM EventSources').fetchall())
+            
+            # Потокове копіювання подій пакетами в порядку id
+            cursor = conn.execute(f'SELECT {self._event_columns()} FROM {self._events_source()} se ORDER BY se.id')
+            copied = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                with target.transaction() as target_conn:
+                    target_conn.executemany('''
+                        INSERT INTO SecurityEvents (id, timestamp, source_id, event_type_id, template_id,
+                                                    message_params, ip_address, username, content_hash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [(row['id'], encode_timestamp(datetime.fromisoformat(row['timestamp'])),
+                           row['source_id'], row['event_type_id'],
+                           *target._encode_message(target_conn, row['message']),
+                           encode_ip(row['ip_address']), row['username'], row['content_hash']) for row in rows])
+                copied += len(rows)
+            
+            target.get_connection().execute('VACUUM')
+        finally:
+            target.close()
+        
+        return {
+            'events': copied,
+            'source_size': os.path.getsize(self.db_path),
+            'target_size': os.path.getsize(target_path)
+        }
+    
+    def compact_rollups(self) -> int:
+        """Перерахувати годинні та денні зведення для годин, хвилинні зведення яких змінились.
+
+        Перераховуються лише позначені години (і їхні дні), тож виклик дешевий і його можна
+        робити періодично у фоні. Повертає кількість перерахованих годин.
+        """
+        conn = self.get_connection()
+        if conn.execute('SELECT 1 FROM RollupDirtyHours LIMIT 1').fetchone() is None:
+            return 0
+        
+        with self.transaction() as conn:
+            # DELETE першим бере блокування на запис: години, позначені паралельним імпортом
+            # після цього, дочекаються наступного ущільнення
+            hours = [row[0] for row in conn.execute('DELETE FROM RollupDirtyHours RETURNING hour').fetchall()]
+            
+            # Ключ години 'YYYY-MM-DDTHH' - хвилини від 'HH:' до 'HH;', години дня - від 'DDT' до 'DDU'
+            for target, source, buckets, suffixes in (
+                    ('RollupHour', 'RollupMinute', sorted(hours), (':', ';')),
+                    ('RollupDay', 'RollupHour', sorted({hour[:10] for hour in hours}), ('T', 'U'))):
+                for bucket in buckets:
+                    conn.execute(f'DELETE FROM {target} WHERE bucket = ?', (bucket,))
+                    conn.execute(f'''
+                        INSERT INTO {target} (bucket, source_id, event_type_id, ip_address, count)
+                        SELECT ?, source_id, event_type_id, ip_address, SUM(count)
+                        FROM {source}
+                        WHERE bucket >= ? AND bucket < ?
+                        GROUP BY source_id, event_type_id, ip_address
+                        HAVING SUM(count) > 0
+                    ''', (bucket, bucket + suffixes[0], bucket + suffixes[1]))
+        
+        return len(hours)
+    
+    def _rollup_plan(self, start: datetime, end: datetime,
+                     level_index: int = 0) -> List[Tuple[str, datetime, datetime]]:
+        """Розбити [start, end) на відрізки (рівень, початок, кінець): найбільші цілі дні,
+        потім години та хвилини на краях, і 'raw' для неповних хвилин"""
+        if start >= end:
+            return []
+        if level_index == len(ROLLUP_LEVELS):
+            return [('raw', start, end)]
+        
+        level, _, _, step = ROLLUP_LEVELS[level_index]
+        if level == 'day':
+            inner_end = datetime(end.year, end.month, end.day)
+            inner_start = datetime(start.year, start.month, start.day)
+        elif level == 'hour':
+            inner_end = end.replace(minute=0, second=0, microsecond=0)
+            inner_start = start.replace(minute=0, second=0, microsecond=0)
+        else:
+            inner_end = end.replace(second=0, microsecond=0)
+            inner_start = start.replace(second=0, microsecond=0)
+        if inner_start < start:
+            inner_start += step
+        
+        if inner_start >= inner_end:
+            return self._rollup_plan(start, end, level_index + 1)
+        return (self._rollup_plan(start, inner_start, level_index + 1) + [(level, inner_start, inner_end)] +
+                self._rollup_plan(inner_end, end, level_index + 1))
+    
+    @timed('db_query_seconds', query='rollup')
+    def get_rollup_counts(self, start: datetime, end: datetime,
+                          group_by: Iterable[str] = ('source_id', 'event_type_id'),
+                          source_id: Optional[int] = None, event_type_id: Optional[int] = None,
+                          ip_address: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Кількість подій у [start, end) зі зведених таблиць, згрупована за group_by.
+
+        Діапазон покривається найгрубшими зведеннями, що в нього вміщаються (дні, години,
+        хвилини), а сирі події читаються лише для неповних хвилин на краях. Перед запитом
+        ущільнюються зведення змінених годин. Повертає рядки з колонками group_by та count
+        (за спаданням count).
+        """
+        group_by = tuple(group_by)
+        for column in group_by:
+            if column not in ROLLUP_GROUP_COLUMNS:
+                raise ValueError(f"Групування можливе лише за {', '.join(ROLLUP_GROUP_COLUMNS)}")
+        
+        self.compact_rollups()
+        conn = self.get_connection()
+        # Фільтри архівних подій для неповних хвилин (зведення архівованих періодів зберігаються)
+        filters = [(column, 'in', {value}) for column, value in
+                   (('source_id', source_id), ('event_type_id', event_type_id), ('ip_address', ip_address))
+                   if value is not None]
+        totals = {}
+        for level, segment_start, segment_end in self._rollup_plan(start, end):
+            archived = self._load_archived_events(segment_start, segment_end, filters) if level == 'raw' else None
+            try:
+                sql, params = self._rollup_segment_query(level, segment_start, segment_end, group_by,
+                                                         source_id, event_type_id, ip_address, archived)
+                for row in conn.execute(sql, params):
+                    key = tuple(row)[:-1]
+                    totals[key] = totals.get(key, 0) + (row[-1] or 0)
+            finally:
+                self._release_archive_table(archived)
+        
+        results = []
+        for key, count in totals.items():
+            if count <= 0:
+                continue
+            row = dict(zip(group_by, key))
+            if 'ip_address' in row:
+                row['ip_address'] = row['ip_address'] or None
+            row['count'] = count
+            results.append(row)
+        results.sort(key=lambda row: row['count'], reverse=True)
+        return results
+    
+    def _rollup_segment_query(self, level: str, start: datetime, end: datetime, group_by: Tuple[str, ...],
+                              source_id: Optional[int], event_type_id: Optional[int],
+                              ip_address: Optional[str], archived: Optional[ArchivedMatches] = None) -> Tuple[str, tuple]:
+        """SQL агрегату одного відрізка плану: зі зведеної таблиці рівня або з сирих подій ('raw',
+        разом з архівними з тимчасової таблиці archived)"""
+        if level == 'raw':
+            columns = {'source_id': 'source_id', 'event_type_id': 'event_type_id',
+                       'ip_address': f"COALESCE({self._decoded('ip_address', 'decode_ip')}, '')"}
+            table, total = self._with_archive(self._events_source(start, end), archived), 'COUNT(*)'
+            conditions = ['timestamp >= ?', 'timestamp < ?']
+            params = [self._time_param(start), self._time_param(end)]
+            ip_param = encode_ip(ip_address) if self.compact else ip_address
+        else:
+            _, table, key_length, _ = next(item for item in ROLLUP_LEVELS if item[0] == level)
+            columns = {column: column for column in ROLLUP_GROUP_COLUMNS}
+            total = 'SUM(count)'
+            conditions = ['bucket >= ?', 'bucket < ?']
+            params = [start.isoformat()[:key_length], end.isoformat()[:key_length]]
+            ip_param = ip_address
+        
+        for column, value in (('source_id', source_id), ('event_type_id', event_type_id),
+                              ('ip_address', ip_param)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        
+        select = ', '.join([columns[column] for column in group_by] + [total])
+        sql = f"SELECT {select} FROM {table} WHERE {' AND '.join(conditions)}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(columns[column] for column in group_by)}"
+        return sql, tuple(params)
+    
+    def merge_heavy_hitters(self, kind: str, hour: str, summary: SpaceSaving):
+        """Додати підсумок Space-Saving годинного вікна hour ('YYYY-MM-DDTHH', kind - 'ip' або 'user')
+        до збереженого в БД"""
+        with self.transaction() as conn:
+            stored = self._load_heavy_hitters(conn, kind, hour, hour + '~', summary.capacity)
+            merged = SpaceSaving.merge(stored + [summary], summary.capacity)
+            
+            conn.execute('DELETE FROM HeavyHitters WHERE kind = ? AND hour = ?', (kind, hour))
+            conn.executemany('''
+                INSERT INTO HeavyHitters (kind, hour, item, count, error) VALUES (?, ?, ?, ?, ?)
+            ''', [(kind, hour, item, count, error) for item, count, error in merged.rows()])
+            conn.execute('''
+                INSERT OR REPLACE INTO HeavyHitterWindows (kind, hour, total, floor) VALUES (?, ?, ?, ?)
+            ''', (kind, hour, merged.total, merged.floor))
+    
+    def _load_heavy_hitters(self, conn, kind: str, start_hour: str, end_hour: str,
+                            capacity: int) -> List[SpaceSaving]:
+        """Збережені підсумки годинних вікон [start_hour, end_hour)"""
+        windows = conn.execute('''
+            SELECT hour, total, floor FROM HeavyHitterWindows
+            WHERE kind = ? AND hour >= ? AND hour < ?
+        ''', (kind, start_hour, end_hour)).fetchall()
+        
+        rows_by_hour = {}
+        cursor = conn.execute('''
+            SELECT hour, item, count, error FROM HeavyHitters
+            WHERE kind = ? AND hour >= ? AND hour < ?
+        ''', (kind, start_hour, end_hour))
+        for hour, item, count, error in cursor:
+            rows_by_hour.setdefault(hour, []).append((item, count, error))
+        
+        return [SpaceSaving.from_rows(rows_by_hour.get(window['hour'], []), window['total'], window['floor'],
+                                      capacity)
+                for window in windows]
+    
+    @timed('db_query_seconds', query='heavy_hitters')
+    def get_heavy_hitters(self, kind: str, start: datetime, end: datetime, k: int = DEFAULT_SEARCH_LIMIT,
+                          capacity: int = TOPK_CAPACITY) -> Dict[str, Any]:
+        """k найчастіших IP ('ip') або користувачів ('user') у годинних вікнах, що перетинаються з [start, end).
+
+        Повертає total (кількість врахованих подій) та items - рядки item, count, error:
+        справжня кількість лежить між count - error та count.
+        """
+        if kind not in ('ip', 'user'):
+            raise ValueError("kind має бути 'ip' або 'user'")
+        
+        conn = self.get_connection()
+        # Ключі вікон - 'YYYY-MM-DDTHH'; вікно, що містить end, теж враховується
+        summaries = self._load_heavy_hitters(conn, kind, start.isoformat()[:13], end.isoformat()[:13] + '~',
+                                             capacity)
+        merged = SpaceSaving.merge(summaries, capacity)
+        return {
+            'total': merged.total,
+            'items': [{'item': item, 'count': count, 'error': error} for item, count, error in merged.top(k)]
+        }
+    
+    def merge_distinct_sketch(self, source_id: int, kind: str, hour: str, sketch: HyperLogLog):
+        """Об'єднати підсумок HyperLogLog годинного вікна hour ('YYYY-MM-DDTHH') джерела зі збереженим у БД"""
+        with self.transaction() as conn:
+            row = conn.execute('''
+                SELECT registers FROM DistinctSketches WHERE source_id = ? AND kind = ? AND hour = ?
+            ''', (source_id, kind, hour)).fetchone()
+            if row is not None:
+                sketch = HyperLogLog.merge([HyperLogLog.from_bytes(row['registers']), sketch], sketch.precision)
+            conn.execute('''
+                INSERT OR REPLACE INTO DistinctSketches (source_id, kind, hour, registers) VALUES (?, ?, ?, ?)
+            ''', (source_id, kind, hour, sketch.to_bytes()))
+    
+    @timed('db_query_seconds', query='distinct_counts')
+    def get_distinct_counts(self, kind: str, start: datetime, end: datetime,
+                            source_id: Optional[int] = None) -> Dict[str, Any]:
+        """Оцінка кількості різних IP ('ip') або користувачів ('user') у годинних вікнах, що перетинаються з [start, end).
+
+        Повертає estimate (усі джерела або лише source_id), sources - оцінки за джерелами та
+        standard_error - відносну стандартну похибку 1.04 / sqrt(m). Час запиту залежить від
+        кількості годинних вікон, а не від кількості подій.
+        """
+        if kind not in ('ip', 'user'):
+            raise ValueError("kind має бути 'ip' або 'user'")
+        
+        conditions = ['kind = ?', 'hour >= ?', 'hour < ?']
+        params = [kind, start.isoformat()[:13], end.isoformat()[:13] + '~']
+        if source_id is not None:
+            conditions.append('source_id = ?')
+            params.append(source_id)
+        
+        conn = self.get_connection()
+        sketches_by_source = {}
+        cursor = conn.execute(f'''
+            SELECT source_id, registers FROM DistinctSketches WHERE {' AND '.join(conditions)}
+        ''', params)
+        for row in cursor:
+            sketches_by_source.setdefault(row['source_id'], []).append(HyperLogLog.from_bytes(row['registers']))
+        
+        merged_by_source = {source: HyperLogLog.merge(sketches) for source, sketches in sketches_by_source.items()}
+        merged = HyperLogLog.merge(merged_by_source.values())
+        return {
+            'estimate': merged.estimate(),
+            'standard_error': merged.standard_error,
+            'sources': {source: sketch.estimate() for source, sketch in merged_by_source.items()}
+        }
+    
+    @timed('db_query_seconds', query='event_columns')
+    def load_event_columns(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           columns: Sequence[str] = ANALYTICS_COLUMNS, event_type_ids: Optional[Iterable[int]] = None,
+                           source_id: Optional[int] = None) -> EventColumns:
+        """Колонки подій періоду [start, end) у масивах NumPy для векторизованої аналітики (потрібен NumPy).
+
+        Рядки читаються кортежами без sqlite3.Row та словників і одразу перетворюються
+        в масиви (див. EventColumns в analytics.py).
+        """
+        require_numpy()
+        unknown = [column for column in columns if column not in ANALYTICS_COLUMNS]
+        if unknown:
+            raise ValueError(f"Невідомі колонки: {', '.join(unknown)}")
+        
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            params.append(self._time_param(start))
+        if end is not None:
+            conditions.append('timestamp < ?')
+            params.append(self._time_param(end))
+        if source_id is not None:
+            conditions.append('source_id = ?')
+            params.append(source_id)
+        if event_type_ids is not None:
+            event_type_ids = list(event_type_ids)
+            conditions.append(f"event_type_id IN ({','.join('?' * len(event_type_ids))})")
+            params.extend(event_type_ids)
+        
+        sql = f"SELECT {', '.join(columns)} FROM {self._events_source(start, end)}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = None
+        return EventColumns.from_rows(columns, cursor.execute(sql, params).fetchall())
+    
+    def analytics_reference_sql(self, event_type_ids: Sequence[int]) -> Dict[str, str]:
+        """SQL-еквіваленти сценаріїв колоночної аналітики (для порівняння в бенчмарку).
+
+        event_type_ids - типи подій, що вважаються невдалими входами.
+        """
+        type_list = ','.join(str(int(type_id)) for type_id in event_type_ids) or 'NULL'
+        hour = f"substr({self._decoded('timestamp', 'decode_timestamp')}, 1, 13)"
+        day_fraction = 'timestamp / 86400000000.0' if self.compact else 'julianday(timestamp)'
+        events = self._events_source()
+        return {
+            'hourly_histogram': f"SELECT {hour}, COUNT(*) FROM {events} GROUP BY 1",
+            'failure_rate_per_ip': (
+                f"SELECT ip_address, COUNT(*), SUM(event_type_id IN ({type_list})) FROM {events} "
+                f"WHERE ip_address IS NOT NULL GROUP BY ip_address"),
+            'brute_force_max_per_hour': (
+                f"SELECT ip_address, MAX(attempts) FROM (SELECT ip_address, COUNT(*) OVER (PARTITION BY ip_address "
+                f"ORDER BY {day_fraction} RANGE BETWEEN {1 / 24 - 1e-12!r} PRECEDING AND CURRENT ROW) AS attempts "
+                f"FROM {events} WHERE event_type_id IN ({type_list}) AND ip_address IS NOT NULL) "
+                f"GROUP BY ip_address"),
+            'inter_arrival_per_ip': (
+                f"SELECT {day_fraction} - LAG({day_fraction}) OVER (PARTITION BY ip_address ORDER BY timestamp) "
+                f"FROM {events} WHERE event_type_id IN ({type_list}) AND ip_address IS NOT NULL"),
+        }
+    
+    @timed('db_query_seconds', query='event_counts')
+    def get_event_counts(self) -> Dict[str, Any]:
+        """Кількість подій з таблиці лічильників: всього, за джерелами, типами, серйозністю та днями"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT ec.source_id, es.name as source_name, ec.event_type_id, et.type_name,
+                   et.severity, ec.day, ec.count
+            FROM EventCounters ec
+            LEFT JOIN EventSources es ON ec.source_id = es.id
+            LEFT JOIN EventTypes et ON ec.event_type_id = et.id
+            WHERE ec.count > 0
+        ''')
+        
+        counts = {'total': 0, 'by_source': {}, 'by_type': {}, 'by_severity': {}, 'by_day': {}}
+        for row in cursor.fetchall():
+            count = row['count']
+            counts['total'] += count
+            for key, value in (('by_source', row['source_name']), ('by_type', row['type_name']),
+                               ('by_severity', row['severity']), ('by_day', row['day'])):
+                counts[key][value] = counts[key].get(value, 0) + count
+        
+        return counts
+    
     def get_event_sources(self) -> List[Dict[str, Any]]:
         """Отримати всі джерела подій"""
         conn = self.get_connection()
@@ -323,7 +2244,6 @@ class SecurityEventsDB:
         
         cursor.execute('SELECT * FROM EventSources ORDER BY name')
         results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return results
     
     def get_event_types(self) -> List[Dict[str, Any]]:
@@ -333,5 +2253,4 @@ class SecurityEventsDB:
         
         cursor.execute('SELECT * FROM EventTypes ORDER BY type_name')
         results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return results
\ No newline at end of file
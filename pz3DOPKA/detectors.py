@@ -0,0 +1,109 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Deque, List
+
+# Правило за замовчуванням: більше 5 невдалих спроб входу за 1 годину
+BRUTE_FORCE_THRESHOLD = 5
+BRUTE_FORCE_WINDOW = timedelta(hours=1)
+
+# Максимальна кількість IP-адрес, які відстежуються одночасно
+MAX_TRACKED_IPS = 100000
+
+@dataclass
+class BruteForceAlert:
+    """Сповіщення про потенційну атаку підбору пароля"""
+    ip_address: str
+    failed_attempts: int
+    first_attempt: datetime
+    last_attempt: datetime
+
+class _IPState:
+    """Стан однієї IP-адреси: кільцевий буфер часу останніх невдалих спроб"""
+    __slots__ = ('attempts', 'last_alert')
+    
+    def __init__(self, size: int):
+        self.attempts: Deque[datetime] = deque(maxlen=size)
+        self.last_alert: Optional[datetime] = None
+
+class BruteForceDetector:
+    """Потоковий детектор атак підбору пароля з ковзним вікном по кожній IP-адресі.
+    
+    Для кожної IP зберігається лише threshold + 1 останніх спроб, тому обробка
+    події - O(1). IP-адреси без спроб довше за вікно та найдавніше активні
+    адреси понад max_tracked_ips витісняються, тож пам'ять обмежена навіть
+    при атаках з великої кількості адрес.
+    """
+    
+    def __init__(self, threshold: int = BRUTE_FORCE_THRESHOLD, window: timedelta = BRUTE_FORCE_WINDOW,
+                 max_tracked_ips: int = MAX_TRACKED_IPS):
+        if threshold < 1 or max_tracked_ips < 1:
+            raise ValueError("Поріг та кількість IP-адрес мають бути додатними числами")
+        
+        self.threshold = threshold
+        self.window = window
+        self.max_tracked_ips = max_tracked_ips
+        # IP -> стан; порядок - від найдавніше до найнедавніше активної адреси
+        self._states: 'OrderedDict[str, _IPState]' = OrderedDict()
+        self.alerts_emitted = 0
+        self.evicted_ips = 0
+    
+    def observe(self, ip_address: str, timestamp: datetime) -> Optional[BruteForceAlert]:
+        """Врахувати невдалу спробу входу; повертає сповіщення, якщо поріг перевищено"""
+        state = self._states.get(ip_address)
+        if state is None:
+            state = _IPState(self.threshold + 1)
+            self._states[ip_address] = state
+        else:
+            self._states.move_to_end(ip_address)
+        
+        attempts = state.attempts
+        attempts.append(timestamp)
+        self._evict(timestamp)
+        
+        # Буфер повний і найстаріша з threshold + 1 спроб у межах вікна
+        if len(attempts) <= self.threshold or timestamp - attempts[0] > self.window:
+            return None
+        
+        # Не повторюємо сповіщення для тієї ж IP частіше, ніж раз на вікно
+        if state.last_alert is not None and timestamp - state.last_alert <= self.window:
+            return None
+        
+        state.last_alert = timestamp
+        self.alerts_emitted += 1
+        return BruteForceAlert(
+            ip_address=ip_address,
+            failed_attempts=len(attempts),
+            first_attempt=attempts[0],
+            last_attempt=timestamp
+        )
+    
+    def _evict(self, now: datetime):
+        """Витіснити неактивні IP-адреси (амортизовано O(1) на подію)"""
+        while self._states:
+            ip_address, state = next(iter(self._states.items()))
+            idle = now - state.attempts[-1] > self.window
+            if not idle and len(self._states) <= self.max_tracked_ips:
+                break
+            del self._states[ip_address]
+            self.evicted_ips += 1
+    
+    def tracked_ips(self) -> int:
+        """Кількість IP-адрес, що відстежуються зараз"""
+        return len(self._states)
+    
+    def reset(self):
+        """Очистити стан детектора"""
+        self._states.clear()
+    
+    def active_attackers(self, now: Optional[datetime] = None) -> List[BruteForceAlert]:
+        """IP-адреси, що зараз перевищують поріг у межах вікна"""
+        if now is None:
+            now = datetime.now()
+        
+        result = []
+        for ip_address, state in self._states.items():
+            attempts = state.attempts
+            if len(attempts) > self.threshold and now - attempts[0] <= self.window:
+                result.append(BruteForceAlert(ip_address, len(attempts), attempts[0], attempts[-1]))
+        return result
@@ -1,8 +1,58 @@
 import re
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import copy
+import time
+import heapq
+import hashlib
+from collections import deque
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor, Executor
+from datetime import datetime, date
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable
 from dataclasses import dataclass
+from metrics import METRICS, metric_key
+
+# Розмір шматка файлу (у байтах) для паралельного парсингу
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Скільки шматків на один процес пулу розбирається наперед (результати чекають у пам'яті,
+# доки записи не будуть спожиті)
+PARALLEL_CHUNKS_PER_WORKER = 2
+
+# Розмір шматка для обчислення SHA-256 файлу (ідемпотентний імпорт)
+FILE_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Кількість перших рядків файлу для автовизначення формату дати
+DEFAULT_SNIFF_LINES = 50
+
+# Номери місяців для швидкого розбору дат без strptime
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Режим стеження за файлом (--follow): пакет записується в БД кожні
+# FOLLOW_FLUSH_INTERVAL секунд або кожні FOLLOW_FLUSH_LINES рядків
+FOLLOW_FLUSH_INTERVAL = 0.5
+FOLLOW_FLUSH_LINES = 1000
+# Пауза між перевірками файлу, коли нових рядків немає (секунди)
+FOLLOW_POLL_INTERVAL = 0.1
+# Розмір одного читання з файлу (байти)
+FOLLOW_READ_SIZE = 64 * 1024
+
+# Ключі метрик парсера (обчислені наперед - оновлюються на кожному рядку)
+_STAGE_READ = metric_key('parse_stage_seconds', stage='read')
+_STAGE_DECODE = metric_key('parse_stage_seconds', stage='decode')
+_STAGE_TIMESTAMP = metric_key('parse_stage_seconds', stage='timestamp')
+_STAGE_EXTRACT = metric_key('parse_stage_seconds', stage='extract')
+_STAGE_CLASSIFY = metric_key('parse_stage_seconds', stage='classify')
+_LINES_READ = metric_key('parse_lines_read_total')
+_BYTES_READ = metric_key('parse_bytes_read_total')
+_LINES_PARSED = metric_key('parse_lines_parsed_total')
+_PARSE_FAILURES = metric_key('parse_failures_total')
+_DECODE_FALLBACKS = metric_key('parse_decode_fallbacks_total')
+_TIMESTAMP_MISSING = metric_key('parse_timestamp_missing_total')
+_TIMESTAMP_SLOW = metric_key('parse_timestamp_slow_total')
 
 @dataclass
 class ParsedLogEntry:
@@ -13,6 +63,99 @@ class ParsedLogEntry:
     username: Optional[str] = None
     event_type: Optional[str] = None
     severity: Optional[str] = None
+    source_file: Optional[str] = None  # Файл, з якого прочитано запис
+
+@lru_cache(maxsize=4096)
+def _parse_date_part(date_str: str, date_format: str) -> date:
+    """Розпарсити дату (без часу) через strptime з кешуванням - у логах рядки йдуть
+    майже монотонно, тож сусідні записи мають той самий префікс дати"""
+    return datetime.strptime(date_str, date_format).date()
+
+def split_file_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Розбити файл на діапазони байтів [start, end), вирівняні по межах рядків"""
+    if chunk_size < 1:
+        raise ValueError("Розмір шматка має бути додатним числом")
+    
+    file_size = os.path.getsize(file_path)
+    chunks = []
+    start = 0
+    
+    with open(file_path, 'rb') as file:
+        while start < file_size:
+            end = start + chunk_size
+            if end >= file_size:
+                end = file_size
+            else:
+                # Дочитуємо до кінця поточного рядка
+                file.seek(end)
+                file.readline()
+                end = file.tell()
+            chunks.append((start, end))
+            start = end
+    
+    return chunks
+
+# Парсер робочого процесу (створюється один раз на процес у пулі)
+_worker_parser = None
+
+def file_sha256(file_path: str, chunk_size: int = FILE_HASH_CHUNK_SIZE) -> str:
+    """SHA-256 вмісту файлу (читання шматками - пам'ять не залежить від розміру файлу)"""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for byte_block in iter(lambda: file.read(chunk_size), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+def _drain(entries: List[ParsedLogEntry]) -> Iterator[ParsedLogEntry]:
+    """Пройти список по порядку, звільняючи вже повернуті записи"""
+    entries.reverse()
+    while entries:
+        yield entries.pop()
+
+def _init_parse_worker(parser: 'LogParser'):
+    """Ініціалізація робочого процесу пулу"""
+    global _worker_parser
+    _worker_parser = parser
+
+def _parse_file_chunk(file_path: str, start: int, end: int, log_format: Optional[str]) -> List[ParsedLogEntry]:
+    """Розпарсити діапазон байтів файлу в робочому процесі (log_format - формат дати файлу)"""
+    if log_format != _worker_parser.active_format:
+        _worker_parser.set_format(log_format)
+    return list(_worker_parser._iter_log_entries(file_path, start, end))
+
+class _ChunkQueue:
+    """Розбір шматків файлів у пулі процесів з обмеженням кількості шматків, розібраних наперед.
+
+    Шматки надсилаються в пул у міру споживання записів: файл, записи якого зараз
+    читаються, отримує наступні шматки, доки разом наперед розбирається не більше
+    window шматків, тож у пам'яті лише кілька результатів, а не весь файл.
+    """
+    
+    def __init__(self, executor: Executor, window: int):
+        self.executor = executor
+        self.window = window
+        self.pending = 0  # Шматки, надіслані в пул, результат яких ще не взято
+    
+    def entries(self, file_path: str, chunks: Iterable[Tuple[int, int]],
+                log_format: Optional[str]) -> Iterator[ParsedLogEntry]:
+        """Записи файлу у порядку рядків, шматок за шматком"""
+        chunks = deque(chunks)
+        futures = deque()
+        try:
+            while chunks or futures:
+                # Перший шматок надсилається завжди, наступні - лише в межах вікна
+                while chunks and (not futures or self.pending < self.window):
+                    start, end = chunks.popleft()
+                    futures.append(self.executor.submit(_parse_file_chunk, file_path, start, end, log_format))
+                    self.pending += 1
+                future = futures.popleft()
+                self.pending -= 1
+                yield from _drain(future.result())
+        finally:
+            # Споживач зупинився (або шматок з помилкою) - решту шматків файлу не розбираємо
+            for future in futures:
+                future.cancel()
+            self.pending -= len(futures)
 
 class LogParser:
     """Клас для парсингу різних типів лог-файлів"""
@@ -77,37 +220,195 @@ class LogParser:
                 r'threat.*detected',
             ]
         }
+        
+        # Серйозність для кожного типу події
+        self.severity_map = {
+            'Login Success': 'Informational',
+            'Login Failed': 'Warning',
+            'Port Scan Detected': 'Warning',
+            'Malware Alert': 'Critical'
+        }
+        
+        # Зафіксований формат дати (strptime-формат з date_patterns) та його швидкий шлях
+        self.active_format = None
+        self._fast_timestamp = None
+        
+        # Файли, пропущені останнім parse_multiple_log_files через помилку
+        self.skipped_files: List[str] = []
+        
+        self._compile_patterns()
+    
+    def _compile_patterns(self):
+        """Попередня компіляція всіх регулярних виразів (один раз на парсер)"""
+        self._date_regexes = [
+            (re.compile(pattern, re.IGNORECASE), format_str, '%Y' not in format_str)
+            for pattern, format_str in self.date_patterns
+        ]
+        # Формат лише дати: усі формати закінчуються на '<роздільник>%H:%M:%S'
+        self._date_only_formats = [
+            format_str[:-9] if format_str.endswith('%H:%M:%S') else None
+            for _, format_str in self.date_patterns
+        ]
+        # Поточний рік для форматів без року (оновлюється один раз на файл)
+        self._current_year = datetime.now().year
+        self._ip_regex = re.compile(self.ip_pattern)
+        self._username_regexes = [re.compile(pattern, re.IGNORECASE) for pattern in self.username_patterns]
+        # Спільний фільтр: рядки без жодного збігу відкидаються одним пошуком
+        self._username_prefilter = re.compile(
+            '|'.join(f"(?:{pattern})" for pattern in self.username_patterns), re.IGNORECASE
+        ) if self.username_patterns else None
+        
+        # Усі паттерни подій об'єднані в одну альтернацію з іменованими групами (по групі на тип),
+        # тож рядок без подій відкидається за один прохід regex-рушія
+        self._event_types = list(self.event_patterns)
+        self._event_type_regexes = [re.compile('|'.join(patterns)) for patterns in self.event_patterns.values()]
+        self._event_regex = re.compile('|'.join(
+            f"(?P<e{i}>{'|'.join(patterns)})" for i, patterns in enumerate(self.event_patterns.values())
+        )) if self.event_patterns else None
     
     def parse_timestamp(self, log_line: str) -> Optional[datetime]:
         """Розпарсити timestamp з лог-рядка"""
-        for pattern, format_str in self.date_patterns:
-            match = re.search(pattern, log_line, re.IGNORECASE)
-            if match:
-                try:
-                    timestamp_str = match.group(1)
-                    # Якщо рік не вказано, додаємо поточний рік
-                    if '%Y' not in format_str:
-                        current_year = datetime.now().year
-                        timestamp_str = f"{current_year} {timestamp_str}"
-                        format_str = f"%Y {format_str}"
-                    
+        # Спочатку пробуємо швидкий шлях зафіксованого формату
+        if self._fast_timestamp is not None:
+            timestamp = self._fast_timestamp(log_line)
+            if timestamp is not None:
+                return timestamp
+        
+        if METRICS.enabled:
+            METRICS.inc(_TIMESTAMP_SLOW)
+        for index in range(len(self._date_regexes)):
+            timestamp = self._parse_timestamp_with(index, log_line)
+            if timestamp is not None:
+                return timestamp
+        return None
+    
+    def _parse_timestamp_with(self, index: int, log_line: str) -> Optional[datetime]:
+        """Розпарсити timestamp одним паттерном з date_patterns"""
+        regex, format_str, needs_year = self._date_regexes[index]
+        match = regex.search(log_line)
+        if match:
+            try:
+                timestamp_str = match.group(1)
+                date_format = self._date_only_formats[index]
+                
+                if date_format is None:
+                    # Нестандартний формат - повний strptime
+                    if needs_year:
+                        return datetime.strptime(f"{self._current_year} {timestamp_str}", f"%Y {format_str}")
                     return datetime.strptime(timestamp_str, format_str)
-                except ValueError:
-                    continue
+                
+                # Дата - з кешу, час - з цілочисельних зрізів 'HH:MM:SS'
+                date_str = timestamp_str[:-9]
+                # Якщо рік не вказано, додаємо поточний рік
+                if needs_year:
+                    parsed_date = _parse_date_part(f"{self._current_year} {date_str}", f"%Y {date_format}")
+                else:
+                    parsed_date = _parse_date_part(date_str, date_format)
+                
+                return datetime(parsed_date.year, parsed_date.month, parsed_date.day,
+                                int(timestamp_str[-8:-6]), int(timestamp_str[-5:-3]), int(timestamp_str[-2:]))
+            except ValueError:
+                return None
         return None
     
+    def _parse_iso_timestamp(self, log_line: str) -> Optional[datetime]:
+        """Швидкий шлях для '2024-01-15 14:30:25' / '2024-01-15T14:30:25' на початку рядка"""
+        s = log_line[:19]
+        if len(s) != 19 or s[4] != '-' or s[7] != '-' or s[10] not in ' T' or s[13] != ':' or s[16] != ':':
+            return None
+        try:
+            return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                            int(s[11:13]), int(s[14:16]), int(s[17:19]))
+        except ValueError:
+            return None
+    
+    def _parse_apache_timestamp(self, log_line: str) -> Optional[datetime]:
+        """Швидкий шлях для Apache-формату: зрізи з фіксованим зсувом після '[dd/Mon/yyyy:HH:MM:SS'"""
+        start = log_line.find('[')
+        if start < 0:
+            return None
+        s = log_line[start + 1:start + 21]
+        if len(s) != 20 or s[2] != '/' or s[6] != '/' or s[11] != ':' or s[14] != ':' or s[17] != ':':
+            return None
+        month = MONTHS.get(s[3:6].lower())
+        if month is None:
+            return None
+        try:
+            return datetime(int(s[7:11]), month, int(s[0:2]),
+                            int(s[12:14]), int(s[15:17]), int(s[18:20]))
+        except ValueError:
+            return None
+    
+    def set_format(self, format_str: Optional[str]):
+        """Зафіксувати формат дати (None - повернутися до загального перебору паттернів)"""
+        formats = [format_str for _, format_str, _ in self._date_regexes]
+        if format_str is None or format_str not in formats:
+            self.active_format = None
+            self._fast_timestamp = None
+            return
+        
+        self.active_format = format_str
+        if format_str in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S'):
+            self._fast_timestamp = self._parse_iso_timestamp
+        elif format_str == '%d/%b/%Y:%H:%M:%S':
+            self._fast_timestamp = self._parse_apache_timestamp
+        else:
+            # Для інших форматів - лише один відповідний паттерн замість перебору всіх
+            self._fast_timestamp = partial(self._parse_timestamp_with, formats.index(format_str))
+    
+    def sniff_format(self, file_path: str, sample_lines: int = DEFAULT_SNIFF_LINES) -> Optional[str]:
+        """Визначити найчастіший формат дати за першими рядками файлу"""
+        counts = {}
+        checked = 0
+        self._current_year = datetime.now().year
+        
+        with open(file_path, 'rb') as file:
+            for raw_line in file:
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                
+                for index, (_, format_str, _) in enumerate(self._date_regexes):
+                    if self._parse_timestamp_with(index, line) is not None:
+                        counts[format_str] = counts.get(format_str, 0) + 1
+                        break
+                
+                checked += 1
+                if checked >= sample_lines:
+                    break
+        
+        if not counts:
+            return None
+        return max(counts, key=counts.get)
+    
+    def format_matches(self, file_path: str, format_str: str) -> bool:
+        """Чи розбирається формат дати format_str у першому непорожньому рядку файлу
+        (дешева перевірка кешованого формату замість повного sniff_format)"""
+        formats = [known for _, known, _ in self._date_regexes]
+        if format_str not in formats:
+            return False
+        self._current_year = datetime.now().year
+        
+        with open(file_path, 'rb') as file:
+            for raw_line in file:
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if line:
+                    return self._parse_timestamp_with(formats.index(format_str), line) is not None
+        return False
+    
     def extract_ip_address(self, log_line: str) -> Optional[str]:
         """Витягти IP-адресу з лог-рядка"""
-        matches = re.findall(self.ip_pattern, log_line)
-        if matches:
-            # Повертаємо першу знайдену IP-адресу
-            return matches[0]
-        return None
+        # Повертаємо першу знайдену IP-адресу
+        match = self._ip_regex.search(log_line)
+        return match.group(0) if match else None
     
     def extract_username(self, log_line: str) -> Optional[str]:
         """Витягти ім'я користувача з лог-рядка"""
-        for pattern in self.username_patterns:
-            match = re.search(pattern, log_line, re.IGNORECASE)
+        if self._username_prefilter is None or not self._username_prefilter.search(log_line):
+            return None
+        
+        for regex in self._username_regexes:
+            match = regex.search(log_line)
             if match:
                 username = match.group(1)
                 # Фільтруємо очевидно неправильні значення
@@ -117,21 +418,24 @@ class LogParser:
     
     def detect_event_type(self, log_line: str) -> Tuple[Optional[str], Optional[str]]:
         """Визначити тип події та її серйозність"""
+        if self._event_regex is None:
+            return None, None
+        
         log_lower = log_line.lower()
+        match = self._event_regex.search(log_lower)
+        if not match:
+            return None, None
         
-        for event_type, patterns in self.event_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, log_lower):
-                    # Визначаємо серйозність на основі типу події
-                    severity_map = {
-                        'Login Success': 'Informational',
-                        'Login Failed': 'Warning',
-                        'Port Scan Detected': 'Warning',
-                        'Malware Alert': 'Critical'
-                    }
-                    return event_type, severity_map.get(event_type, 'Informational')
+        # Найлівіший збіг може належати менш пріоритетному типу - перевіряємо лише
+        # типи, що стоять раніше у event_patterns
+        type_index = int(match.lastgroup[1:])
+        for i in range(type_index):
+            if self._event_type_regexes[i].search(log_lower):
+                type_index = i
+                break
         
-        return None, None
+        event_type = self._event_types[type_index]
+        return event_type, self.severity_map.get(event_type, 'Informational')
     
     def parse_log_line(self, log_line: str) -> Optional[ParsedLogEntry]:
         """Розпарсити один рядок логу"""
@@ -139,15 +443,34 @@ class LogParser:
         if not log_line:
             return None
         
+        # Час етапів міряється лише з увімкненими метриками (одна перевірка прапорця на рядок)
+        timed = METRICS.enabled
+        if timed:
+            start = time.perf_counter()
+        
         timestamp = self.parse_timestamp(log_line)
         if not timestamp:
             # Якщо не можемо розпарсити timestamp, використовуємо поточний час
             timestamp = datetime.now()
+            if timed:
+                METRICS.inc(_TIMESTAMP_MISSING)
         
+        if timed:
+            extract_start = time.perf_counter()
         ip_address = self.extract_ip_address(log_line)
         username = self.extract_username(log_line)
+        
+        if timed:
+            classify_start = time.perf_counter()
         event_type, severity = self.detect_event_type(log_line)
         
+        if timed:
+            end = time.perf_counter()
+            METRICS.add_time(_STAGE_TIMESTAMP, extract_start - start)
+            METRICS.add_time(_STAGE_EXTRACT, classify_start - extract_start)
+            METRICS.add_time(_STAGE_CLASSIFY, end - classify_start)
+            METRICS.inc(_LINES_PARSED)
+        
         return ParsedLogEntry(
             timestamp=timestamp,
             message=log_line,
@@ -157,58 +480,182 @@ class LogParser:
             severity=severity
         )
     
-    def parse_log_file(self, file_path: str) -> List[ParsedLogEntry]:
-        """Розпарсити весь лог-файл"""
+    def iter_log_file(self, file_path: str) -> Iterator[ParsedLogEntry]:
+        """Лінивий (потоковий) парсинг лог-файлу - записи повертаються по одному"""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Файл {file_path} не знайдено")
         
-        parsed_entries = []
+        return self._iter_log_entries(file_path)
+    
+    def _iter_log_entries(self, file_path: str, start: int = 0,
+                          end: Optional[int] = None) -> Iterator[ParsedLogEntry]:
+        """Генератор розпарсених записів з пам'яттю, що не залежить від розміру файлу"""
+        encoding = 'utf-8'
+        position = start
+        lines_read = 0
+        failures = 0
+        self._current_year = datetime.now().year
+        
+        # Читання та декодування міряються тут, етапи розбору рядка - у parse_log_line;
+        # час, коли генератор стоїть на yield (запис у БД), не враховується
+        timed = METRICS.enabled
+        read_seconds = 0.0
+        decode_seconds = 0.0
+        mark = time.perf_counter() if timed else 0.0
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                for line_num, line in enumerate(file, 1):
+            with open(file_path, 'rb') as file:
+                if start:
+                    file.seek(start)
+                
+                for line_num, raw_line in enumerate(file, 1):
+                    # Зупиняємось на межі шматка
+                    if end is not None and position >= end:
+                        break
+                    position += len(raw_line)
+                    lines_read = line_num
+                    if timed:
+                        decode_start = time.perf_counter()
+                        read_seconds += decode_start - mark
+                    
+                    try:
+                        line = raw_line.decode(encoding)
+                    except UnicodeDecodeError:
+                        # Переходимо на cp1251 для решти файлу без повторного читання з початку
+                        encoding = 'cp1251'
+                        line = raw_line.decode(encoding, errors='replace')
+                        if timed:
+                            METRICS.inc(_DECODE_FALLBACKS)
+                    if timed:
+                        decode_seconds += time.perf_counter() - decode_start
+                    
                     try:
                         parsed_entry = self.parse_log_line(line)
                         if parsed_entry:
-                            parsed_entries.append(parsed_entry)
+                            parsed_entry.source_file = file_path
+                            yield parsed_entry
                     except Exception as e:
+                        failures += 1
                         print(f"Помилка при парсингу рядка {line_num}: {e}")
-                        continue
-        except UnicodeDecodeError:
-            # Спробуємо з іншим кодуванням
+                    
+                    if timed:
+                        mark = time.perf_counter()
+        finally:
+            if timed:
+                METRICS.add_time(_STAGE_READ, read_seconds, lines_read)
+                METRICS.add_time(_STAGE_DECODE, decode_seconds, lines_read)
+                METRICS.inc(_LINES_READ, lines_read)
+                METRICS.inc(_BYTES_READ, position - start)
+                METRICS.inc(_PARSE_FAILURES, failures)
+    
+    def parse_log_file(self, file_path: str) -> List[ParsedLogEntry]:
+        """Розпарсити весь лог-файл"""
+        try:
+            return list(self.iter_log_file(file_path))
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"Не вдалося прочитати файл {file_path}: {e}")
+            return []
+    
+    def _iter_parallel(self, files: List[Tuple[str, List[Tuple[int, int]], Optional[str]]], workers: int,
+                       skip_failed: bool = False) -> Iterator[ParsedLogEntry]:
+        """Записи файлів (файл, шматки, формат дати), розібраних шматками у пулі процесів.
+
+        Наперед розбирається не більше PARALLEL_CHUNKS_PER_WORKER шматків на процес.
+        Записи одного файлу йдуть у порядку рядків, кілька файлів зливаються за часом.
+        skip_failed - файл з помилкою розбору пропускається (skipped_files) замість помилки.
+        """
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                                 initargs=(self,)) as executor:
+            queue = _ChunkQueue(executor, PARALLEL_CHUNKS_PER_WORKER * workers)
+            streams = [queue.entries(file_path, chunks, log_format) for file_path, chunks, log_format in files]
+            entries = streams
+            if skip_failed:
+                entries = [self._skip_failed(file_path, stream) for (file_path, _, _), stream in zip(files, streams)]
             try:
-                with open(file_path, 'r', encoding='cp1251') as file:
-                    for line_num, line in enumerate(file, 1):
-                        try:
-                            parsed_entry = self.parse_log_line(line)
-                            if parsed_entry:
-                                parsed_entries.append(parsed_entry)
-                        except Exception as e:
-                            print(f"Помилка при парсингу рядка {line_num}: {e}")
-                            continue
-            except Exception as e:
-                print(f"Не вдалося прочитати файл {file_path}: {e}")
-                return []
+                if len(entries) == 1:
+                    yield from entries[0]
+                else:
+                    yield from heapq.merge(*entries, key=lambda x: x.timestamp)
+            finally:
+                # Незавершені потоки скасовують свої шматки до зупинки пулу
+                for stream in streams:
+                    stream.close()
+    
+    def iter_log_file_parallel(self, file_path: str, workers: int,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[ParsedLogEntry]:
+        """Паралельний парсинг одного великого файлу шматками у пулі процесів"""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Файл {file_path} не знайдено")
         
-        return parsed_entries
+        return self._iter_parallel([(file_path, split_file_chunks(file_path, chunk_size), self.active_format)],
+                                   workers)
     
-    def parse_multiple_log_files(self, file_paths: List[str]) -> List[ParsedLogEntry]:
-        """Розпарсити декілька лог-файлів"""
-        all_entries = []
+    def _skip_failed(self, file_path: str, entries: Iterator[ParsedLogEntry]) -> Iterator[ParsedLogEntry]:
+        """Записи одного з кількох файлів: помилка читання зупиняє лише цей файл і додає його в skipped_files"""
+        count = 0
+        try:
+            for entry in entries:
+                count += 1
+                yield entry
+        except Exception as e:
+            print(f"Помилка при парсингу файлу {file_path}: {e}")
+            self.skipped_files.append(file_path)
+            return
+        print(f"Розпарсено {count} записів з {file_path}")
+    
+    def _with_format(self, log_format: Optional[str]) -> 'LogParser':
+        """Парсер з форматом дати log_format (копія, якщо формат відрізняється від поточного)"""
+        if log_format == self.active_format:
+            return self
+        parser = copy.copy(self)
+        parser.set_format(log_format)
+        return parser
+    
+    def parse_multiple_log_files(self, file_paths: List[str], workers: int = 1,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                 formats: Optional[Dict[str, Optional[str]]] = None) -> Iterator[ParsedLogEntry]:
+        """Розпарсити декілька лог-файлів і злити записи за часом (workers > 1 - паралельно у пулі процесів).
+
+        Записи кожного файлу йдуть у порядку рядків (логи дописуються в порядку часу), а
+        файли зливаються за часом потоково (k-way merge), тож у пам'яті лише поточні записи
+        кожного файлу. formats - формат дати для кожного файлу (за замовчуванням - поточний
+        формат парсера). Файл, який не вдалося прочитати, далі не читається і додається в
+        skipped_files (список заповнюється під час перебору).
+        """
+        formats = formats or {}
+        self.skipped_files = []
         
+        if workers > 1:
+            files = []
+            for file_path in file_paths:
+                try:
+                    chunks = split_file_chunks(file_path, chunk_size)
+                except OSError as e:
+                    print(f"Помилка при парсингу файлу {file_path}: {e}")
+                    self.skipped_files.append(file_path)
+                    continue
+                files.append((file_path, chunks, formats.get(file_path, self.active_format)))
+            
+            print(f"Паралельний парсинг {sum(len(chunks) for _, chunks, _ in files)} шматків "
+                  f"з {len(file_paths)} файлів ({workers} процесів)")
+            return self._iter_parallel(files, workers, skip_failed=True)
+        
+        streams = []
         for file_path in file_paths:
             print(f"Парсинг файлу: {file_path}")
             try:
-                entries = self.parse_log_file(file_path)
-                all_entries.extend(entries)
-                print(f"Розпарсено {len(entries)} записів з {file_path}")
+                # Кожен файл читається парсером зі своїм форматом дати (потоки чергуються при злитті)
+                entries = self._with_format(formats.get(file_path, self.active_format)).iter_log_file(file_path)
             except Exception as e:
                 print(f"Помилка при парсингу файлу {file_path}: {e}")
+                self.skipped_files.append(file_path)
+                continue
+            streams.append(self._skip_failed(file_path, entries))
         
-        # Сортуємо всі записи за часом
-        all_entries.sort(key=lambda x: x.timestamp)
-        
-        return all_entries
+        # Злиття потоків файлів (k-way merge) замість глобального сортування
+        return heapq.merge(*streams, key=lambda x: x.timestamp)
     
     def generate_sample_log_file(self, file_path: str, num_entries: int = 100):
         """Генерувати зразковий лог-файл для тестування"""
@@ -267,4 +714,129 @@ class LogParser:
                 
                 file.write(log_entry + '\n')
         
-        print(f"Згенеровано зразковий лог-файл: {file_path} з {num_entries} записами")
\ No newline at end of file
+        print(f"Згенеровано зразковий лог-файл: {file_path} з {num_entries} записами")
+
+class LogFollower:
+    """Читач активного лог-файлу в режимі tail -F.
+
+    Повертає лише повні рядки; offset - байтова позиція після останнього
+    повернутого рядка, inode - ідентифікатор файлу, з якого він прочитаний.
+    Разом вони утворюють контрольну точку для продовження після перезапуску.
+    Ротація (файл за шляхом замінено новим) виявляється за зміною inode - старий
+    файл дочитується до кінця, після чого новий читається з початку. Обрізання
+    (copytruncate) виявляється за розміром файлу, меншим за позицію читання.
+    """
+    
+    def __init__(self, file_path: str, offset: int = 0, inode: Optional[int] = None,
+                 read_size: int = FOLLOW_READ_SIZE):
+        self.file_path = file_path
+        self.offset = offset
+        self.inode = inode
+        self.read_size = read_size
+        self.rotations = 0
+        self.truncations = 0
+        self._file = None
+        self._buffer = b''  # Прочитані байти після offset (неповний рядок)
+        self._encoding = 'utf-8'
+    
+    def close(self):
+        """Закрити відкритий файл"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer = b''
+    
+    def _open(self) -> bool:
+        """Відкрити файл і перейти до контрольної точки (False - файлу поки немає)"""
+        try:
+            file = open(self.file_path, 'rb')
+        except FileNotFoundError:
+            return False
+        
+        stat = os.fstat(file.fileno())
+        if self.inode is not None and stat.st_ino != self.inode:
+            # Файл замінено, поки ми його не читали - читаємо новий з початку
+            self.offset = 0
+            self.rotations += 1
+        elif stat.st_size < self.offset:
+            self.offset = 0
+            self.truncations += 1
+        
+        file.seek(self.offset)
+        self.inode = stat.st_ino
+        self._file = file
+        self._encoding = 'utf-8'
+        return True
+    
+    def _truncated(self) -> bool:
+        """Файл обрізано нижче позиції читання - починаємо з початку"""
+        if os.fstat(self._file.fileno()).st_size >= self._file.tell():
+            return False
+        self._file.seek(0)
+        self.offset = 0
+        self.truncations += 1
+        return True
+    
+    def _rotated(self) -> bool:
+        """За шляхом уже інший файл - закриваємо старий (він дочитаний до кінця)"""
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            # Старий файл перейменовано, новий ще не створено
+            return False
+        if stat.st_ino == self.inode:
+            return False
+        
+        self._file.close()
+        self._file = None
+        self.offset = 0
+        self.inode = None
+        self.rotations += 1
+        return True
+    
+    def _decode(self, raw_line: bytes) -> str:
+        """Декодувати рядок (utf-8, з переходом на cp1251 як у LogParser)"""
+        try:
+            return raw_line.decode(self._encoding)
+        except UnicodeDecodeError:
+            self._encoding = 'cp1251'
+            return raw_line.decode(self._encoding, errors='replace')
+    
+    def read_lines(self, max_lines: int = FOLLOW_FLUSH_LINES) -> List[str]:
+        """Нові повні рядки файлу (не більше max_lines); порожній список - нових даних немає"""
+        if self._file is None and not self._open():
+            return []
+        
+        lines = []
+        buffer = self._buffer
+        start = 0
+        while len(lines) < max_lines:
+            end = buffer.find(b'\n', start)
+            if end >= 0:
+                lines.append(self._decode(buffer[start:end + 1]))
+                self.offset += end + 1 - start
+                start = end + 1
+                continue
+            
+            data = self._file.read(self.read_size)
+            if data:
+                buffer = buffer[start:] + data
+                start = 0
+                continue
+            
+            # Кінець файлу: перевіряємо обрізання та ротацію
+            if self._truncated():
+                buffer, start = b'', 0
+                continue
+            if not self._rotated():
+                break
+            
+            # Останній рядок старого файлу без переведення рядка теж повертаємо
+            if start < len(buffer):
+                lines.append(self._decode(buffer[start:]))
+            buffer, start = b'', 0
+            if not self._open():
+                break
+        
+        self._buffer = buffer[start:]
+        return lines
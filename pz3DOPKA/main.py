@@ -6,16 +6,37 @@
 
 import sys
 import os
+import asyncio
 from datetime import datetime
-from sec_manager import SecurityEventsManager
+from typing import Optional
+from sec_manager import SecurityEventsManager, RESULTS_DISPLAY_LIMIT
+from db_mgr import DEFAULT_BATCH_SIZE, DEFAULT_SEARCH_LIMIT
+from log_manager import DEFAULT_CHUNK_SIZE
+from syslog_receiver import SyslogReceiver, SYSLOG_PORT
+from metrics import METRICS, Profiler
 
 def main():
     """Головна функція програми"""
     print("🛡️  Ініціалізація системи управління подіями безпеки...")
+    manager = None
+    
+    # Файл БД: --db <шлях> (за замовчуванням security_events.db)
+    args = sys.argv[1:]
+    db_path = pop_str_option(args, '--db', "security_events.db")
+    # Секціонування за часом (day/month) - лише для нової БД
+    partitioning = pop_str_option(args, '--partitioning', None)
+    # Метрики етапів (--metrics - звіт у консоль, --metrics-file - файл у форматі Prometheus)
+    # та необов'язковий профайлинг (--profile - cProfile, --tracemalloc - пам'ять)
+    show_metrics = pop_flag(args, '--metrics')
+    metrics_file = pop_str_option(args, '--metrics-file', None)
+    profiler = Profiler(cpu=pop_flag(args, '--profile'), memory=pop_flag(args, '--tracemalloc'))
+    if show_metrics or metrics_file:
+        METRICS.enable()
+    profiler.start()
     
     try:
         # Створюємо менеджер подій безпеки
-        manager = SecurityEventsManager()
+        manager = SecurityEventsManager(db_path, partitioning=partitioning)
         
         print("✅ Система успішно ініціалізована!")
         print(f"📅 Поточна дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -28,8 +49,8 @@ def main():
         print(f"   • Всього подій в системі: {stats['total_events']}")
         
         # Перевіряємо аргументи командного рядка
-        if len(sys.argv) > 1:
-            handle_command_line_args(manager, sys.argv[1:])
+        if args:
+            handle_command_line_args(manager, args)
         else:
             # Запускаємо інтерактивне меню
             manager.interactive_menu()
@@ -39,10 +60,71 @@ def main():
     except Exception as e:
         print(f"❌ Критична помилка: {e}")
         sys.exit(1)
+    finally:
+        if manager is not None:
+            manager.close()
+        report_metrics(show_metrics, metrics_file, profiler)
+
+def report_metrics(show_metrics: bool, metrics_file: Optional[str], profiler: Profiler):
+    """Вивести зібрані метрики та профіль і записати метрики у файл"""
+    profile_lines = profiler.stop()
+    if profile_lines:
+        print("\n🔬 Профіль:")
+        print('\n'.join(profile_lines))
+    
+    if show_metrics:
+        print("\n📈 Метрики:")
+        print('\n'.join(METRICS.report()) or "   • Немає вимірів")
+    
+    if metrics_file:
+        METRICS.write_prometheus(metrics_file)
+        print(f"💾 Метрики збережено у {metrics_file}")
+
+def pop_flag(args: list, name: str) -> bool:
+    """Витягти з аргументів прапорець без значення (видаляє його зі списку)"""
+    if name in args:
+        args.remove(name)
+        return True
+    return False
+
+def pop_int_option(args: list, name: str, default: int) -> int:
+    """Витягти з аргументів числову опцію виду '<name> <число>' (видаляє її зі списку)"""
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1] if index + 1 < len(args) else ''
+        del args[index:index + 2]
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+        print(f"⚠️ Невірне значення для {name}, використовується {default}")
+    return default
+
+def pop_str_option(args: list, name: str, default: Optional[str]) -> Optional[str]:
+    """Витягти з аргументів рядкову опцію виду '<name> <значення>' (видаляє її зі списку)"""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        del args[index]
+        print(f"⚠️ Не вказано значення для {name}, використовується {default}")
+    return default
 
 def handle_command_line_args(manager: SecurityEventsManager, args: list):
     """Обробка аргументів командного рядка"""
     
+    # Опції паралельного парсингу
+    args = list(args)
+    workers = pop_int_option(args, '--workers', 1)
+    chunk_size = pop_int_option(args, '--chunk-size', DEFAULT_CHUNK_SIZE // (1024 * 1024)) * 1024 * 1024
+    # Ідемпотентний імпорт: без дублікатів при повторному імпорті того самого файлу
+    idempotent = pop_flag(args, '--idempotent')
+    
+    if not args:
+        print("❌ Не вказано команду")
+        print("Використовуйте --help для допомоги")
+        return
+    
     if args[0] == '--help' or args[0] == '-h':
         print_help()
         return
@@ -53,38 +135,136 @@ def handle_command_line_args(manager: SecurityEventsManager, args: list):
         manager._show_statistics()
     
     elif args[0] == '--import' and len(args) >= 3:
-        # Імпорт логів: --import <file_path> <source_name>
+        # Імпорт логів: --import <file_path> <source_name> [batch_size]
         file_path = args[1]
         source_name = args[2]
+        batch_size = int(args[3]) if len(args) >= 4 and args[3].isdigit() and int(args[3]) > 0 else DEFAULT_BATCH_SIZE
         
         if not os.path.exists(file_path):
             print(f"❌ Файл {file_path} не існує")
             return
         
-        print(f"📁 Імпорт логів з файлу {file_path} для джерела {source_name}")
-        imported = manager.import_logs_from_file(file_path, source_name)
+        print(f"📁 Імпорт логів з файлу {file_path} для джерела {source_name} (пакет: {batch_size})")
+        imported = manager.import_logs_from_file(file_path, source_name, batch_size, workers, chunk_size,
+                                                 idempotent)
+        print(f"✅ Імпортовано {imported} записів")
+    
+    elif args[0] == '--follow' and len(args) >= 3:
+        # Стеження за активним лог-файлом: --follow <file_path> <source_name>
+        file_path, source_name = args[1], args[2]
+        imported = manager.follow_log_file(file_path, source_name)
+        print(f"✅ Імпортовано {imported} записів")
+    
+    elif args[0] == '--syslog' and len(args) >= 2:
+        # Мережевий приймач syslog: --syslog <source_name> [port]
+        source_name = args[1]
+        port = int(args[2]) if len(args) >= 3 and args[2].isdigit() else SYSLOG_PORT
+        receiver = SyslogReceiver(manager, source_name, port=port)
+        try:
+            asyncio.run(receiver.serve())
+        except KeyboardInterrupt:
+            pass
+        except (ValueError, OSError) as e:
+            print(f"❌ Помилка: {e}")
+            return
+        stats = receiver.get_stats()
+        print(f"✅ Прийнято {stats['received']} повідомлень, записано {stats['written']}, "
+              f"відкинуто {stats['dropped']}, не розпізнано {stats['parse_failures']}")
+    
+    elif args[0] == '--import-many' and len(args) >= 3:
+        # Імпорт логів з декількох файлів: --import-many <source_name> <file1> [file2 ...]
+        source_name = args[1]
+        file_paths = [path for path in args[2:] if os.path.exists(path)]
+        for missing in set(args[2:]) - set(file_paths):
+            print(f"❌ Файл {missing} не існує")
+        
+        if not file_paths:
+            return
+        
+        print(f"📁 Імпорт логів з {len(file_paths)} файлів для джерела {source_name} (процесів: {workers})")
+        imported = manager.import_logs_from_multiple_files(file_paths, source_name, DEFAULT_BATCH_SIZE,
+                                                           workers, chunk_size, idempotent)
         print(f"✅ Імпортовано {imported} записів")
     
     elif args[0] == '--failed-logins':
         # Показати невдалі входи за 24 години
-        results = manager.get_failed_logins_24h()
+        results = manager.get_failed_logins_24h(RESULTS_DISPLAY_LIMIT)
         manager.print_results_table(results, "Невдалі входи за 24 години")
     
     elif args[0] == '--brute-force':
         # Виявити атаки підбору пароля
-        results = manager.detect_brute_force_attacks()
+        results = manager.detect_brute_force_attacks(RESULTS_DISPLAY_LIMIT)
         manager.print_results_table(results, "Потенційні атаки підбору пароля")
     
     elif args[0] == '--critical':
         # Показати критичні події за тиждень
-        results = manager.get_critical_events_week()
+        results = manager.get_critical_events_week(RESULTS_DISPLAY_LIMIT)
         manager.print_results_table(results, "Критичні події за тиждень")
     
+    elif args[0] == '--summary':
+        # Зведення зі зведених таблиць: --summary [годин] [source] [type] [ip]
+        hours = int(args[1]) if len(args) >= 2 and args[1].isdigit() and int(args[1]) > 0 else 24
+        columns = {'source': 'source_id', 'type': 'event_type_id', 'ip': 'ip_address'}
+        group_by = [columns[arg] for arg in args[1:] if arg in columns] or ['source_id', 'event_type_id']
+        rows = manager.get_event_summary(hours, group_by)
+        manager.print_event_summary(rows, f"Зведення подій за {hours} год.")
+    
+    elif args[0] in ('--top-ips', '--top-users'):
+        # Найактивніші IP / користувачі в підозрілих подіях: --top-ips [годин] [к-сть]
+        hours = int(args[1]) if len(args) >= 2 and args[1].isdigit() and int(args[1]) > 0 else 24
+        k = int(args[2]) if len(args) >= 3 and args[2].isdigit() and int(args[2]) > 0 else RESULTS_DISPLAY_LIMIT
+        if args[0] == '--top-ips':
+            manager.print_heavy_hitters(manager.get_top_ips(k, hours), f"Найактивніші IP за {hours} год.")
+        else:
+            manager.print_heavy_hitters(manager.get_top_users(k, hours), f"Найчастіші цілі-користувачі за {hours} год.")
+    
+    elif args[0] == '--distinct':
+        # Кількість різних IP / користувачів за джерелами: --distinct [годин] [ip|user] [джерело]
+        hours = int(args[1]) if len(args) >= 2 and args[1].isdigit() and int(args[1]) > 0 else 24
+        rest = [arg for arg in args[1:] if not arg.isdigit()]
+        kind = 'user' if rest and rest[0] == 'user' else 'ip'
+        rest = rest[1:] if rest and rest[0] in ('ip', 'user') else rest
+        try:
+            result = manager.get_distinct_counts(kind, hours, rest[0] if rest else None)
+        except ValueError as e:
+            print(f"❌ Помилка: {e}")
+            return
+        label = 'IP-адрес' if kind == 'ip' else 'користувачів'
+        manager.print_distinct_counts(result, f"Різних {label} за {hours} год.")
+    
     elif args[0] == '--search' and len(args) >= 2:
-        # Пошук за ключовим словом: --search <keyword>
+        # Пошук за ключовим словом: --search <keyword> [page] [--rank]
+        order_by = 'rank' if '--rank' in args else 'recent'
+        args = [arg for arg in args if arg != '--rank']
         keyword = args[1]
-        results = manager.search_events_by_keyword(keyword)
-        manager.print_results_table(results, f"Пошук за '{keyword}'")
+        page = int(args[2]) if len(args) >= 3 and args[2].isdigit() and int(args[2]) > 0 else 1
+        results = manager.search_events_ranked(keyword, DEFAULT_SEARCH_LIMIT, (page - 1) * DEFAULT_SEARCH_LIMIT,
+                                               order_by)
+        manager.print_results_table(results, f"Пошук за '{keyword}' (сторінка {page})")
+    
+    elif args[0] == '--convert-compact' and len(args) >= 2:
+        # Конвертувати БД у компактний формат: --convert-compact <новий_файл_БД>
+        try:
+            result = manager.convert_to_compact(args[1])
+        except ValueError as e:
+            print(f"❌ Помилка: {e}")
+            return
+        print(f"✅ Конвертовано {result['events']} подій у {args[1]}: "
+              f"{result['source_size'] / 1024 / 1024:.1f} МБ -> {result['target_size'] / 1024 / 1024:.1f} МБ")
+    
+    elif args[0] == '--retention' and len(args) >= 2 and args[1].isdigit():
+        # Політика зберігання: --retention <днів> (лише для секціонованої БД)
+        try:
+            manager.apply_retention(int(args[1]))
+        except ValueError as e:
+            print(f"❌ Помилка: {e}")
+    
+    elif args[0] == '--archive' and len(args) >= 2 and args[1].isdigit():
+        # Архів старих подій: --archive <днів> [каталог]
+        try:
+            manager.archive_events(int(args[1]), args[2] if len(args) >= 3 else None)
+        except ValueError as e:
+            print(f"❌ Помилка: {e}")
     
     elif args[0] == '--generate-logs':
         # Згенерувати зразкові логи
@@ -126,22 +306,54 @@ def print_help():
 
 ОПЦІЇ:
     --help, -h                    Показати цю довідку
+    --db <файл>                   Файл бази даних (security_events.db)
+    --partitioning <day|month>    Секціонування подій за часом (для нової БД)
     --stats                       Показати статистику системи
-    --import <файл> <джерело>     Імпортувати логи з файлу
+    --import <файл> <джерело> [пакет] Імпортувати логи з файлу (пакет - розмір пакета запису, 1000)
+    --import-many <джерело> <файл1> [файл2 ...] Імпортувати логи з декількох файлів
+    --follow <файл> <джерело>     Стежити за активним лог-файлом (як tail -F, з продовженням після перезапуску)
+    --syslog <джерело> [порт]     Приймати syslog (RFC 3164/5424) по UDP та TCP на 127.0.0.1 (порт 5514)
+    --workers <N>                 Кількість процесів для парсингу (для --import, --import-many)
+    --chunk-size <МБ>             Розмір шматка файлу для паралельного парсингу (32 МБ)
+    --idempotent                  Повторний імпорт без дублікатів (для --import, --import-many)
+    --metrics                     Вивести метрики етапів (парсинг, запис, commit, запити) після команди
+    --metrics-file <файл>         Записати метрики у файл у текстовому форматі Prometheus
+    --profile                     Профіль cProfile (20 найдорожчих функцій) після команди
+    --tracemalloc                 Пікове споживання пам'яті та найбільші алокації після команди
     --failed-logins              Показати невдалі входи за 24 години
     --brute-force                Виявити атаки підбору пароля
     --critical                   Показати критичні події за тиждень
-    --search <ключове_слово>     Пошук подій за ключовим словом
+    --summary [годин] [source] [type] [ip] Кількість подій за останні N годин (24) за джерелами, типами, IP
+    --top-ips [годин] [к-сть]     Найактивніші IP у попередженнях та критичних подіях (24 год., 10)
+    --top-users [годин] [к-сть]   Користувачі, яких найчастіше стосуються такі події
+    --distinct [годин] [ip|user] [джерело] Оцінка кількості різних IP або користувачів за джерелами (HyperLogLog)
+    --search <ключове_слово> [сторінка] [--rank] Повнотекстовий пошук подій по 10 (найновіші або за релевантністю)
     --generate-logs [файл] [к-сть] Згенерувати зразкові логи
     --add-source <назва> <місце> <тип> Додати нове джерело подій
     --add-event-type <назва> <серйозність> Додати новий тип події
+    --convert-compact <файл>      Скопіювати БД у новий файл компактного формату
+    --retention <днів>            Видалити секції, старші за N днів (секціонована БД)
+    --archive <днів> [каталог]    Перенести події, старші за N днів, у стиснутий колонковий архів
 
 ПРИКЛАДИ:
     python main.py                           # Інтерактивне меню
     python main.py --stats                   # Показати статистику
     python main.py --import logs.txt Firewall_A  # Імпорт логів
+    python main.py --import logs.txt Firewall_A 5000  # Імпорт пакетами по 5000
+    python main.py --import-many Firewall_A a.log b.log --workers 8  # Паралельний імпорт
+    python main.py --import logs.txt Firewall_A --idempotent  # Безпечний повтор після збою
+    python main.py --import logs.txt Firewall_A --metrics --metrics-file import.prom  # Де йде час імпорту
+    python main.py --follow /var/log/auth.log Server_Auth  # Стеження за файлом у реальному часі
+    python main.py --syslog Firewall_A 5514  # Приймач syslog; logger -n 127.0.0.1 -P 5514 "test"
+    python main.py --summary 168 ip          # Кількість подій з кожної IP за тиждень
+    python main.py --top-ips 6 20            # 20 найактивніших IP за 6 годин
+    python main.py --distinct 24 ip Firewall_A  # Скільки різних IP за добу
     python main.py --search "malware"        # Пошук за словом "malware"
     python main.py --generate-logs sample.txt 50  # Згенерувати 50 записів
+    python main.py --convert-compact compact.db  # Компактна копія БД
+    python main.py --db compact.db --stats   # Робота з іншим файлом БД
+    python main.py --db events.db --partitioning day --retention 30  # Зберігати 30 днів
+    python main.py --archive 90              # Події старші за 90 днів - в архів security_events_archive/
 
 Без аргументів запускається інтерактивне меню.
 """
@@ -164,15 +376,15 @@ def demo_mode():
     
     # Показуємо різні типи запитів
     print("\n3️⃣ Аналіз невдалих входів за 24 години...")
-    failed_logins = manager.get_failed_logins_24h()
-    manager.print_results_table(failed_logins[:3], "Приклад невдалих входів")
+    failed_logins = manager.get_failed_logins_24h(3)
+    manager.print_results_table(failed_logins, "Приклад невдалих входів")
     
     print("\n4️⃣ Пошук подій з словом 'login'...")
-    search_results = manager.search_events_by_keyword("login")
-    manager.print_results_table(search_results[:3], "Приклад пошуку")
+    search_results = manager.search_events_by_keyword("login", 3)
+    manager.print_results_table(search_results, "Приклад пошуку")
     
     print("\n5️⃣ Виявлення потенційних атак...")
-    brute_force = manager.detect_brute_force_attacks()
+    brute_force = manager.detect_brute_force_attacks(RESULTS_DISPLAY_LIMIT)
     if brute_force:
         manager.print_results_table(brute_force, "Підозрілі IP-адреси")
     else:
@@ -0,0 +1,271 @@
+import time
+import io
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Tuple, Optional, Any, Iterator
+
+# Префікс імен метрик у форматі Prometheus
+METRICS_PREFIX = 'security_events'
+
+# Межі кошиків гістограм затримок (секунди)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Кількість рядків звіту cProfile та tracemalloc
+PROFILE_TOP = 20
+
+# Ключ метрики: назва та відсортовані пари (мітка, значення)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Опис метрик для рядків # HELP
+METRIC_HELP = {
+    'parse_lines_read_total': 'Прочитані з файлу рядки',
+    'parse_bytes_read_total': 'Прочитані з файлу байти',
+    'parse_lines_parsed_total': 'Успішно розпарсені рядки',
+    'parse_failures_total': 'Рядки, на яких парсер завершився з помилкою',
+    'parse_decode_fallbacks_total': 'Переходи на cp1251 після помилки декодування UTF-8',
+    'parse_timestamp_missing_total': 'Рядки без розпізнаного часу (підставлено поточний час)',
+    'parse_timestamp_slow_total': 'Рядки, час яких розібрано перебором паттернів (regex + strptime)',
+    'parse_stage_seconds': 'Час етапів парсингу: read, decode, timestamp, extract, classify',
+    'import_seconds': 'Повний час імпорту файлу (парсинг і запис)',
+    'import_events_parsed_total': 'Розпарсені під час імпорту записи',
+    'db_rows_inserted_total': 'Рядки, вставлені в SecurityEvents',
+    'db_rows_duplicate_total': 'Рядки, пропущені як дублікати (ідемпотентний імпорт)',
+    'db_insert_seconds': 'Час вставки пакета подій (без commit)',
+    'db_commit_seconds': 'Затримка commit транзакції',
+    'db_query_seconds': 'Час виконання запитів SecurityEventsDB',
+}
+
+def metric_key(name: str, **labels: str) -> MetricKey:
+    """Ключ метрики з мітками (для гарячих шляхів обчислюється один раз наперед)"""
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+class MetricsRegistry:
+    """Реєстр лічильників, таймерів (сума і кількість) та гістограм затримок.
+
+    За замовчуванням вимкнений: інструментовані місця перевіряють лише прапорець
+    enabled, тож накладні витрати без --metrics практично нульові. Оновлення
+    значень з кількох потоків не синхронізуються (під блокуванням лише створення
+    нової метрики), тож при паралельному записі значення приблизні.
+    """
+    
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self.enabled = False
+        self.counters: Dict[MetricKey, float] = {}
+        # Таймери: ключ -> [кількість вимірів, сума секунд]
+        self.timers: Dict[MetricKey, List[float]] = {}
+        # Гістограми: ключ -> (межі кошиків, лічильники кошиків + переповнення, [кількість, сума])
+        self.histograms: Dict[MetricKey, Tuple[Tuple[float, ...], List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def enable(self):
+        """Увімкнути збір метрик"""
+        self.enabled = True
+    
+    def disable(self):
+        """Вимкнути збір метрик (накопичені значення зберігаються)"""
+        self.enabled = False
+    
+    def reset(self):
+        """Очистити всі накопичені значення"""
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+            self.histograms.clear()
+    
+    def inc(self, key: MetricKey, value: float = 1):
+        """Збільшити лічильник"""
+        self.counters[key] = self.counters.get(key, 0) + value
+    
+    def add_time(self, key: MetricKey, seconds: float, count: int = 1):
+        """Додати вимір (або count вимірів із сумарним часом seconds) до таймера"""
+        timer = self.timers.get(key)
+        if timer is None:
+            with self._lock:
+                timer = self.timers.setdefault(key, [0, 0.0])
+        timer[0] += count
+        timer[1] += seconds
+    
+    def observe(self, key: MetricKey, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """Додати значення до гістограми"""
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, (buckets, [0] * (len(buckets) + 1), [0, 0.0]))
+        histogram[1][bisect_left(histogram[0], value)] += 1
+        histogram[2][0] += 1
+        histogram[2][1] += value
+    
+    @contextmanager
+    def timer(self, key: MetricKey, histogram: bool = False) -> Iterator[None]:
+        """Виміряти час блоку (histogram=True - також розподіл затримок); без enabled - нічого не робить"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add_time(key, elapsed)
+            if histogram:
+                self.observe(key, elapsed)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Поточні значення: counters, timers (count, seconds), histograms (buckets, counts, count, sum)"""
+        def label(key: MetricKey) -> str:
+            name, labels = key
+            return name + (f"{{{','.join(f'{k}={v}' for k, v in labels)}}}" if labels else '')
+        
+        return {
+            'counters': {label(key): value for key, value in self.counters.items()},
+            'timers': {label(key): {'count': timer[0], 'seconds': timer[1]} for key, timer in self.timers.items()},
+            'histograms': {label(key): {'buckets': list(buckets), 'counts': list(counts),
+                                        'count': totals[0], 'sum': totals[1]}
+                           for key, (buckets, counts, totals) in self.histograms.items()},
+        }
+    
+    def render_prometheus(self) -> str:
+        """Усі метрики у текстовому форматі експозиції Prometheus"""
+        output = io.StringIO()
+        
+        def labels_text(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+        
+        def header(name: str, metric_type: str, described: set):
+            if name in described:
+                return
+            described.add(name)
+            help_text = METRIC_HELP.get(name)
+            if help_text:
+                output.write(f"# HELP {self.prefix}_{name} {help_text}\n")
+            output.write(f"# TYPE {self.prefix}_{name} {metric_type}\n")
+        
+        described = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, 'counter', described)
+            output.write(f"{self.prefix}_{name}{labels_text(labels)} {value:.15g}\n")
+        
+        # Таймери без кошиків - summary без квантилів (лише _count та _sum)
+        for (name, labels), (count, seconds) in sorted(self.timers.items()):
+            if (name, labels) in self.histograms:
+                continue
+            header(name, 'summary', described)
+            output.write(f"{self.prefix}_{name}_count{labels_text(labels)} {count:.15g}\n")
+            output.write(f"{self.prefix}_{name}_sum{labels_text(labels)} {seconds:.9g}\n")
+        
+        for (name, labels), (buckets, counts, totals) in sorted(self.histograms.items()):
+            header(name, 'histogram', described)
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                output.write(f"{self.prefix}_{name}_bucket{labels_text(labels, (('le', f'{bound:g}'),))} {cumulative}\n")
+            output.write(f"{self.prefix}_{name}_bucket{labels_text(labels, (('le', '+Inf'),))} {totals[0]}\n")
+            output.write(f"{self.prefix}_{name}_count{labels_text(labels)} {totals[0]}\n")
+            output.write(f"{self.prefix}_{name}_sum{labels_text(labels)} {totals[1]:.9g}\n")
+        
+        return output.getvalue()
+    
+    def write_prometheus(self, file_path: str):
+        """Записати метрики у файл (формат Prometheus, напр. для node_exporter textfile collector)"""
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(self.render_prometheus())
+    
+    def report(self) -> List[str]:
+        """Рядки короткого звіту для виводу в консоль"""
+        lines = []
+        snapshot = self.snapshot()
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"   • {name}: {value:.15g}")
+        for name, timer in sorted(snapshot['timers'].items()):
+            average = timer['seconds'] / timer['count'] * 1e6 if timer['count'] else 0.0
+            lines.append(f"   • {name}: {timer['seconds']:.3f} с, {timer['count']:.15g} вимірів, "
+                         f"{average:.1f} мкс у середньому")
+        for name, histogram in sorted(snapshot['histograms'].items()):
+            lines.append(f"   • {name} (розподіл): {self._quantiles_text(histogram)}")
+        return lines
+    
+    def _quantiles_text(self, histogram: Dict[str, Any]) -> str:
+        """Оцінка p50/p90/p99 як верхньої межі кошика, в який потрапляє квантиль"""
+        parts = []
+        for quantile in (0.5, 0.9, 0.99):
+            target = quantile * histogram['count']
+            cumulative = 0
+            bound = '+Inf'
+            for upper, count in zip(histogram['buckets'] + [None], histogram['counts']):
+                cumulative += count
+                if cumulative >= target:
+                    bound = f"≤{upper * 1000:g} мс" if upper is not None else f">{histogram['buckets'][-1] * 1000:g} мс"
+                    break
+            parts.append(f"p{int(quantile * 100)} {bound}")
+        return ', '.join(parts)
+
+def timed(name: str, **labels: str):
+    """Декоратор: час виклику функції у таймері name з мітками (лише коли METRICS.enabled)"""
+    key = metric_key(name, **labels)
+    
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                METRICS.add_time(key, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class Profiler:
+    """Необов'язковий профайлинг: cProfile (час за функціями) та tracemalloc (пам'ять)"""
+    
+    def __init__(self, cpu: bool = False, memory: bool = False):
+        self.cpu = cpu
+        self.memory = memory
+        self._profile = None
+    
+    def start(self):
+        """Почати збір профілю"""
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.cpu:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+    
+    def stop(self, stats_path: Optional[str] = None, top: int = PROFILE_TOP) -> List[str]:
+        """Зупинити збір і повернути рядки звіту (stats_path - зберегти профіль cProfile для pstats/snakeviz)"""
+        if self._profile is not None:
+            self._profile.disable()
+        
+        # Знімок пам'яті - до форматування звіту cProfile, щоб не враховувати його алокації
+        memory_lines = []
+        if self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                statistics = tracemalloc.take_snapshot().statistics('lineno')[:top]
+                tracemalloc.stop()
+                memory_lines.append(f"Пам'ять: зараз {current / 1024 / 1024:.1f} МБ, пік {peak / 1024 / 1024:.1f} МБ")
+                memory_lines.extend(str(statistic) for statistic in statistics)
+        
+        lines = []
+        if self._profile is not None:
+            import pstats
+            if stats_path:
+                self._profile.dump_stats(stats_path)
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats('cumulative').print_stats(top)
+            lines.extend(output.getvalue().rstrip().splitlines())
+            self._profile = None
+        return lines + memory_lines
+
+# Глобальний реєстр метрик процесу
+METRICS = MetricsRegistry()
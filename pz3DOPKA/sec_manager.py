@@ -1,19 +1,196 @@
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-from db_mgr import SecurityEventsDB
-from log_manager import LogParser, ParsedLogEntry
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from collections import deque
+from datetime import datetime, timedelta
+from db_mgr import SecurityEventsDB, BulkInsertError, DEFAULT_BATCH_SIZE, DEFAULT_SEARCH_LIMIT
+from log_manager import (LogParser, LogFollower, ParsedLogEntry, DEFAULT_CHUNK_SIZE, file_sha256,
+                         FOLLOW_FLUSH_INTERVAL, FOLLOW_FLUSH_LINES, FOLLOW_POLL_INTERVAL)
+from detectors import BruteForceDetector, BruteForceAlert
+from metrics import METRICS, metric_key
+from sketches import HeavyHitterTracker, DistinctCountTracker
+
+# Кількість записів, які виводить print_results_table
+RESULTS_DISPLAY_LIMIT = 10
+
+# Інтервал фонового ущільнення зведень (хвилини -> години -> дні) при тривалому прийомі подій, секунди
+ROLLUP_COMPACT_INTERVAL = 30.0
+
+# Події цих рівнів серйозності враховуються в найактивніших IP та користувачах (--top-ips, --top-users)
+HEAVY_HITTER_SEVERITIES = ('Warning', 'Critical')
+# Як часто підсумки (heavy hitters, HyperLogLog) з пам'яті записуються в БД при тривалому прийомі подій, секунди
+SKETCH_FLUSH_INTERVAL = 10.0
+
+# Ключі метрик імпорту
+_IMPORT_SECONDS = metric_key('import_seconds')
+_EVENTS_PARSED = metric_key('import_events_parsed_total')
+
+class ResultPage(list):
+    """Сторінка результатів запиту: рядки + загальна кількість результатів та зсув сторінки"""
+    
+    def __init__(self, rows: Iterable[Dict[str, Any]], total: int, offset: int = 0):
+        super().__init__(rows)
+        self.total = total
+        self.offset = offset
+
+class CatalogCache:
+    """Кеш довідників (джерела та типи подій) з доступом за назвою та ID за O(1).
+
+    Довідники маленькі й змінюються рідко, тож завантажуються цілком одним
+    запитом при першому зверненні. Реєстрація через SecurityEventsManager
+    скидає кеш; після змін в обхід менеджера слід викликати invalidate().
+    """
+    
+    def __init__(self, db: SecurityEventsDB):
+        self.db = db
+        self._sources: Optional[List[Dict[str, Any]]] = None
+        self._sources_by_name: Dict[str, Dict[str, Any]] = {}
+        self._sources_by_id: Dict[int, Dict[str, Any]] = {}
+        self._event_types: Optional[List[Dict[str, Any]]] = None
+        self._event_types_by_name: Dict[str, Dict[str, Any]] = {}
+        self._event_types_by_id: Dict[int, Dict[str, Any]] = {}
+    
+    def invalidate(self):
+        """Скинути кеш (наступне звернення перечитає довідники з БД)"""
+        self._sources = None
+        self._event_types = None
+    
+    def _load_sources(self) -> List[Dict[str, Any]]:
+        """Джерела з кешу (завантажуються з БД за потреби)"""
+        sources = self._sources
+        if sources is None:
+            sources = self.db.get_event_sources()
+            self._sources_by_name = {source['name']: source for source in sources}
+            self._sources_by_id = {source['id']: source for source in sources}
+            self._sources = sources
+        return sources
+    
+    def _load_event_types(self) -> List[Dict[str, Any]]:
+        """Типи подій з кешу (завантажуються з БД за потреби)"""
+        event_types = self._event_types
+        if event_types is None:
+            event_types = self.db.get_event_types()
+            self._event_types_by_name = {event_type['type_name']: event_type for event_type in event_types}
+            self._event_types_by_id = {event_type['id']: event_type for event_type in event_types}
+            self._event_types = event_types
+        return event_types
+    
+    def sources(self) -> List[Dict[str, Any]]:
+        """Усі джерела подій (впорядковані за назвою)"""
+        return list(self._load_sources())
+    
+    def source(self, name: str) -> Optional[Dict[str, Any]]:
+        """Джерело за назвою (якщо не знайдено - кеш перечитується один раз:
+        джерело могли зареєструвати в іншому процесі)"""
+        self._load_sources()
+        source = self._sources_by_name.get(name)
+        if source is None:
+            self._sources = None
+            self._load_sources()
+            source = self._sources_by_name.get(name)
+        return source
+    
+    def source_by_id(self, source_id: int) -> Optional[Dict[str, Any]]:
+        """Джерело за ID"""
+        self._load_sources()
+        return self._sources_by_id.get(source_id)
+    
+    def event_types(self) -> List[Dict[str, Any]]:
+        """Усі типи подій (впорядковані за назвою)"""
+        return list(self._load_event_types())
+    
+    def event_types_by_name(self) -> Dict[str, Dict[str, Any]]:
+        """Словник назва типу -> тип події"""
+        self._load_event_types()
+        return self._event_types_by_name
+    
+    def event_type_by_id(self, type_id: int) -> Optional[Dict[str, Any]]:
+        """Тип події за ID"""
+        self._load_event_types()
+        return self._event_types_by_id.get(type_id)
 
 class SecurityEventsManager:
     """Основний клас для управління подіями безпеки"""
     
-    def __init__(self, db_path: str = "security_events.db"):
-        self.db = SecurityEventsDB(db_path)
+    def __init__(self, db_path: str = "security_events.db",
+                 brute_force_detector: Optional[BruteForceDetector] = None,
+                 partitioning: Optional[str] = None):
+        self.db = SecurityEventsDB(db_path, partitioning=partitioning)
+        # Довідники джерел і типів подій (спільні для всіх методів менеджера)
+        self.catalog = CatalogCache(self.db)
         self.parser = LogParser()
+        # Потоковий детектор атак підбору пароля, який отримує події з імпорту
+        self.brute_force_detector = brute_force_detector or BruteForceDetector()
+        self.brute_force_alerts = deque(maxlen=1000)  # Останні сповіщення
+        # Найактивніші IP та користувачі в подозрілих подіях (годинні вікна Space-Saving)
+        self.heavy_hitters = HeavyHitterTracker()
+        # Кількість різних IP та користувачів за джерелами (годинні вікна HyperLogLog)
+        self.distinct_counts = DistinctCountTracker()
+        self._sketches_flushed = time.monotonic()
+        # Фоновий потік ущільнення зведень та подія його зупинки
+        self._compactor: Optional[Tuple[threading.Thread, threading.Event]] = None
+    
+    def close(self):
+        """Закрити з'єднання з базою даних"""
+        self.stop_rollup_compaction()
+        self.flush_sketches()
+        self.db.close()
+    
+    def start_rollup_compaction(self, interval: float = ROLLUP_COMPACT_INTERVAL):
+        """Запустити фонове ущільнення зведень (для --follow та --syslog, де імпорт не завершується)"""
+        if self._compactor is not None:
+            return
+        
+        stop_event = threading.Event()
+        
+        def run():
+            while not stop_event.wait(interval):
+                try:
+                    self.db.compact_rollups()
+                except sqlite3.Error as e:
+                    # Наступна спроба - через interval (зведення змінених годин нікуди не зникають)
+                    print(f"⚠️ Помилка ущільнення зведень: {e}")
+        
+        thread = threading.Thread(target=run, name='rollup-compactor', daemon=True)
+        self._compactor = (thread, stop_event)
+        thread.start()
+    
+    def stop_rollup_compaction(self):
+        """Зупинити фонове ущільнення зведень"""
+        if self._compactor is None:
+            return
+        thread, stop_event = self._compactor
+        stop_event.set()
+        thread.join()
+        self._compactor = None
+    
+    def convert_to_compact(self, target_path: str) -> Dict[str, Any]:
+        """Скопіювати базу даних у новий файл компактного формату"""
+        return self.db.convert_to_compact(target_path)
+    
+    def apply_retention(self, days: int) -> List[str]:
+        """Видалити секції з подіями, старшими за задану кількість днів"""
+        cutoff = datetime.now() - timedelta(days=days)
+        dropped = self.db.drop_partitions_before(cutoff)
+        print(f"🗑️ Видалено секцій: {len(dropped)} (події до {cutoff.strftime('%Y-%m-%d %H:%M')})")
+        return dropped
+    
+    def archive_events(self, days: int, directory: Optional[str] = None) -> Dict[str, Any]:
+        """Перенести події, старші за задану кількість днів, у колонковий архів на диску"""
+        cutoff = datetime.now() - timedelta(days=days)
+        result = self.db.archive_events_before(cutoff, directory)
+        print(f"🗄️ Архівовано подій до {cutoff.strftime('%Y-%m-%d %H:%M')}: {result['events']} "
+              f"у {result['chunks']} файлів ({result['bytes'] / 1024 / 1024:.1f} МБ)")
+        print(f"   Каталог архіву: {result['directory']}")
+        return result
     
     def register_event_source(self, name: str, location: str, source_type: str) -> int:
         """Реєстрація нового джерела подій"""
         try:
             source_id = self.db.register_event_source(name, location, source_type)
+            self.catalog.invalidate()
             print(f"✅ Джерело подій '{name}' успішно зареєстровано з ID: {source_id}")
             return source_id
         except ValueError as e:
@@ -28,6 +205,7 @@ class SecurityEventsManager:
         
         try:
             type_id = self.db.register_event_type(type_name, severity)
+            self.catalog.invalidate()
             print(f"✅ Тип події '{type_name}' успішно зареєстровано з ID: {type_id}")
             return type_id
         except ValueError as e:
@@ -37,149 +215,556 @@ class SecurityEventsManager:
     def log_security_event(self, source_id: int, event_type_id: int, message: str,
                           ip_address: Optional[str] = None, username: Optional[str] = None,
                           timestamp: Optional[datetime] = None) -> int:
-        """Запис нової події безпеки"""
+        """Запис нової події безпеки (після запису подія йде в детектор атак і скетчі, як при імпорті)"""
+        if timestamp is None:
+            timestamp = datetime.now()
+        
         try:
             event_id = self.db.log_security_event(
                 source_id, event_type_id, message, ip_address, username, timestamp
             )
+            self._observe_events([(source_id, event_type_id, message, ip_address, username, timestamp)])
+            self.flush_sketches(SKETCH_FLUSH_INTERVAL)
             print(f"✅ Подія безпеки записана з ID: {event_id}")
             return event_id
         except Exception as e:
             print(f"❌ Помилка запису події: {e}")
             raise
     
-    def import_logs_from_file(self, file_path: str, source_name: str) -> int:
-        """Імпорт логів з файлу"""
+    def import_logs_from_file(self, file_path: str, source_name: str,
+                              batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE, idempotent: bool = False) -> int:
+        """Імпорт логів з файлу (пакетний запис у БД, workers > 1 - паралельний парсинг).
+
+        idempotent=True - файл, уже імпортований для джерела (за SHA-256), пропускається,
+        а події, записані попереднім ідемпотентним імпортом, не дублюються.
+        Повертає кількість записаних подій; якщо імпорт перервано помилкою - кількість
+        подій із пакетів, зафіксованих до неї.
+        """
         print(f"🔄 Початок імпорту логів з файлу: {file_path}")
         
-        # Знаходимо джерело подій за назвою
-        sources = self.db.get_event_sources()
-        source = next((s for s in sources if s['name'] == source_name), None)
-        
+        source = self.find_source(source_name)
         if not source:
             print(f"❌ Джерело '{source_name}' не знайдено")
             return 0
         
-        source_id = source['id']
-        
-        # Отримуємо всі типи подій для швидкого пошуку
-        event_types = {et['type_name']: et for et in self.db.get_event_types()}
-        
-        # Парсимо файл
+        # Парсимо файл потоково, одразу передаючи записи на пакетний запис
         try:
-            parsed_entries = self.parser.parse_log_file(file_path)
-            imported_count = 0
+            if idempotent:
+                file_hash = file_sha256(file_path)
+                if self._is_file_imported(source, file_path, file_hash):
+                    return 0
             
-            for entry in parsed_entries:
-                try:
-                    # Визначаємо тип події
-                    if entry.event_type and entry.event_type in event_types:
-                        event_type_id = event_types[entry.event_type]['id']
-                    else:
-                        # Якщо тип не визначено, використовуємо загальний тип
-                        event_type_id = event_types.get('Login Success', {}).get('id', 1)
-                    
-                    # Записуємо подію в БД
-                    self.db.log_security_event(
-                        source_id=source_id,
-                        event_type_id=event_type_id,
-                        message=entry.message,
-                        ip_address=entry.ip_address,
-                        username=entry.username,
-                        timestamp=entry.timestamp
-                    )
-                    imported_count += 1
-                    
-                except Exception as e:
-                    print(f"⚠️ Помилка імпорту запису: {e}")
-                    continue
+            self._select_log_format(source, file_path)
+            if workers > 1:
+                parsed_entries = self.parser.iter_log_file_parallel(file_path, workers, chunk_size)
+            else:
+                parsed_entries = self.parser.iter_log_file(file_path)
+            imported = self._import_parsed_entries(parsed_entries, source, batch_size, dedup=idempotent)
             
-            print(f"✅ Успішно імпортовано {imported_count} записів з {len(parsed_entries)} розпарсених")
-            return imported_count
+            if idempotent:
+                self.db.record_imported_file(source['id'], file_hash, os.path.abspath(file_path),
+                                             os.path.getsize(file_path), imported)
+            return imported
             
+        except BulkInsertError as e:
+            print(f"❌ Помилка імпорту файлу: {e} (до помилки записано {e.inserted} записів)")
+            return e.inserted
         except Exception as e:
             print(f"❌ Помилка імпорту файлу: {e}")
             return 0
     
-    def import_logs_from_multiple_files(self, file_paths: List[str], source_name: str) -> int:
-        """Імпорт логів з декількох файлів"""
-        total_imported = 0
+    def _is_file_imported(self, source: Dict[str, Any], file_path: str, file_hash: str) -> bool:
+        """Перевірити, чи файл з таким вмістом уже імпортовано для джерела"""
+        record = self.db.get_imported_file(source['id'], file_hash)
+        if not record:
+            return False
+        events = f", {record['events']} записів" if record['events'] is not None else ""
+        print(f"⏭️ Файл {file_path} уже імпортовано для джерела '{source['name']}' "
+              f"({record['imported_at'][:19]}{events}) - пропускаємо")
+        return True
+    
+    def find_source(self, source_name: str) -> Optional[Dict[str, Any]]:
+        """Знайти джерело подій за назвою"""
+        return self.catalog.source(source_name)
+    
+    def _select_log_format(self, source: Dict[str, Any], file_path: str):
+        """Зафіксувати у парсері формат дати файлу джерела (визначається один раз і кешується в БД)"""
+        self.parser.set_format(self._file_log_format(source, file_path))
+    
+    def _file_log_format(self, source: Dict[str, Any], file_path: str) -> Optional[str]:
+        """Формат дати файлу джерела: кешований формат, якщо він підходить до файлу, інакше sniff_format.
+
+        Файли джерела можуть мати різні формати дати; у БД зберігається лише перший визначений.
+        """
+        log_format = source.get('log_format')
+        if log_format and self.parser.format_matches(file_path, log_format):
+            return log_format
+        
+        sniffed = self.parser.sniff_format(file_path)
+        if sniffed and not log_format:
+            self.db.set_source_log_format(source['id'], sniffed)
+            source['log_format'] = sniffed
+            print(f"🔍 Визначено формат дати для '{source['name']}': {sniffed}")
+        return sniffed or log_format
+    
+    def _import_parsed_entries(self, parsed_entries: Iterable[ParsedLogEntry], source: Dict[str, Any],
+                               batch_size: int = DEFAULT_BATCH_SIZE, dedup: bool = False) -> int:
+        """Записати розпарсені записи в БД пакетами"""
+        parsed_count = 0
+        
+        def counted():
+            nonlocal parsed_count
+            for entry in parsed_entries:
+                parsed_count += 1
+                yield entry
+        
+        # Записуємо події в БД пакетами
+        try:
+            with METRICS.timer(_IMPORT_SECONDS):
+                result = self.ingest_entries(counted(), source, batch_size=batch_size, dedup=dedup)
+        finally:
+            self.flush_sketches()
+            if METRICS.enabled:
+                METRICS.inc(_EVENTS_PARSED, parsed_count)
+        imported_count = result['inserted']
+        
+        print(f"✅ Успішно імпортовано {imported_count} записів з {parsed_count} розпарсених")
+        if dedup:
+            print(f"♻️ Пропущено вже імпортованих записів: {result['duplicates']}")
+        if result['failed']:
+            print(f"⚠️ Пропущено записів з помилками: {result['failed']}")
+            for error in result['errors']:
+                print(f"   • {error}")
+        print(f"⏱️ {result['batches']} пакетів по {batch_size}, {result['elapsed']:.2f} с, "
+              f"{result['rows_per_sec']:.0f} записів/с")
+        return imported_count
+    
+    def ingest_entries(self, parsed_entries: Iterable[ParsedLogEntry], source: Dict[str, Any],
+                       batch_size: int = DEFAULT_BATCH_SIZE, dedup: bool = False,
+                       checkpoint: Optional[Tuple[str, Optional[int], int]] = None) -> Dict[str, Any]:
+        """Записати розпарсені записи джерела в БД і передати вставлені події детектору атак та скетчам.
+
+        Спільна точка запису для імпорту з файлу, --follow та syslog. dedup=True - ідемпотентний
+        запис (див. log_security_events_bulk). checkpoint - (файл, inode, позиція) для --follow:
+        записи й позиція у файлі фіксуються в одній транзакції.
+        Повертає статистику запису (inserted, duplicates, failed, errors, batches, elapsed,
+        rows_per_sec); помилка запису - BulkInsertError з кількістю вже зафіксованих подій.
+        """
+        if checkpoint is None:
+            return self.db.log_security_events_bulk(self._event_rows(parsed_entries, source['id'], with_file=dedup),
+                                                    batch_size=batch_size, dedup=dedup,
+                                                    on_inserted=self._observe_events)
+        
+        start = time.perf_counter()
+        rows = list(self._event_rows(parsed_entries, source['id']))
+        try:
+            inserted = self.db.log_followed_events(source['id'], rows, *checkpoint)
+        except Exception as e:
+            # Пакет разом з позицією відкочено повністю
+            raise BulkInsertError(str(e), 0) from e
+        self._observe_events(rows)
+        elapsed = time.perf_counter() - start
+        return {
+            'inserted': inserted,
+            'duplicates': 0,
+            'failed': 0,
+            'errors': [],
+            'batches': 1,
+            'elapsed': elapsed,
+            'rows_per_sec': len(rows) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def _event_rows(self, parsed_entries: Iterable[ParsedLogEntry], source_id: int,
+                    with_file: bool = False) -> Iterator[Tuple]:
+        """Розпарсені записи -> рядки для запису в БД (with_file - з файлом запису як потоком
+        для нумерації повторів при ідемпотентному записі)"""
+        # Типи подій для швидкого пошуку за назвою
+        event_types = self.catalog.event_types_by_name()
+        # Якщо тип не визначено, використовуємо загальний тип
+        default_type_id = event_types.get('Login Success', {}).get('id', 1)
+        
+        for entry in parsed_entries:
+            # Визначаємо тип події
+            if entry.event_type and entry.event_type in event_types:
+                event_type_id = event_types[entry.event_type]['id']
+            else:
+                event_type_id = default_type_id
+            
+            if with_file:
+                yield (source_id, event_type_id, entry.message,
+                       entry.ip_address, entry.username, entry.timestamp, entry.source_file)
+            else:
+                yield (source_id, event_type_id, entry.message,
+                       entry.ip_address, entry.username, entry.timestamp)
+    
+    def _observe_events(self, rows: List[Tuple]):
+        """Потокове виявлення атак та скетчі за вже записаними подіями.
+
+        Викликається після commit лише для справді вставлених рядків, тож повторний
+        імпорт (дублікати) і відкочені пакети не потрапляють у лічильники.
+        """
+        failed_type = self.catalog.event_types_by_name().get('Login Failed')
+        failed_type_id = failed_type['id'] if failed_type else None
+        
+        for source_id, event_type_id, message, ip_address, username, timestamp in rows:
+            # Потокове виявлення атак під час імпорту
+            if event_type_id == failed_type_id and ip_address:
+                alert = self.brute_force_detector.observe(ip_address, timestamp)
+                if alert:
+                    self._on_brute_force_alert(alert)
+            
+            # Найактивніші IP та користувачі серед підозрілих подій
+            event_type = self.catalog.event_type_by_id(event_type_id)
+            if event_type and event_type['severity'] in HEAVY_HITTER_SEVERITIES:
+                self.heavy_hitters.observe(timestamp, ip_address, username)
+                if self.heavy_hitters.full:
+                    self.flush_sketches()
+            
+            # Різні IP та користувачі джерела (усі події)
+            self.distinct_counts.observe(source_id, timestamp, ip_address, username)
+            if self.distinct_counts.full:
+                self.flush_sketches()
+    
+    def follow_log_file(self, file_path: str, source_name: str,
+                        flush_interval: float = FOLLOW_FLUSH_INTERVAL, flush_lines: int = FOLLOW_FLUSH_LINES,
+                        poll_interval: float = FOLLOW_POLL_INTERVAL,
+                        stop_event: Optional[threading.Event] = None) -> int:
+        """Стежити за активним лог-файлом (як tail -F) до Ctrl+C або stop_event.
+
+        Нові рядки записуються пакетами не рідше ніж раз на flush_interval секунд
+        або кожні flush_lines рядків. Позиція у файлі зберігається в джерелі в тій
+        же транзакції, що й пакет, тож перезапуск продовжує читання без дублікатів.
+        """
+        source = self.find_source(source_name)
+        if not source:
+            print(f"❌ Джерело '{source_name}' не знайдено")
+            return 0
+        
+        file_path = os.path.abspath(file_path)
+        checkpoint = self.db.get_follow_checkpoint(source['id'])
+        if checkpoint and checkpoint['path'] == file_path:
+            follower = LogFollower(file_path, checkpoint['offset'], checkpoint['inode'])
+            print(f"📍 Продовження з позиції {checkpoint['offset']} байт")
+        else:
+            follower = LogFollower(file_path)
+        
+        if os.path.exists(file_path):
+            self._select_log_format(source, file_path)
+        else:
+            self.parser.set_format(source.get('log_format'))
+        
+        print(f"👀 Стеження за файлом {file_path} для джерела {source_name} (Ctrl+C - зупинка)")
+        self.start_rollup_compaction()
+        pending = []
+        pending_lines = 0
+        pending_since = None
+        imported = 0
+        
+        def flush():
+            nonlocal pending, pending_lines, pending_since, imported
+            result = self.ingest_entries(pending, source, checkpoint=(file_path, follower.inode, follower.offset))
+            imported += result['inserted']
+            pending, pending_lines, pending_since = [], 0, None
+            self.flush_sketches(SKETCH_FLUSH_INTERVAL)
+        
+        try:
+            try:
+                while stop_event is None or not stop_event.is_set():
+                    lines = follower.read_lines(flush_lines - pending_lines)
+                    if lines:
+                        if pending_since is None:
+                            pending_since = time.monotonic()
+                        pending_lines += len(lines)
+                        for line in lines:
+                            try:
+                                entry = self.parser.parse_log_line(line)
+                            except Exception as e:
+                                print(f"Помилка при парсингу рядка: {e}")
+                                continue
+                            if entry:
+                                pending.append(entry)
+                    
+                    if pending_since is not None and (pending_lines >= flush_lines or
+                                                      time.monotonic() - pending_since >= flush_interval):
+                        flush()
+                    elif not lines:
+                        # Не чекаємо довше, ніж залишилось до запису накопиченого пакета
+                        wait = poll_interval
+                        if pending_since is not None:
+                            wait = min(wait, max(0.0, pending_since + flush_interval - time.monotonic()))
+                        if stop_event is not None:
+                            stop_event.wait(wait)
+                        else:
+                            time.sleep(wait)
+            except KeyboardInterrupt:
+                pass
+            
+            if pending_lines:
+                flush()
+        finally:
+            follower.close()
+            self.stop_rollup_compaction()
+        
+        print(f"✅ Стеження завершено: імпортовано {imported} записів "
+              f"(ротацій: {follower.rotations}, обрізань: {follower.truncations})")
+        return imported
+    
+    def flush_sketches(self, min_interval: float = 0.0):
+        """Записати накопичені в пам'яті вікна heavy hitters та HyperLogLog у БД
+        (не частіше ніж раз на min_interval секунд)"""
+        if min_interval and time.monotonic() - self._sketches_flushed < min_interval:
+            return
+        self._sketches_flushed = time.monotonic()
         
-        for file_path in file_paths:
-            imported = self.import_logs_from_file(file_path, source_name)
-            total_imported += imported
+        windows = self.heavy_hitters.drain()
+        distinct_windows = self.distinct_counts.drain()
+        if not windows and not distinct_windows:
+            return
+        with self.db.transaction():
+            for hour, summaries in windows:
+                for kind, summary in summaries.items():
+                    if summary.total:
+                        self.db.merge_heavy_hitters(kind, hour, summary)
+            for (source_id, hour), sketches in distinct_windows:
+                for kind, sketch in sketches.items():
+                    if any(sketch.registers):
+                        self.db.merge_distinct_sketch(source_id, kind, hour, sketch)
+    
+    def get_top_ips(self, k: int = RESULTS_DISPLAY_LIMIT, hours: int = 24) -> Dict[str, Any]:
+        """Найактивніші IP-адреси в підозрілих подіях за останні hours годин (оцінка Space-Saving)"""
+        self.flush_sketches()
+        end = datetime.now()
+        return self.db.get_heavy_hitters('ip', end - timedelta(hours=hours), end, k)
+    
+    def get_top_users(self, k: int = RESULTS_DISPLAY_LIMIT, hours: int = 24) -> Dict[str, Any]:
+        """Найчастіші цілі (користувачі) підозрілих подій за останні hours годин (оцінка Space-Saving)"""
+        self.flush_sketches()
+        end = datetime.now()
+        return self.db.get_heavy_hitters('user', end - timedelta(hours=hours), end, k)
+    
+    def print_heavy_hitters(self, result: Dict[str, Any], title: str):
+        """Вивести найчастіші елементи з межами оцінки кількості"""
+        if not result['items']:
+            print(f"\n📋 {title}: Дані не знайдено")
+            return
+        
+        print(f"\n📋 {title} (з {result['total']} підозрілих подій):")
+        print("=" * 80)
+        for i, row in enumerate(result['items'], 1):
+            estimate = f"{row['count']}" if not row['error'] else f"{row['count'] - row['error']}..{row['count']}"
+            print(f"{i}. {row['item']} | Подій: {estimate}")
+    
+    def get_distinct_counts(self, kind: str = 'ip', hours: int = 24,
+                            source_name: Optional[str] = None) -> Dict[str, Any]:
+        """Оцінка кількості різних IP ('ip') або користувачів ('user') за останні hours годин (HyperLogLog).
+
+        Повертає estimate, standard_error та sources - оцінки за назвами джерел.
+        """
+        source_id = None
+        if source_name is not None:
+            source = self.find_source(source_name)
+            if not source:
+                raise ValueError(f"Джерело '{source_name}' не знайдено")
+            source_id = source['id']
+        
+        self.flush_sketches()
+        end = datetime.now()
+        result = self.db.get_distinct_counts(kind, end - timedelta(hours=hours), end, source_id)
+        sources = {}
+        for source_id, estimate in result['sources'].items():
+            source = self.catalog.source_by_id(source_id)
+            sources[source['name'] if source else str(source_id)] = estimate
+        result['sources'] = dict(sorted(sources.items(), key=lambda item: -item[1]))
+        return result
+    
+    def print_distinct_counts(self, result: Dict[str, Any], title: str):
+        """Вивести оцінки кількості різних елементів з похибкою"""
+        if not result['sources']:
+            print(f"\n📋 {title}: Дані не знайдено")
+            return
+        
+        error = result['standard_error'] * 100
+        print(f"\n📋 {title}: ~{result['estimate']} (похибка ±{error:.1f}%, 95% оцінок у межах ±{2 * error:.1f}%)")
+        print("=" * 80)
+        for name, estimate in result['sources'].items():
+            print(f"   • {name}: ~{estimate}")
+    
+    def _on_brute_force_alert(self, alert: BruteForceAlert):
+        """Обробка сповіщення потокового детектора атак підбору пароля"""
+        self.brute_force_alerts.append(alert)
+        print(f"🚨 Можлива атака підбору пароля з {alert.ip_address}: {alert.failed_attempts} невдалих спроб "
+              f"з {alert.first_attempt} по {alert.last_attempt}")
+    
+    def import_logs_from_multiple_files(self, file_paths: List[str], source_name: str,
+                                        batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1,
+                                        chunk_size: int = DEFAULT_CHUNK_SIZE, idempotent: bool = False) -> int:
+        """Імпорт логів з декількох файлів (workers > 1 - паралельний парсинг усіх файлів)"""
+        if workers > 1:
+            source = self.find_source(source_name)
+            if not source:
+                print(f"❌ Джерело '{source_name}' не знайдено")
+                return 0
+            
+            try:
+                # Нечитабельний файл пропускається, як і при послідовному імпорті
+                file_hashes = {}
+                formats = {}
+                readable_paths = []
+                for file_path in file_paths:
+                    try:
+                        if idempotent:
+                            file_hashes[file_path] = file_sha256(file_path)
+                            if self._is_file_imported(source, file_path, file_hashes[file_path]):
+                                continue
+                        formats[file_path] = self._file_log_format(source, file_path)
+                    except OSError as e:
+                        print(f"❌ Помилка імпорту файлу {file_path}: {e}")
+                        continue
+                    readable_paths.append(file_path)
+                
+                total_imported = 0
+                if readable_paths:
+                    self.parser.set_format(source.get('log_format'))
+                    parsed_entries = self.parser.parse_multiple_log_files(readable_paths, workers, chunk_size, formats)
+                    total_imported = self._import_parsed_entries(parsed_entries, source, batch_size, dedup=idempotent)
+                
+                # Записи файлів об'єднані за часом, тож кількість подій окремого файлу невідома;
+                # пропущені через помилку файли не позначаються імпортованими
+                if idempotent:
+                    for file_path in readable_paths:
+                        if file_path in self.parser.skipped_files:
+                            continue
+                        self.db.record_imported_file(source['id'], file_hashes[file_path],
+                                                     os.path.abspath(file_path), os.path.getsize(file_path), None)
+            except BulkInsertError as e:
+                print(f"❌ Помилка імпорту файлів: {e} (до помилки записано {e.inserted} записів)")
+                total_imported = e.inserted
+            except Exception as e:
+                print(f"❌ Помилка імпорту файлів: {e}")
+                total_imported = 0
+        else:
+            total_imported = 0
+            for file_path in file_paths:
+                imported = self.import_logs_from_file(file_path, source_name, batch_size, idempotent=idempotent)
+                total_imported += imported
         
         print(f"🎯 Загалом імпортовано {total_imported} записів з {len(file_paths)} файлів")
         return total_imported
     
-    def get_failed_logins_24h(self) -> List[Dict[str, Any]]:
-        """Отримати всі події 'Login Failed' за останні 24 години"""
-        results = self.db.get_failed_logins_24h()
-        print(f"🔍 Знайдено {len(results)} невдалих спроб входу за останні 24 години")
+    def get_failed_logins_24h(self, limit: Optional[int] = None) -> ResultPage:
+        """Отримати події 'Login Failed' за останні 24 години (limit - лише перші записи)"""
+        results = ResultPage(*self.db.page_failed_logins_24h(limit))
+        print(f"🔍 Знайдено {results.total} невдалих спроб входу за останні 24 години")
         return results
     
-    def detect_brute_force_attacks(self) -> List[Dict[str, Any]]:
+    def detect_brute_force_attacks(self, limit: Optional[int] = None) -> ResultPage:
         """Виявити потенційні атаки підбору пароля"""
-        results = self.db.detect_brute_force_attacks()
-        print(f"🚨 Виявлено {len(results)} підозрілих IP-адрес з множинними невдалими спробами входу")
+        results = ResultPage(*self.db.page_brute_force_attacks(limit))
+        print(f"🚨 Виявлено {results.total} підозрілих IP-адрес з множинними невдалими спробами входу")
         return results
     
-    def get_critical_events_week(self) -> List[Dict[str, Any]]:
+    def get_critical_events_week(self, limit: Optional[int] = None) -> ResultPage:
         """Отримати критичні події за тиждень, згруповані за джерелом"""
-        results = self.db.get_critical_events_week()
-        print(f"⚠️ Знайдено критичні події з {len(results)} джерел за останній тиждень")
+        results = ResultPage(*self.db.page_critical_events_week(limit))
+        print(f"⚠️ Знайдено критичні події з {results.total} джерел за останній тиждень")
         return results
     
-    def search_events_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+    def search_events_by_keyword(self, keyword: str, limit: Optional[int] = None) -> ResultPage:
         """Пошук подій за ключовим словом"""
-        results = self.db.search_events_by_keyword(keyword)
-        print(f"🔎 Знайдено {len(results)} подій з ключовим словом '{keyword}'")
+        results = ResultPage(*self.db.page_events_by_keyword(keyword, limit))
+        print(f"🔎 Знайдено {results.total} подій з ключовим словом '{keyword}'")
+        return results
+    
+    def search_events_ranked(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT,
+                             offset: int = 0, order_by: str = 'rank') -> ResultPage:
+        """Повнотекстовий пошук подій сторінками (за релевантністю або найновіші першими)"""
+        results = ResultPage(*self.db.page_events_ranked(query, limit, offset, order_by), offset)
+        print(f"🔎 Знайдено {results.total} подій для '{query}' (показано з {offset + 1}-ї)")
         return results
     
     def get_event_sources(self) -> List[Dict[str, Any]]:
         """Отримати всі джерела подій"""
-        return self.db.get_event_sources()
+        return self.catalog.sources()
     
     def get_event_types(self) -> List[Dict[str, Any]]:
         """Отримати всі типи подій"""
-        return self.db.get_event_types()
+        return self.catalog.event_types()
     
     def get_statistics(self) -> Dict[str, Any]:
         """Отримати статистику системи"""
         sources = self.get_event_sources()
         event_types = self.get_event_types()
         
-        # Get recent events count
-        from datetime import timedelta
-        recent_events = self.search_events_by_keyword("")  # Get all events
+        # Кількість подій - з таблиці лічильників, без читання самих подій
+        counts = self.db.get_event_counts()
         
         stats = {
             'total_sources': len(sources),
             'total_event_types': len(event_types),
-            'total_events': len(recent_events),
+            'total_events': counts['total'],
+            'events_by_source': counts['by_source'],
+            'events_by_type': counts['by_type'],
+            'events_by_severity': counts['by_severity'],
+            'events_by_day': counts['by_day'],
             'sources': sources,
             'event_types': event_types
         }
         
         return stats
     
+    def get_event_summary(self, hours: int = 24, group_by: Iterable[str] = ('source_id', 'event_type_id'),
+                          end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Кількість подій за останні hours годин зі зведених таблиць (з назвами джерел і типів)"""
+        end = end or datetime.now()
+        rows = self.db.get_rollup_counts(end - timedelta(hours=hours), end, group_by)
+        for row in rows:
+            if 'source_id' in row:
+                source = self.catalog.source_by_id(row['source_id'])
+                row['source_name'] = source['name'] if source else None
+            if 'event_type_id' in row:
+                event_type = self.catalog.event_type_by_id(row['event_type_id'])
+                row['type_name'] = event_type['type_name'] if event_type else None
+        return rows
+    
+    def print_event_summary(self, rows: List[Dict[str, Any]], title: str, limit: int = RESULTS_DISPLAY_LIMIT):
+        """Вивести зведення: групи (джерело, тип, IP) з кількістю подій"""
+        if not rows:
+            print(f"\n📋 {title}: Дані не знайдено")
+            return
+        
+        print(f"\n📋 {title} ({sum(row['count'] for row in rows)} подій, {len(rows)} груп):")
+        print("=" * 80)
+        for i, row in enumerate(rows[:limit], 1):
+            labels = [f"{label}: {row[key] or 'N/A'}" for key, label in
+                      (('source_name', 'Джерело'), ('type_name', 'Тип'), ('ip_address', 'IP')) if key in row]
+            labels.append(f"Подій: {row['count']}")
+            print(f"{i}. {' | '.join(labels)}")
+        
+        if len(rows) > limit:
+            print(f"... та ще {len(rows) - limit} груп")
+    
     def generate_sample_logs(self, file_path: str = "sample_logs.txt", num_entries: int = 100):
         """Генерувати зразкові логи для тестування"""
         self.parser.generate_sample_log_file(file_path, num_entries)
         return file_path
     
     def print_results_table(self, results: List[Dict[str, Any]], title: str = "Результати"):
-        """Вивести результати у вигляді таблиці"""
+        """Вивести результати у вигляді таблиці (для ResultPage - із загальною кількістю записів)"""
         if not results:
             print(f"\n📋 {title}: Дані не знайдено")
             return
         
-        print(f"\n📋 {title} ({len(results)} записів):")
+        total = getattr(results, 'total', len(results))
+        offset = getattr(results, 'offset', 0)
+        shown = min(len(results), RESULTS_DISPLAY_LIMIT)
+        
+        print(f"\n📋 {title} ({total} записів):")
         print("=" * 80)
         
         # Визначаємо, які поля показувати
         if 'timestamp' in results[0]:
-            for i, result in enumerate(results[:10], 1):  # Показуємо перші 10 записів
+            for i, result in enumerate(results[:shown], offset + 1):  # Показуємо перші 10 записів
                 print(f"{i}. {result.get('timestamp', 'N/A')} | "
                       f"Джерело: {result.get('source_name', 'N/A')} | "
                       f"Тип: {result.get('type_name', 'N/A')} | "
@@ -189,12 +774,13 @@ class SecurityEventsManager:
                 print("-" * 80)
         else:
             # Для інших типів результатів
-            for i, result in enumerate(results, 1):
+            for i, result in enumerate(results[:shown], offset + 1):
                 print(f"{i}. {result}")
                 print("-" * 80)
         
-        if len(results) > 10:
-            print(f"... та ще {len(results) - 10} записів")
+        remaining = total - offset - shown
+        if remaining > 0:
+            print(f"... та ще {remaining} записів")
     
     def interactive_menu(self):
         """Інтерактивне меню для роботи з системою"""
@@ -232,18 +818,18 @@ class SecurityEventsManager:
                 elif choice == '5':
                     self._import_logs_interactive()
                 elif choice == '6':
-                    results = self.get_failed_logins_24h()
+                    results = self.get_failed_logins_24h(RESULTS_DISPLAY_LIMIT)
                     self.print_results_table(results, "Невдалі входи за 24 години")
                 elif choice == '7':
-                    results = self.detect_brute_force_attacks()
+                    results = self.detect_brute_force_attacks(RESULTS_DISPLAY_LIMIT)
                     self.print_results_table(results, "Підозрілі IP-адреси")
                 elif choice == '8':
-                    results = self.get_critical_events_week()
+                    results = self.get_critical_events_week(RESULTS_DISPLAY_LIMIT)
                     self.print_results_table(results, "Критичні події за тиждень")
                 elif choice == '9':
                     keyword = input("Введіть ключове слово для пошуку: ").strip()
                     if keyword:
-                        results = self.search_events_by_keyword(keyword)
+                        results = self.search_events_ranked(keyword, order_by='recent')
                         self.print_results_table(results, f"Пошук за '{keyword}'")
                 elif choice == '10':
                     file_path = input("Шлях до файлу (натисніть Enter для 'sample_logs.txt'): ").strip()
@@ -271,11 +857,23 @@ class SecurityEventsManager:
         
         print(f"\n📍 ДЖЕРЕЛА ПОДІЙ:")
         for source in stats['sources']:
-            print(f"  • {source['name']} ({source['type']}) - {source['location']}")
+            print(f"  • {source['name']} ({source['type']}) - {source['location']}: "
+                  f"{stats['events_by_source'].get(source['name'], 0)} подій")
         
         print(f"\n🏷️  ТИПИ ПОДІЙ:")
         for event_type in stats['event_types']:
-            print(f"  • {event_type['type_name']} [{event_type['severity']}]")
+            print(f"  • {event_type['type_name']} [{event_type['severity']}]: "
+                  f"{stats['events_by_type'].get(event_type['type_name'], 0)} подій")
+        
+        print(f"\n⚠️  ЗА СЕРЙОЗНІСТЮ:")
+        for severity, count in sorted(stats['events_by_severity'].items()):
+            print(f"  • {severity}: {count}")
+        
+        partitions = self.db.get_partitions()
+        if partitions:
+            print(f"\n🗂️  СЕКЦІЇ ({self.db.partitioning}):")
+            for partition in partitions:
+                print(f"  • {partition['name']}: {partition['events']} подій")
     
     def _register_source_interactive(self):
         """Інтерактивна реєстрація джерела"""
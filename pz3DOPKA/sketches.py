@@ -0,0 +1,319 @@
+import heapq
+import hashlib
+import math
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, List, Tuple, Optional, Iterable
+
+# Кількість елементів, які відстежує одна підсумкова структура Space-Saving
+TOPK_CAPACITY = 1000
+
+# Кількість часових вікон, що тримаються в пам'яті до запису в БД
+TOPK_MAX_WINDOWS = 48
+
+# Точність HyperLogLog: 2^12 = 4096 регістрів, стандартна похибка 1.04 / 64 = 1.6%
+HLL_PRECISION = 12
+
+# 2^-r для кожного можливого значення регістра
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+class SpaceSaving:
+    """Часті елементи потоку (heavy hitters) алгоритмом Space-Saving у фіксованій пам'яті.
+
+    Відстежується не більше capacity елементів. Новий елемент, коли місця немає,
+    витісняє елемент з найменшим лічильником і успадковує його значення як похибку.
+    Для кожного елемента count - error <= справжня частота <= count, похибка не
+    перевищує total / capacity, а будь-який елемент з частотою понад total / capacity
+    гарантовано присутній. Елементи згруповано в кошики за значенням лічильника,
+    тож додавання і витіснення - O(1).
+    """
+    
+    __slots__ = ('capacity', 'total', 'base_floor', 'counts', 'errors', '_buckets', '_min')
+    
+    def __init__(self, capacity: int = TOPK_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Місткість має бути додатним числом")
+        self.capacity = capacity
+        self.total = 0
+        # Межа частоти елементів, не відстежених до відновлення (для підсумків, відновлених з БД)
+        self.base_floor = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Лічильник -> елементи з таким лічильником (dict як впорядкована множина)
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min = 0
+    
+    def __len__(self) -> int:
+        return len(self.counts)
+    
+    @property
+    def floor(self) -> int:
+        """Верхня межа частоти будь-якого невідстежуваного елемента"""
+        if len(self.counts) >= self.capacity:
+            return max(self._min, self.base_floor)
+        return self.base_floor
+    
+    def add(self, item: str, count: int = 1):
+        """Врахувати count появ елемента"""
+        self.total += count
+        current = self.counts.get(item)
+        if current is not None:
+            self._move(item, current, current + count)
+            return
+        
+        if len(self.counts) < self.capacity:
+            # Елемент міг зустрічатися до base_floor разів, поки не відстежувався
+            initial = self.base_floor + count
+            self.counts[item] = initial
+            self.errors[item] = self.base_floor
+            self._buckets.setdefault(initial, {})[item] = None
+            if len(self.counts) == 1 or initial < self._min:
+                self._min = initial
+            return
+        
+        # Витісняємо найдавніший елемент з мінімальним лічильником
+        bucket = self._buckets[self._min]
+        victim = next(iter(bucket))
+        minimum = self._min
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = minimum
+        self.errors[item] = minimum
+        del bucket[victim]
+        bucket[item] = None
+        self._move(item, minimum, minimum + count)
+    
+    def _move(self, item: str, old: int, new: int):
+        """Перенести елемент з кошика old у кошик new"""
+        bucket = self._buckets[old]
+        del bucket[item]
+        self._buckets.setdefault(new, {})[item] = None
+        self.counts[item] = new
+        if not bucket:
+            del self._buckets[old]
+            if old == self._min:
+                # При збільшенні на 1 наступний мінімум - new; інакше шукаємо серед кошиків
+                self._min = new if new == old + 1 else min(self._buckets)
+    
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """k найчастіших елементів: (елемент, count, error) за спаданням count"""
+        return [(item, count, self.errors[item])
+                for item, count in heapq.nlargest(k, self.counts.items(), key=itemgetter(1))]
+    
+    def rows(self) -> List[Tuple[str, int, int]]:
+        """Усі відстежувані елементи: (елемент, count, error)"""
+        return [(item, count, self.errors[item]) for item, count in self.counts.items()]
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, int]], total: int, floor: int,
+                  capacity: int = TOPK_CAPACITY) -> 'SpaceSaving':
+        """Відновити підсумок зі збережених рядків (floor - межа для невідстежуваних елементів)"""
+        summary = cls(capacity)
+        for item, count, error in rows:
+            summary.counts[item] = count
+            summary.errors[item] = error
+            summary._buckets.setdefault(count, {})[item] = None
+        summary.total = total
+        summary.base_floor = floor
+        summary._min = min(summary._buckets) if summary._buckets else 0
+        return summary
+    
+    @classmethod
+    def merge(cls, summaries: Iterable['SpaceSaving'], capacity: int = TOPK_CAPACITY) -> 'SpaceSaving':
+        """Об'єднати підсумки (наприклад, годинні вікна) в один з тими ж гарантіями.
+
+        Елемент, відсутній у заповненому підсумку, міг зустрітися там до floor разів,
+        тож floor додається і до count, і до error. Залишаються capacity найбільших.
+        """
+        summaries = list(summaries)
+        floors = [summary.floor for summary in summaries]
+        items = set()
+        for summary in summaries:
+            items.update(summary.counts)
+        
+        merged_rows = []
+        for item in items:
+            count = error = 0
+            for summary, floor in zip(summaries, floors):
+                item_count = summary.counts.get(item)
+                if item_count is None:
+                    count += floor
+                    error += floor
+                else:
+                    count += item_count
+                    error += summary.errors[item]
+            merged_rows.append((item, count, error))
+        
+        kept = heapq.nlargest(capacity, merged_rows, key=itemgetter(1))
+        # Елементи, яких немає в жодному підсумку, зустрічались не більше sum(floors) разів,
+        # а відкинуті - не більше за найменший залишений лічильник
+        floor = sum(floors)
+        if len(merged_rows) > capacity:
+            floor = max(floor, kept[-1][1])
+        return cls.from_rows(kept, sum(summary.total for summary in summaries), floor, capacity)
+
+def window_key(timestamp: datetime) -> str:
+    """Ключ годинного вікна: 'YYYY-MM-DDTHH' (префікс ISO-часу, як у зведених таблицях)"""
+    return timestamp.isoformat()[:13]
+
+class HeavyHitterTracker:
+    """Найактивніші IP-адреси та користувачі в годинних вікнах за часом подій.
+
+    Кожне вікно - два підсумки Space-Saving ('ip' та 'user'), тож пам'ять обмежена
+    capacity елементами на вікно незалежно від кількості різних IP. Накопичені вікна
+    забираються drain() для запису в БД.
+    """
+    
+    KINDS = ('ip', 'user')
+    
+    def __init__(self, capacity: int = TOPK_CAPACITY, max_windows: int = TOPK_MAX_WINDOWS):
+        self.capacity = capacity
+        self.max_windows = max_windows
+        self.windows: 'OrderedDict[str, Dict[str, SpaceSaving]]' = OrderedDict()
+    
+    def observe(self, timestamp: datetime, ip_address: Optional[str], username: Optional[str]):
+        """Врахувати подію"""
+        key = window_key(timestamp)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = {kind: SpaceSaving(self.capacity) for kind in self.KINDS}
+        if ip_address:
+            window['ip'].add(ip_address)
+        if username:
+            window['user'].add(username)
+    
+    @property
+    def full(self) -> bool:
+        """Чи час записати вікна в БД (кількість вікон досягла max_windows)"""
+        return len(self.windows) >= self.max_windows
+    
+    def drain(self) -> List[Tuple[str, Dict[str, SpaceSaving]]]:
+        """Забрати всі накопичені вікна (для запису в БД)"""
+        windows = list(self.windows.items())
+        self.windows.clear()
+        return windows
+    
+    def top(self, kind: str, k: int, since: Optional[datetime] = None) -> List[Tuple[str, int, int]]:
+        """k найчастіших елементів у вікнах пам'яті, починаючи з вікна since"""
+        since_key = window_key(since) if since else ''
+        summaries = [window[kind] for key, window in self.windows.items() if key >= since_key]
+        if len(summaries) == 1:
+            return summaries[0].top(k)
+        return SpaceSaving.merge(summaries, self.capacity).top(k)
+
+class HyperLogLog:
+    """Оцінка кількості різних елементів (HyperLogLog) у фіксованій пам'яті.
+
+    m = 2^precision регістрів по байту; відносна стандартна похибка оцінки -
+    1.04 / sqrt(m) (при precision=12 - 1.6%, 95% оцінок у межах ±3.3%). Підсумки
+    об'єднуються поелементним максимумом регістрів без втрати точності, тож оцінка
+    за будь-який набір годинних вікон має ту саму похибку, що й за одне вікно.
+    """
+    
+    __slots__ = ('precision', 'registers')
+    
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("Точність HyperLogLog має бути від 4 до 16")
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+    
+    @property
+    def standard_error(self) -> float:
+        """Відносна стандартна похибка оцінки: 1.04 / sqrt(m)"""
+        return 1.04 / math.sqrt(len(self.registers))
+    
+    def add(self, item: str):
+        """Врахувати елемент (повтори не змінюють оцінку)"""
+        value = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = value >> (64 - self.precision)
+        # Позиція першої одиниці в решті 64 - precision бітів хешу
+        rank = 64 - self.precision - (value & ((1 << (64 - self.precision)) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def update(self, other: 'HyperLogLog'):
+        """Об'єднати з іншим підсумком тієї ж точності (на місці)"""
+        if other.precision != self.precision:
+            raise ValueError("Об'єднувати можна лише підсумки HyperLogLog однакової точності")
+        self.registers = HyperLogLog.merge((self, other), self.precision).registers
+    
+    @classmethod
+    def merge(cls, summaries: Iterable['HyperLogLog'], precision: int = HLL_PRECISION) -> 'HyperLogLog':
+        """Об'єднати підсумки (наприклад, годинні вікна) за один прохід по регістрах"""
+        registers = [summary.registers for summary in summaries]
+        if any(len(summary_registers) != 1 << precision for summary_registers in registers):
+            raise ValueError("Об'єднувати можна лише підсумки HyperLogLog однакової точності")
+        if not registers:
+            return cls(precision)
+        
+        # Поелементний максимум байтів над регістрами як одним великим цілим (SWAR): значення
+        # регістрів < 128, тож (a | 0x80) - b у кожному байті не позичає з сусіднього, а старший
+        # біт байта результату показує, що a >= b. Це в десятки разів швидше за map(max, ...)
+        size = 1 << precision
+        high = int.from_bytes(b'\x80' * size, 'big')
+        result = int.from_bytes(registers[0], 'big')
+        for summary_registers in registers[1:]:
+            other = int.from_bytes(summary_registers, 'big')
+            mask = ((((result | high) - other) & high) >> 7) * 0xFF
+            result = (result & mask) | (other & ~mask)
+        return cls(precision, bytearray(result.to_bytes(size, 'big')))
+    
+    def estimate(self) -> int:
+        """Оцінка кількості різних елементів"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Мала кількість елементів: точніша оцінка за часткою порожніх регістрів (linear counting)
+            return round(m * math.log(m / zeros))
+        return round(raw)
+    
+    def to_bytes(self) -> bytes:
+        """Стиснуті регістри для збереження в BLOB"""
+        return zlib.compress(bytes(self.registers))
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        """Відновити підсумок з to_bytes() (точність визначається за кількістю регістрів)"""
+        registers = bytearray(zlib.decompress(data))
+        return cls(len(registers).bit_length() - 1, registers)
+
+class DistinctCountTracker:
+    """Кількість різних IP-адрес та користувачів для кожного джерела в годинних вікнах.
+
+    Вікно (джерело, година) - два підсумки HyperLogLog ('ip' та 'user') по
+    2^HLL_PRECISION байт. Накопичені вікна забираються drain() для запису в БД.
+    """
+    
+    KINDS = ('ip', 'user')
+    
+    def __init__(self, precision: int = HLL_PRECISION, max_windows: int = TOPK_MAX_WINDOWS):
+        self.precision = precision
+        self.max_windows = max_windows
+        self.windows: Dict[Tuple[int, str], Dict[str, HyperLogLog]] = {}
+    
+    def observe(self, source_id: int, timestamp: datetime, ip_address: Optional[str], username: Optional[str]):
+        """Врахувати подію джерела"""
+        key = (source_id, window_key(timestamp))
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = {kind: HyperLogLog(self.precision) for kind in self.KINDS}
+        if ip_address:
+            window['ip'].add(ip_address)
+        if username:
+            window['user'].add(username)
+    
+    @property
+    def full(self) -> bool:
+        """Чи час записати вікна в БД (кількість вікон досягла max_windows)"""
+        return len(self.windows) >= self.max_windows
+    
+    def drain(self) -> List[Tuple[Tuple[int, str], Dict[str, HyperLogLog]]]:
+        """Забрати всі накопичені вікна (для запису в БД)"""
+        windows = list(self.windows.items())
+        self.windows.clear()
+        return windows
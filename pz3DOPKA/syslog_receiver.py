@@ -0,0 +1,378 @@
+"""
+Приймач syslog-повідомлень (RFC 3164 / RFC 5424) по UDP та TCP на asyncio.
+
+Мережевий цикл лише складає сирі повідомлення в обмежену чергу; розбір
+LogParser та пакетний запис у SecurityEventsDB виконуються в окремому потоці.
+Коли черга заповнена, UDP-повідомлення відкидаються (лічильник dropped),
+а TCP-з'єднання призупиняють читання, доки в черзі не з'явиться місце.
+"""
+
+import asyncio
+import re
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from log_manager import LogParser
+from db_mgr import BulkInsertError
+from sec_manager import SKETCH_FLUSH_INTERVAL
+
+# Адреса та порт за замовчуванням (стандартний порт 514 потребує прав root)
+SYSLOG_HOST = '127.0.0.1'
+SYSLOG_PORT = 5514
+
+# Максимальна кількість повідомлень, що очікують на запис у БД
+SYSLOG_QUEUE_SIZE = 100000
+
+# Пакет записується в БД кожні SYSLOG_BATCH_SIZE повідомлень або SYSLOG_FLUSH_INTERVAL секунд
+SYSLOG_BATCH_SIZE = 1000
+SYSLOG_FLUSH_INTERVAL = 0.5
+
+# Максимальний розмір одного повідомлення (байти); довші TCP-повідомлення обрізаються
+SYSLOG_MAX_MESSAGE = 64 * 1024
+
+# Скільки UDP-датаграм читати за одне пробудження циклу подій (одна датаграма -
+# одне повідомлення; asyncio.DatagramProtocol читає лише одну на пробудження)
+SYSLOG_UDP_READ_BATCH = 256
+SYSLOG_UDP_RCVBUF = 8 * 1024 * 1024
+
+# Заголовок <PRI> та версія RFC 5424 ("<34>1 "), решта рядка розбирається LogParser
+_HEADER_RE = re.compile(r'<\d{1,3}>(?:1 )?')
+# Кадрування TCP з підрахунком октетів (RFC 6587): "<довжина> <PRI>..."
+_OCTET_COUNT_RE = re.compile(rb'(\d{1,5}) <')
+
+def strip_syslog_header(message: str) -> str:
+    """Прибрати з повідомлення заголовок <PRI> (та версію RFC 5424)"""
+    match = _HEADER_RE.match(message)
+    return message[match.end():] if match else message
+
+class _SyslogTCPProtocol(asyncio.Protocol):
+    """TCP-потік повідомлень, розділених переведенням рядка або з підрахунком октетів"""
+    
+    def __init__(self, receiver: 'SyslogReceiver'):
+        self.receiver = receiver
+        self.transport = None
+        self._buffer = bytearray()
+        self._pending = deque()  # Повідомлення, що не вмістилися в чергу
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self.receiver._connections.add(self)
+    
+    def connection_lost(self, exc):
+        self.receiver._connections.discard(self)
+    
+    def data_received(self, data: bytes):
+        self._buffer += data
+        frames = self._split_frames()
+        if self._pending:
+            self._pending.extend(frames)
+            return
+        
+        for index, frame in enumerate(frames):
+            if not self.receiver.offer(frame):
+                # Черга заповнена: перестаємо читати сокет, доки не допишемо відкладене
+                self._pending.extend(frames[index:])
+                self.transport.pause_reading()
+                task = asyncio.ensure_future(self._drain())
+                self.receiver._drain_tasks.add(task)
+                task.add_done_callback(self.receiver._drain_tasks.discard)
+                return
+    
+    async def _drain(self):
+        """Дочекатися місця в черзі для відкладених повідомлень і відновити читання"""
+        while self._pending:
+            await self.receiver.put(self._pending.popleft())
+        if not self.transport.is_closing():
+            self.transport.resume_reading()
+    
+    def _split_frames(self) -> List[bytes]:
+        """Виділити з буфера повні повідомлення"""
+        buffer = self._buffer
+        frames = []
+        position = 0
+        while position < len(buffer):
+            match = _OCTET_COUNT_RE.match(buffer, position)
+            if match:
+                start = match.end(1) + 1
+                end = start + int(match.group(1))
+                if end > len(buffer):
+                    break
+                position = end
+            else:
+                start = position
+                end = buffer.find(b'\n', position)
+                if end < 0:
+                    break
+                position = end + 1
+            frames.append(bytes(buffer[start:end]))
+        del buffer[:position]
+        
+        if len(buffer) > SYSLOG_MAX_MESSAGE:
+            frames.append(bytes(buffer[:SYSLOG_MAX_MESSAGE]))
+            buffer.clear()
+        return frames
+
+class SyslogReceiver:
+    """Мережевий приймач syslog, що записує події в БД через SecurityEventsManager.
+
+    Усі повідомлення записуються для одного джерела подій; типи подій та
+    потоковий детектор атак - ті самі, що й при імпорті з файлу.
+    """
+    
+    def __init__(self, manager, source_name: str, host: str = SYSLOG_HOST, port: int = SYSLOG_PORT,
+                 udp: bool = True, tcp: bool = True, queue_size: int = SYSLOG_QUEUE_SIZE,
+                 batch_size: int = SYSLOG_BATCH_SIZE, flush_interval: float = SYSLOG_FLUSH_INTERVAL):
+        if not udp and not tcp:
+            raise ValueError("Потрібно увімкнути хоча б один протокол (UDP або TCP)")
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("Розмір черги та пакета мають бути додатними числами")
+        
+        self.manager = manager
+        self.source_name = source_name
+        self.host = host
+        self.port = port
+        self.udp = udp
+        self.tcp = tcp
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Окремий парсер: формат дати syslog не залежить від формату файлів джерела
+        self.parser = LogParser()
+        
+        # Лічильники
+        self.received = 0        # Прийнято в чергу
+        self.dropped = 0         # Відкинуто через заповнену чергу (UDP)
+        self.written = 0         # Записано в БД
+        self.parse_failures = 0  # Порожні або нерозпізнані повідомлення
+        self.write_errors = 0    # Повідомлення з пакетів, які не вдалося записати
+        self.batches = 0
+        self.max_queued = 0
+        
+        self._source = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writer_task = None
+        self._udp_socket = None
+        self._tcp_server = None
+        self._connections = set()
+        self._drain_tasks = set()
+        self._started = None
+    
+    def offer(self, message: bytes) -> bool:
+        """Додати повідомлення в чергу без очікування (False - черга заповнена)"""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        self.received += 1
+        return True
+    
+    def _read_datagrams(self):
+        """Вичитати з UDP-сокета до SYSLOG_UDP_READ_BATCH датаграм за одне пробудження"""
+        recv = self._udp_socket.recv
+        for _ in range(SYSLOG_UDP_READ_BATCH):
+            try:
+                message = recv(SYSLOG_MAX_MESSAGE)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not self.offer(message):
+                self.dropped += 1
+    
+    async def put(self, message: bytes):
+        """Додати повідомлення в чергу, очікуючи на місце (зворотний тиск для TCP)"""
+        await self._queue.put(message)
+        self.received += 1
+    
+    async def start(self):
+        """Відкрити сокети та запустити запис у БД"""
+        source = self.manager.find_source(self.source_name)
+        if not source:
+            raise ValueError(f"Джерело '{self.source_name}' не знайдено")
+        self._source = source
+        
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        # Один потік запису: з'єднання SQLite та детектор атак використовуються лише з нього
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._writer_task = asyncio.create_task(self._write_loop())
+        
+        if self.udp:
+            family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            try:
+                # Більший буфер сокета згладжує сплески (обмежується net.core.rmem_max)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SYSLOG_UDP_RCVBUF)
+                sock.bind((self.host, self.port))
+            except OSError:
+                sock.close()
+                raise
+            sock.setblocking(False)
+            self._udp_socket = sock
+            loop.add_reader(sock.fileno(), self._read_datagrams)
+        if self.tcp:
+            self._tcp_server = await loop.create_server(lambda: _SyslogTCPProtocol(self), self.host, self.port)
+        
+        self._started = time.perf_counter()
+    
+    async def stop(self):
+        """Закрити сокети, дописати чергу в БД та зупинити потік запису"""
+        if self._udp_socket is not None:
+            asyncio.get_running_loop().remove_reader(self._udp_socket.fileno())
+            self._udp_socket.close()
+            self._udp_socket = None
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            for connection in list(self._connections):
+                connection.transport.close()
+            await self._tcp_server.wait_closed()
+        # Відкладені TCP-повідомлення мають потрапити в чергу раніше за сигнал завершення
+        if self._drain_tasks:
+            await asyncio.gather(*self._drain_tasks)
+        
+        if self._writer_task is not None:
+            await self._queue.put(None)  # Сигнал завершення після всіх повідомлень
+            await self._writer_task
+            self._writer_task = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    async def serve(self, stop_event: Optional[asyncio.Event] = None):
+        """Приймати повідомлення до stop_event (або до скасування / Ctrl+C)"""
+        await self.start()
+        self.manager.start_rollup_compaction()
+        print(f"📡 Приймач syslog: {self.host}:{self.port} "
+              f"({', '.join(name for name, enabled in (('UDP', self.udp), ('TCP', self.tcp)) if enabled)}) "
+              f"для джерела {self.source_name}")
+        try:
+            if stop_event is not None:
+                await stop_event.wait()
+            else:
+                await asyncio.Future()
+        finally:
+            await self.stop()
+            self.manager.stop_rollup_compaction()
+    
+    async def _write_loop(self):
+        """Збирати пакети з черги (до batch_size або flush_interval) і записувати їх у потоці запису"""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            
+            batch = [message]
+            deadline = loop.time() + self.flush_interval
+            finished = False
+            while len(batch) < self.batch_size:
+                try:
+                    message = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        message = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if message is None:
+                    finished = True
+                    break
+                batch.append(message)
+            
+            self.max_queued = max(self.max_queued, queue.qsize() + len(batch))
+            await loop.run_in_executor(self._executor, self._write_batch, batch)
+            if finished:
+                return
+    
+    def _write_batch(self, batch: List[bytes]):
+        """Розібрати пакет повідомлень і записати його в БД (потік запису)"""
+        entries = []
+        for message in batch:
+            line = strip_syslog_header(message.decode('utf-8', errors='replace'))
+            try:
+                entry = self.parser.parse_log_line(line)
+            except Exception:
+                entry = None
+            if entry:
+                entries.append(entry)
+            else:
+                self.parse_failures += 1
+        
+        try:
+            result = self.manager.ingest_entries(entries, self._source, batch_size=self.batch_size)
+        except BulkInsertError as e:
+            # Частина пакета могла бути зафіксована до помилки
+            self.written += e.inserted
+            self.write_errors += len(entries) - e.inserted
+            print(f"❌ Помилка запису пакета syslog: {e}")
+            return
+        self.written += result['inserted']
+        self.write_errors += result['failed']
+        self.batches += 1
+        self.manager.flush_sketches(SKETCH_FLUSH_INTERVAL)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Лічильники приймача"""
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        return {
+            'received': self.received,
+            'dropped': self.dropped,
+            'written': self.written,
+            'parse_failures': self.parse_failures,
+            'write_errors': self.write_errors,
+            'batches': self.batches,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'max_queued': self.max_queued,
+            'elapsed': elapsed,
+        }
+
+def generate_syslog_messages(count: int, rfc5424: bool = False) -> List[bytes]:
+    """Синтетичні syslog-повідомлення (невдалі та успішні входи, сканування портів)"""
+    now = datetime.now()
+    templates = [
+        'sshd[{pid}]: Failed login for user admin{n} from 203.0.113.{ip} port 22',
+        'sshd[{pid}]: Login success for user user{n} from 192.168.1.{ip}',
+        'kernel: Port scan detected from 198.51.100.{ip}',
+        'sshd[{pid}]: Authentication failure for root from 10.0.{n}.{ip}',
+    ]
+    if rfc5424:
+        header = f'<34>1 {now.strftime("%Y-%m-%dT%H:%M:%S")}.000Z host1 '
+    else:
+        header = f'<34>{now.strftime("%b %d %H:%M:%S")} host1 '
+    return [(header + templates[i % len(templates)].format(pid=1000 + i % 50, n=i % 200, ip=i % 250 + 1)).encode()
+            for i in range(count)]
+
+def send_syslog_load(count: int, host: str = SYSLOG_HOST, port: int = SYSLOG_PORT,
+                     protocol: str = 'udp', rfc5424: bool = False) -> Dict[str, Any]:
+    """Локальний генератор навантаження: надіслати count повідомлень якнайшвидше"""
+    if protocol not in ('udp', 'tcp'):
+        raise ValueError("Протокол має бути 'udp' або 'tcp'")
+    
+    messages = generate_syslog_messages(min(count, 10000), rfc5424)
+    start = time.perf_counter()
+    if protocol == 'udp':
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect((host, port))
+            send = sock.send
+            for i in range(count):
+                send(messages[i % len(messages)])
+    else:
+        with socket.create_connection((host, port)) as sock:
+            # Кадрування переведенням рядка, по 1000 повідомлень за один sendall
+            chunk = 1000
+            for first in range(0, count, chunk):
+                size = min(chunk, count - first)
+                sock.sendall(b''.join(messages[(first + i) % len(messages)] + b'\n' for i in range(size)))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'sent': count,
+        'elapsed': elapsed,
+        'messages_per_sec': count / elapsed if elapsed > 0 else 0.0
+    }
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import zlib
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from array import array
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+from archive import ChunkFile, write_chunk, scan_chunks, count_chunks
+from sec_manager import SecurityEventsManager
+
+IDS = [1, 2, 3, 5, 8, 13]
+TIMESTAMPS = [100, 100, 250, 400, 400, 900]
+SOURCES = [3, -1, 0, 2 ** 40, 7, 3]
+MESSAGES = ['Failed password for root', None, 'Accepted publickey для адміна', '', 'FAILED login 100%_done',
+            'Mirai botnet detected']
+USERS = [None, None, 'root', 'admin', None, 'guest']
+
+def swap_byte_order(path: str):
+    """Переписати файл архіву так, ніби його створено на машині з протилежним порядком байтів"""
+    with ChunkFile(path) as chunk:
+        rows = chunk.rows
+        blocks = {}
+        for name, description in chunk.columns.items():
+            raw = chunk._raw(name)
+            if description['codec'] == 'text':
+                null_count = array('i', raw[rows * 4:(rows + 1) * 4])[0]
+                header = array('i')
+                header.frombytes(raw[:(rows + 1 + null_count) * 4])
+                header.byteswap()
+                raw = header.tobytes() + raw[len(header) * 4:]
+            else:
+                values = array('q')
+                values.frombytes(raw)
+                values.byteswap()
+                raw = values.tobytes()
+            blocks[name] = (description, zlib.compress(raw))
+    
+    descriptions, offset = {}, 0
+    for name, (description, block) in blocks.items():
+        descriptions[name] = dict(description, offset=offset, length=len(block))
+        offset += len(block)
+    byteorder = 'big' if sys.byteorder == 'little' else 'little'
+    header = json.dumps({'rows': rows, 'byteorder': byteorder, 'columns': descriptions}).encode('utf-8')
+    with open(path, 'wb') as file:
+        file.write(archive.ARCHIVE_MAGIC + archive._HEADER_LENGTH.pack(len(header)) + header)
+        file.write(b''.join(block for _, block in blocks.values()))
+
+class ArchiveTestCase(unittest.TestCase):
+    """Файли архіву: запис, читання колонок та фільтри scan_chunks"""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = self.write('events.evc', IDS, TIMESTAMPS, SOURCES, MESSAGES, USERS)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def write(self, name, ids, timestamps, sources, messages, users) -> str:
+        path = os.path.join(self.directory, name)
+        write_chunk(path, {
+            'id': ('int-delta', ids),
+            'timestamp': ('int-delta', timestamps),
+            'source_id': ('int', sources),
+            'message': ('text', messages),
+            'username': ('text', users),
+        })
+        return path
+    
+    def scan(self, filters, columns=('id',), paths=None):
+        return [row[0] if len(columns) == 1 else row
+                for row in scan_chunks(paths or [self.path], list(columns), filters)]
+    
+    def test_round_trip(self):
+        with ChunkFile(self.path) as chunk:
+            self.assertEqual(chunk.rows, len(IDS))
+            self.assertEqual(list(chunk.read_column('id')), IDS)
+            self.assertEqual(list(chunk.read_column('timestamp')), TIMESTAMPS)
+            self.assertEqual(list(chunk.read_column('source_id')), SOURCES)
+            self.assertEqual(chunk.read_column('message'), MESSAGES)
+            self.assertEqual(chunk.read_column('username'), USERS)
+            self.assertEqual(chunk.read_column('message', [1, 2, 4]), [MESSAGES[1], MESSAGES[2], MESSAGES[4]])
+            self.assertEqual(chunk.read_column('source_id', [3]), [SOURCES[3]])
+    
+    def test_null_and_empty_text_differ(self):
+        with ChunkFile(self.path) as chunk:
+            messages = chunk.read_column('message')
+        self.assertIsNone(messages[1])
+        self.assertEqual(messages[3], '')
+    
+    def test_all_null_and_empty_columns(self):
+        path = self.write('nulls.evc', [1, 2], [10, 20], [1, 1], [None, None], [None, None])
+        with ChunkFile(path) as chunk:
+            self.assertEqual(chunk.read_column('message'), [None, None])
+        self.assertEqual(self.scan([('message', 'like', '%%')], paths=[path]), [])
+        
+        path = self.write('empty.evc', [], [], [], [], [])
+        with ChunkFile(path) as chunk:
+            self.assertEqual(chunk.rows, 0)
+            self.assertEqual(chunk.read_column('message'), [])
+        self.assertEqual(self.scan([], paths=[path]), [])
+    
+    def test_byte_swapped_file(self):
+        swap_byte_order(self.path)
+        with ChunkFile(self.path) as chunk:
+            self.assertTrue(chunk._swap)
+            self.assertEqual(list(chunk.read_column('id')), IDS)
+            self.assertEqual(list(chunk.read_column('source_id')), SOURCES)
+            self.assertEqual(chunk.read_column('message'), MESSAGES)
+            self.assertEqual(chunk.read_column('username'), USERS)
+        self.assertEqual(self.scan([('timestamp', 'range', (250, 900))]), [3, 5, 8])
+        self.assertEqual(self.scan([('message', 'like', '%failed%')]), [1, 8])
+    
+    def test_range_filter(self):
+        # Відсортований час - бінарний пошук, source_id - перевірка кожного значення
+        self.assertEqual(self.scan([('timestamp', 'range', (100, 400))]), [1, 2, 3])
+        self.assertEqual(self.scan([('timestamp', 'range', (None, 101))]), [1, 2])
+        self.assertEqual(self.scan([('timestamp', 'range', (400, None))]), [5, 8, 13])
+        self.assertEqual(self.scan([('source_id', 'range', (0, 8))]), [1, 3, 8, 13])
+        self.assertEqual(self.scan([('timestamp', 'range', (250, None)), ('source_id', 'range', (5, None))]), [5, 8])
+    
+    def test_unsorted_delta_column(self):
+        path = self.write('unsorted.evc', [1, 2, 3], [300, 100, 200], [1, 1, 1], ['a', 'b', 'c'], [None] * 3)
+        with ChunkFile(path) as chunk:
+            self.assertFalse(chunk.columns['timestamp']['sorted'])
+            self.assertEqual(list(chunk.read_column('timestamp')), [300, 100, 200])
+        self.assertEqual(self.scan([('timestamp', 'range', (150, 301))], paths=[path]), [1, 3])
+    
+    def test_in_filter(self):
+        self.assertEqual(self.scan([('source_id', 'in', {3, 7})]), [1, 8, 13])
+        self.assertEqual(self.scan([('username', 'in', {'root', None})]), [3])
+    
+    def test_like_filter(self):
+        self.assertEqual(self.scan([('message', 'like', '%failed%')]), [1, 8])
+        self.assertEqual(self.scan([('message', 'like', '%MIRAI%')]), [13])
+        # Без урахування регістру лише для ASCII, як у SQLite
+        self.assertEqual(self.scan([('message', 'like', '%ДЛЯ%')]), [])
+        self.assertEqual(self.scan([('message', 'like', '%для%')]), [3])
+    
+    def test_like_wildcards(self):
+        self.assertEqual(self.scan([('message', 'like', '%f_iled%')]), [1, 8])
+        self.assertEqual(self.scan([('message', 'like', '%password%root')]), [1])
+        self.assertEqual(self.scan([('message', 'like', 'failed%')]), [1, 8])
+        self.assertEqual(self.scan([('message', 'like', '%100%')]), [8])
+        self.assertEqual(self.scan([('message', 'like', '%')]), [1, 3, 5, 8, 13])
+        self.assertEqual(self.scan([('message', 'like', '_')]), [])
+        self.assertEqual(self.scan([('message', 'like', '')]), [5])
+    
+    def test_like_matches_sqlite(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE events (id INTEGER, message TEXT)')
+        conn.executemany('INSERT INTO events VALUES (?, ?)', zip(IDS, MESSAGES))
+        for pattern in ('%fail%', '%_d%', '%o_t', 'accepted%', '%%', '%0%\\_%', '%detected'):
+            expected = [row[0] for row in conn.execute('SELECT id FROM events WHERE message LIKE ? ORDER BY id',
+                                                       (pattern,))]
+            self.assertEqual(self.scan([('message', 'like', pattern)]), expected, pattern)
+    
+    def test_count_and_tail(self):
+        other = self.write('other.evc', [21, 22], [1000, 1100], [3, 4], ['failed again', None], ['x', None])
+        filters = [('message', 'like', '%failed%')]
+        self.assertEqual(count_chunks([self.path, other], filters), 3)
+        self.assertEqual(count_chunks([self.path], [('timestamp', 'range', (100, 401))]), 5)
+        self.assertEqual(count_chunks([self.path], [('source_id', 'in', {99})]), 0)
+        self.assertEqual(self.scan(filters, paths=[self.path, other]), [1, 8, 21])
+        self.assertEqual([row[0] for row in scan_chunks([self.path, other], ['id'], filters, tail=1)], [8, 21])
+        self.assertEqual([row[0] for row in scan_chunks([self.path], ['id'], [], tail=2)], [8, 13])
+        self.assertEqual(list(scan_chunks([self.path], ['id'], [], tail=0)), [])
+    
+    def test_empty_results(self):
+        self.assertEqual(self.scan([('message', 'like', '%xyz%')]), [])
+        self.assertEqual(self.scan([('timestamp', 'range', (1000, None))]), [])
+        self.assertEqual(self.scan([('source_id', 'in', set())]), [])
+        self.assertEqual(self.scan([('message', 'like', '%failed%'), ('source_id', 'in', {0})]), [])
+        self.assertEqual(list(scan_chunks([], ['id'])), [])
+    
+    def test_multiple_files_and_columns(self):
+        other = self.write('other.evc', [21, 22], [1000, 1100], [3, 4], ['failed again', None], ['x', None])
+        rows = self.scan([('message', 'like', '%failed%')], ('id', 'message', 'username'), [self.path, other])
+        self.assertEqual(rows, [(1, MESSAGES[0], None), (8, MESSAGES[4], None), (21, 'failed again', 'x')])
+    
+    def test_invalid_files(self):
+        bad = os.path.join(self.directory, 'bad.evc')
+        with open(bad, 'wb') as file:
+            file.write(b'not an archive')
+        with self.assertRaises(ValueError):
+            ChunkFile(bad)
+        
+        empty = os.path.join(self.directory, 'empty_file.evc')
+        open(empty, 'wb').close()
+        with self.assertRaises(ValueError):
+            ChunkFile(empty)
+        
+        with self.assertRaises(ValueError):
+            write_chunk(os.path.join(self.directory, 'x.evc'), {'a': ('int', [1]), 'b': ('int', [1, 2])})
+        with self.assertRaises(ValueError):
+            write_chunk(os.path.join(self.directory, 'x.evc'), {'a': ('float', [1.0])})
+        with self.assertRaises(ValueError):
+            self.scan([('source_id', 'between', (1, 2))])
+
+class ArchiveEventsTestCase(unittest.TestCase):
+    """Архівування подій БД: статистика та зведення не змінюються, події не губляться"""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = datetime.now().replace(microsecond=0)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def create(self, partitioning=None) -> SecurityEventsManager:
+        manager = SecurityEventsManager(os.path.join(self.directory, f'{partitioning}.db'), partitioning=partitioning)
+        self.addCleanup(manager.close)
+        manager.db.log_security_events_bulk(
+            (1 + index % 3, 1 + index % 4, f'Failed password for user{index % 7} from 10.0.0.{index % 5}',
+             f'10.0.0.{index % 5}', f'user{index % 7}', self.now - timedelta(days=index % 20, seconds=index * 37))
+            for index in range(400))
+        return manager
+    
+    def snapshot(self, manager: SecurityEventsManager):
+        statistics = manager.get_statistics()
+        del statistics['sources'], statistics['event_types']
+        # Межі діапазону не вирівняні по хвилинах - краї рахуються з сирих подій
+        rollups = manager.db.get_rollup_counts(self.now - timedelta(days=30, seconds=13), self.now + timedelta(seconds=1),
+                                               ('source_id', 'event_type_id', 'ip_address'))
+        # Відрізок коротший за хвилину навколо події з index = 15 (лише сирі події)
+        event_time = self.now - timedelta(days=15, seconds=15 * 37)
+        edge = manager.db.get_rollup_counts(event_time - timedelta(seconds=5), event_time + timedelta(seconds=5),
+                                            ('ip_address',), source_id=1)
+        self.assertEqual(edge, [{'ip_address': '10.0.0.0', 'count': 1}])
+        return statistics, sorted(rollups, key=repr)
+    
+    def assertArchivedWithAggregates(self, partitioning):
+        manager = self.create(partitioning)
+        before = self.snapshot(manager)
+        keyword = manager.db.count_events_by_keyword('user3')
+        
+        result = manager.db.archive_events_before(self.now - timedelta(days=10), os.path.join(self.directory, 'archive'))
+        self.assertGreater(result['events'], 0)
+        self.assertEqual(self.snapshot(manager), before)
+        self.assertEqual(manager.db.count_events_by_keyword('user3'), keyword)
+    
+    def test_archive_keeps_aggregates(self):
+        self.assertArchivedWithAggregates(None)
+    
+    def test_archive_keeps_aggregates_partitioned(self):
+        self.assertArchivedWithAggregates('day')
+    
+    def test_pages_over_archive(self):
+        db = self.create().db
+        pages = [db.page_events_by_keyword('user3', limit, offset) for limit, offset in ((5, 0), (5, 40), (100, 0))]
+        everything = [row['id'] for row in db.iter_events_by_keyword('user3')]
+        db.archive_events_before(self.now - timedelta(days=5), os.path.join(self.directory, 'archive'))
+        
+        for (limit, offset), (rows, total) in zip(((5, 0), (5, 40), (100, 0)), pages):
+            after_rows, after_total = db.page_events_by_keyword('user3', limit, offset)
+            self.assertEqual(after_total, total)
+            self.assertEqual([row['timestamp'] for row in after_rows], [row['timestamp'] for row in rows])
+        self.assertEqual(sorted(row['id'] for row in db.iter_events_by_keyword('user3')), sorted(everything))
+        
+        # Для сторінки з архіву завантажується лише offset + limit найновіших збігів, решта лише рахується
+        archived = db._load_archived_events(None, None, [('message', 'like', '%user3%')], newest=7)
+        try:
+            self.assertEqual(archived.loaded, 7)
+            self.assertEqual(archived.loaded + archived.rest(), db.count_events_by_keyword('user3') -
+                             db.get_connection().execute("SELECT COUNT(*) FROM SecurityEvents WHERE message LIKE '%user3%'")
+                             .fetchone()[0])
+        finally:
+            db._release_archive_table(archived)
+    
+    def test_partition_written_during_archiving(self):
+        manager = self.create('day')
+        db = manager.db
+        old = self.now - timedelta(days=15)
+        write_archive_chunk = db._write_archive_chunk
+        late_ids = []
+        
+        def write_and_insert(directory, rows):
+            # Подія у стару секцію, вставлена після того, як архівування прочитало max_id
+            if not late_ids:
+                late_ids.append(db.log_security_event(1, 2, 'late event', '10.9.9.9', None, old))
+            return write_archive_chunk(directory, rows)
+        
+        db._write_archive_chunk = write_and_insert
+        total = db.count_events_by_keyword('%')
+        db.archive_events_before(self.now - timedelta(days=10), os.path.join(self.directory, 'archive'))
+        
+        self.assertEqual(db.count_events_by_keyword('%'), total + 1)
+        self.assertEqual([row['id'] for row in db.search_events_by_keyword('late event')], late_ids)
+        self.assertIn(db._partition_bounds(old)[0], [partition['name'] for partition in db.get_partitions()])
+
+if __name__ == '__main__':
+    unittest.main()
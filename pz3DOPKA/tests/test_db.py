@@ -0,0 +1,255 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_mgr import SecurityEventsDB, BulkInsertError
+from sec_manager import SecurityEventsManager
+
+EVENT_TYPES = [('Login Success', 'Informational'), ('Login Failed', 'Warning'),
+               ('Port Scan Detected', 'Warning'), ('Malware Alert', 'Critical')]
+LOGIN_FAILED = 2
+
+class DatabaseTestCase(unittest.TestCase):
+    """Тимчасова БД з початковими джерелами та типами подій"""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = datetime.now().replace(microsecond=0)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def create(self, name: str = 'events.db', **options) -> SecurityEventsDB:
+        """БД без випадкових тестових подій populate_initial_data"""
+        db = SecurityEventsDB(os.path.join(self.directory, name), populate=False, **options)
+        self.addCleanup(db.close)
+        for type_name, severity in EVENT_TYPES:
+            db.register_event_type(type_name, severity)
+        db.register_event_source('Firewall_A', '192.168.1.1', 'Firewall')
+        db.register_event_source('Web_Server_Logs', '192.168.1.10', 'Web Server')
+        return db
+
+class BulkInsertTestCase(DatabaseTestCase):
+    """Пакетний запис: пропуск хибних рядків і кількість зафіксованих подій при помилці"""
+    
+    def events(self, count: int, bad=()):
+        """count подій; з номерами з bad - рядки, які SQLite не може записати (NOT NULL, переповнення)"""
+        for index in range(count):
+            message, username = f'Failed password for user{index}', f'user{index}'
+            if index in bad:
+                if index % 2:
+                    message = None
+                else:
+                    username = 2 ** 70
+            yield (1, LOGIN_FAILED, message, f'10.0.0.{index % 5}', username, self.now - timedelta(seconds=index))
+    
+    def test_batches(self):
+        db = self.create()
+        observed = []
+        result = db.log_security_events_bulk(self.events(25), batch_size=10, on_inserted=observed.append)
+        self.assertEqual((result['inserted'], result['duplicates'], result['failed'], result['batches']), (25, 0, 0, 3))
+        self.assertEqual([len(rows) for rows in observed], [10, 10, 5])
+        self.assertEqual(db.get_event_counts()['total'], 25)
+    
+    def test_bad_rows_are_retried_one_by_one(self):
+        db = self.create()
+        observed = []
+        result = db.log_security_events_bulk(self.events(25, bad={3, 12}), batch_size=10,
+                                             on_inserted=observed.extend)
+        self.assertEqual((result['inserted'], result['failed'], result['batches']), (23, 2, 3))
+        self.assertEqual(len(result['errors']), 2)
+        # Решта рядків відхилених пакетів записана, і лише вони передані on_inserted
+        self.assertEqual(db.get_event_counts()['total'], 23)
+        self.assertEqual(sorted(row[4] for row in observed),
+                         sorted(f'user{index}' for index in range(25) if index not in (3, 12)))
+    
+    def test_error_reports_committed_events(self):
+        db = self.create()
+        
+        def broken():
+            yield from self.events(15)
+            raise OSError("помилка читання")
+        
+        with self.assertRaises(BulkInsertError) as context:
+            db.log_security_events_bulk(broken(), batch_size=10)
+        self.assertEqual(context.exception.inserted, 10)
+        self.assertEqual(db.get_event_counts()['total'], 10)
+    
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            self.create().log_security_events_bulk(self.events(1), batch_size=0)
+
+class PartitionTestCase(DatabaseTestCase):
+    """Секціонована БД: розподіл подій за секціями та видалення старих секцій"""
+    
+    START = datetime(2024, 3, 10, 12, 0, 0)
+    
+    def fill(self, db: SecurityEventsDB, days: int = 5, per_day: int = 10):
+        db.log_security_events_bulk(
+            (1, LOGIN_FAILED, f'Failed password for user{index} day{day}', '10.0.0.1', f'user{index}',
+             self.START - timedelta(days=day, minutes=index * 30))
+            for day in range(days) for index in range(per_day))
+    
+    def test_events_routed_by_day(self):
+        db = self.create(partitioning='day')
+        self.fill(db)
+        partitions = db.get_partitions()
+        # Події дня зсунуті назад до 4.5 годин від полудня - у межах того ж дня
+        self.assertEqual([partition['name'] for partition in partitions],
+                         [f'SecurityEvents_{self.START - timedelta(days=day):%Y%m%d}' for day in reversed(range(5))])
+        self.assertEqual([partition['events'] for partition in partitions], [10] * 5)
+        self.assertEqual(db.count_events_by_keyword('Failed password'), 50)
+        self.assertEqual(db.count_events_by_keyword('day3'), 10)
+    
+    def test_month_bounds(self):
+        db = self.create(partitioning='month')
+        self.assertEqual(db._partition_bounds(datetime(2023, 12, 31, 23, 59)),
+                         ('SecurityEvents_202312', datetime(2023, 12, 1), datetime(2024, 1, 1)))
+        self.assertEqual(db._partition_bounds(datetime(2024, 2, 29)),
+                         ('SecurityEvents_202402', datetime(2024, 2, 1), datetime(2024, 3, 1)))
+    
+    def test_drop_partitions_before(self):
+        db = self.create(partitioning='day')
+        self.fill(db)
+        # Секція дня cutoff містить і старші, і новіші події - лишається
+        cutoff = self.START - timedelta(days=2)
+        dropped = db.drop_partitions_before(cutoff)
+        self.assertEqual(dropped, [f'SecurityEvents_{self.START - timedelta(days=day):%Y%m%d}' for day in (4, 3)])
+        self.assertEqual(len(db.get_partitions()), 3)
+        self.assertEqual(db.count_events_by_keyword('Failed password'), 30)
+        self.assertEqual(db.get_event_counts()['total'], 30)
+        self.assertEqual(db.drop_partitions_before(cutoff), [])
+        
+        # Подія за видалений день знову створює його секцію
+        db.log_security_event(1, LOGIN_FAILED, 'Failed password for late', '10.0.0.2', 'late',
+                              self.START - timedelta(days=4))
+        self.assertEqual(len(db.get_partitions()), 4)
+        self.assertEqual(db.count_events_by_keyword('late'), 1)
+    
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            self.create().drop_partitions_before(self.START)
+        with self.assertRaises(ValueError):
+            self.create('year.db', partitioning='year')
+        with self.assertRaises(ValueError):
+            self.create('compact.db', partitioning='day', compact=True)
+
+class PagingTestCase(DatabaseTestCase):
+    """Сторінки page_*: limit, offset і загальна кількість без зайвого COUNT"""
+    
+    def setUp(self):
+        super().setUp()
+        self.db = self.create()
+        self.db.log_security_events_bulk(
+            (1, LOGIN_FAILED, f'Failed password for admin from 10.0.0.{index}', f'10.0.0.{index}', 'admin',
+             self.now - timedelta(minutes=index * 10)) for index in range(25))
+    
+    def test_pages_cover_all_rows(self):
+        rows, total = self.db.page_failed_logins_24h()
+        self.assertEqual((len(rows), total), (25, 25))
+        
+        pages = []
+        for offset in range(0, 25, 10):
+            page, total = self.db.page_failed_logins_24h(10, offset)
+            self.assertEqual(total, 25)
+            pages.extend(page)
+        self.assertEqual([row['ip_address'] for row in pages], [row['ip_address'] for row in rows])
+        # Найновіші події першими
+        self.assertEqual(pages[0]['ip_address'], '10.0.0.0')
+    
+    def test_page_past_the_end(self):
+        rows, total = self.db.page_events_by_keyword('admin', 10, 40)
+        self.assertEqual((rows, total), ([], 25))
+    
+    def test_keyword_and_ranked_pages(self):
+        rows, total = self.db.page_events_by_keyword('10.0.0.1', 5, 0)
+        # 10.0.0.1 та 10.0.0.10 ... 10.0.0.19
+        self.assertEqual((len(rows), total), (5, 11))
+        for order_by in ('rank', 'recent'):
+            rows, total = self.db.page_events_ranked('admin', 10, 20, order_by)
+            self.assertEqual((len(rows), total), (5, 25))
+    
+    def test_count_only_for_full_pages(self):
+        def count():
+            raise AssertionError("COUNT для неповної сторінки")
+        
+        self.assertEqual(SecurityEventsDB._page_total([{}] * 3, 10, 20, count), 23)
+        self.assertEqual(SecurityEventsDB._page_total([{}] * 3, None, 0, count), 3)
+        self.assertEqual(SecurityEventsDB._page_total([], 10, 0, count), 0)
+        self.assertEqual(SecurityEventsDB._page_total([{}] * 10, 10, 0, lambda: 42), 42)
+        self.assertEqual(SecurityEventsDB._page_total([], 10, 30, lambda: 25), 25)
+    
+    def test_manager_result_page(self):
+        manager = SecurityEventsManager(os.path.join(self.directory, 'events.db'))
+        self.addCleanup(manager.close)
+        page = manager.search_events_ranked('admin', limit=10, offset=10)
+        self.assertEqual((len(page), page.total, page.offset), (10, 25, 10))
+        page = manager.get_failed_logins_24h(limit=5)
+        self.assertEqual((len(page), page.total, page.offset), (5, 25, 0))
+
+class IdempotentImportTestCase(DatabaseTestCase):
+    """Ідемпотентний імпорт: повторний імпорт не дублює події, повтори нумеруються в межах файлу"""
+    
+    LINE = "2024-01-15 10:00:{second:02d} WARN: Failed password for root from 10.0.0.{host} port 22\n"
+    
+    def setUp(self):
+        super().setUp()
+        self.create()
+        self.manager = SecurityEventsManager(os.path.join(self.directory, 'events.db'))
+        self.addCleanup(self.manager.close)
+        # Менеджер заповнює порожню БД випадковими тестовими подіями
+        self.initial = self.manager.db.get_event_counts()['total']
+    
+    def write(self, name: str, lines) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        return path
+    
+    def lines(self, count: int):
+        return [self.LINE.format(second=index, host=index % 3) for index in range(count)]
+    
+    def total(self) -> int:
+        """Кількість імпортованих подій"""
+        return self.manager.db.get_event_counts()['total'] - self.initial
+    
+    def test_same_file_is_skipped(self):
+        path = self.write('auth.log', self.lines(20))
+        self.assertEqual(self.manager.import_logs_from_file(path, 'Firewall_A', idempotent=True), 20)
+        self.assertEqual(self.manager.import_logs_from_file(path, 'Firewall_A', idempotent=True), 0)
+        self.assertEqual(self.total(), 20)
+    
+    def test_appended_file_imports_only_new_lines(self):
+        self.manager.import_logs_from_file(self.write('auth.log', self.lines(20)), 'Firewall_A', idempotent=True)
+        rotated = self.write('auth.log.1', self.lines(30))
+        self.assertEqual(self.manager.import_logs_from_file(rotated, 'Firewall_A', batch_size=7, idempotent=True), 10)
+        self.assertEqual(self.total(), 30)
+    
+    def test_repeated_lines_within_file_are_kept(self):
+        # Однакові рядки в одному файлі - різні події (номер повтору входить у хеш)
+        repeated = self.lines(5) + self.lines(5)
+        path = self.write('auth.log', sorted(repeated))
+        self.assertEqual(self.manager.import_logs_from_file(path, 'Firewall_A', idempotent=True), 10)
+        copy = self.write('copy.log', sorted(repeated) + [self.LINE.format(second=59, host=9)])
+        self.assertEqual(self.manager.import_logs_from_file(copy, 'Firewall_A', idempotent=True), 1)
+    
+    def test_occurrences_numbered_per_file(self):
+        # Той самий рядок у двох файлах: номер повтору не залежить від злиття файлів
+        first = self.write('first.log', self.lines(5) + [self.LINE.format(second=4, host=1)])
+        second = self.write('second.log', self.lines(5))
+        self.assertEqual(self.manager.import_logs_from_multiple_files([first, second], 'Firewall_A',
+                                                                      workers=2, idempotent=True), 6)
+        # Окремий повторний імпорт копій файлів нічого не додає
+        for name, path in (('first_copy.log', first), ('second_copy.log', second)):
+            with open(path, encoding='utf-8') as file:
+                copy = self.write(name, file.readlines() + ["\n"])
+            self.assertEqual(self.manager.import_logs_from_file(copy, 'Firewall_A', idempotent=True), 0)
+        self.assertEqual(self.total(), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detectors import BruteForceDetector
+from log_manager import ParsedLogEntry
+from sec_manager import SecurityEventsManager
+
+START = datetime(2024, 1, 15, 10, 0, 0)
+
+class BruteForceDetectorTestCase(unittest.TestCase):
+    """Ковзне вікно детектора: кільцевий буфер спроб, повторні сповіщення та витіснення IP"""
+    
+    def observe(self, detector: BruteForceDetector, ip_address: str, minutes):
+        """Спроби ip_address через задані хвилини від START; повертає сповіщення"""
+        alerts = []
+        for minute in minutes:
+            alert = detector.observe(ip_address, START + timedelta(minutes=minute))
+            if alert:
+                alerts.append(alert)
+        return alerts
+    
+    def test_alert_above_threshold_within_window(self):
+        detector = BruteForceDetector(threshold=5)
+        self.assertEqual(self.observe(detector, '10.0.0.1', range(5)), [])
+        
+        alerts = self.observe(detector, '10.0.0.1', [5])
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].failed_attempts, 6)
+        self.assertEqual(alerts[0].first_attempt, START)
+        self.assertEqual(alerts[0].last_attempt, START + timedelta(minutes=5))
+        self.assertEqual(detector.alerts_emitted, 1)
+    
+    def test_attempts_outside_window_do_not_count(self):
+        # Шість спроб, але між першою і шостою більше години
+        detector = BruteForceDetector(threshold=5)
+        self.assertEqual(self.observe(detector, '10.0.0.1', [0, 20, 40, 50, 55, 61]), [])
+        # Перша спроба витіснена з буфера - наступна вже в межах вікна від другої
+        alerts = self.observe(detector, '10.0.0.1', [62])
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].first_attempt, START + timedelta(minutes=20))
+    
+    def test_ring_buffer_keeps_threshold_plus_one(self):
+        detector = BruteForceDetector(threshold=3)
+        self.observe(detector, '10.0.0.1', range(50))
+        state = detector._states['10.0.0.1']
+        self.assertEqual(state.attempts.maxlen, 4)
+        self.assertEqual(list(state.attempts), [START + timedelta(minutes=minute) for minute in range(46, 50)])
+    
+    def test_one_alert_per_window(self):
+        detector = BruteForceDetector(threshold=2)
+        alerts = self.observe(detector, '10.0.0.1', range(0, 130, 5))
+        self.assertEqual([alert.last_attempt for alert in alerts],
+                         [START + timedelta(minutes=10), START + timedelta(minutes=75)])
+    
+    def test_idle_ips_are_evicted(self):
+        detector = BruteForceDetector(threshold=5)
+        self.observe(detector, '10.0.0.1', [0])
+        self.observe(detector, '10.0.0.2', [30])
+        self.assertEqual(detector.tracked_ips(), 2)
+        
+        # Через 90 хвилин від START перша адреса неактивна довше за вікно
+        self.observe(detector, '10.0.0.3', [90])
+        self.assertEqual(detector.tracked_ips(), 2)
+        self.assertNotIn('10.0.0.1', detector._states)
+        self.assertEqual(detector.evicted_ips, 1)
+    
+    def test_least_recently_active_ips_are_evicted_over_limit(self):
+        detector = BruteForceDetector(threshold=5, max_tracked_ips=3)
+        for index in range(3):
+            self.observe(detector, f'10.0.0.{index}', [index])
+        # Нова спроба з першої адреси робить її найнедавніше активною
+        self.observe(detector, '10.0.0.0', [3])
+        self.observe(detector, '10.0.0.9', [4])
+        self.assertEqual(detector.tracked_ips(), 3)
+        self.assertEqual(list(detector._states), ['10.0.0.2', '10.0.0.0', '10.0.0.9'])
+    
+    def test_active_attackers(self):
+        detector = BruteForceDetector(threshold=2)
+        self.observe(detector, '10.0.0.1', [0, 1, 2])
+        self.observe(detector, '10.0.0.2', [0, 1])
+        attackers = detector.active_attackers(START + timedelta(minutes=30))
+        self.assertEqual([alert.ip_address for alert in attackers], ['10.0.0.1'])
+        self.assertEqual(detector.active_attackers(START + timedelta(hours=2)), [])
+    
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            BruteForceDetector(threshold=0)
+        with self.assertRaises(ValueError):
+            BruteForceDetector(max_tracked_ips=0)
+
+class ManagerDetectionTestCase(unittest.TestCase):
+    """Детектор менеджера бачить події з усіх шляхів запису"""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = SecurityEventsManager(os.path.join(self.directory, 'events.db'))
+        self.addCleanup(self.manager.close)
+        self.failed_type_id = self.manager.catalog.event_types_by_name()['Login Failed']['id']
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_single_events_are_observed(self):
+        for minute in range(6):
+            self.manager.log_security_event(1, self.failed_type_id, 'Failed password for root', '10.0.0.1', 'root',
+                                            START + timedelta(minutes=minute))
+        self.assertEqual(self.manager.brute_force_detector.alerts_emitted, 1)
+    
+    def test_duplicates_are_not_observed(self):
+        source = self.manager.catalog.source_by_id(1)
+        entries = [ParsedLogEntry(START + timedelta(minutes=minute), f'Failed password for root #{minute}',
+                                  '10.0.0.1', 'root', 'Login Failed', source_file='auth.log') for minute in range(3)]
+        self.assertEqual(self.manager.ingest_entries(entries, source, dedup=True)['inserted'], 3)
+        self.assertEqual(self.manager.ingest_entries(entries, source, dedup=True)['duplicates'], 3)
+        self.assertEqual(len(self.manager.brute_force_detector._states['10.0.0.1'].attempts), 3)
+
+if __name__ == '__main__':
+    unittest.main()
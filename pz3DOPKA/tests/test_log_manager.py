@@ -0,0 +1,107 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_manager
+from log_manager import LogParser, split_file_chunks
+
+START = datetime(2024, 1, 15, 10, 0, 0)
+
+def log_lines(count: int, offset: int, step: int = 3):
+    """count рядків з часом START + offset + i * step секунд (упорядковані за часом)"""
+    return [f"{START + timedelta(seconds=offset + index * step):%Y-%m-%d %H:%M:%S} WARN: "
+            f"Failed password for root from 10.0.{index % 7}.{offset} port 22\n" for index in range(count)]
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Пул потоків, що рахує найбільшу кількість шматків, надісланих, але ще не взятих споживачем"""
+    
+    def __init__(self, queue_holder):
+        super().__init__(max_workers=2)
+        self.queue_holder = queue_holder
+        self.max_pending = 0
+    
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        self.max_pending = max(self.max_pending, self.queue_holder[0].pending + 1)
+        return future
+
+class ParseMultipleTestCase(unittest.TestCase):
+    """Потокове злиття кількох файлів, пропуск файлів з помилками та обмежене вікно шматків"""
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.parser = LogParser()
+        self.paths = [self.write(f'part{index}.log', log_lines(400, index)) for index in range(3)]
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def write(self, name: str, lines) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        return path
+    
+    def test_merge_is_lazy_and_sorted(self):
+        entries = self.parser.parse_multiple_log_files(self.paths)
+        self.assertFalse(isinstance(entries, list))
+        timestamps = [entry.timestamp for entry in entries]
+        self.assertEqual(len(timestamps), 1200)
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(self.parser.skipped_files, [])
+    
+    def test_unreadable_files_are_skipped(self):
+        missing = os.path.join(self.directory, 'missing.log')
+        unreadable = os.path.join(self.directory, 'directory.log')
+        os.mkdir(unreadable)
+        entries = list(self.parser.parse_multiple_log_files([self.paths[0], unreadable, missing, self.paths[1]]))
+        self.assertEqual(len(entries), 800)
+        self.assertEqual(sorted(self.parser.skipped_files), sorted([unreadable, missing]))
+    
+    def test_per_file_formats(self):
+        # Другий файл має інший формат дати, ніж активний формат парсера
+        other = self.write('other.log', [f"{START + timedelta(seconds=index * 5):%d/%m/%Y %H:%M:%S} ERROR: "
+                                         f"Authentication failed for username=admin\n" for index in range(100)])
+        self.parser.set_format('%Y-%m-%d %H:%M:%S')
+        entries = list(self.parser.parse_multiple_log_files(
+            [self.paths[0], other], formats={other: '%d/%m/%Y %H:%M:%S'}))
+        self.assertEqual(len(entries), 500)
+        self.assertTrue(all(entry.timestamp.year == 2024 for entry in entries))
+        self.assertEqual(self.parser.active_format, '%Y-%m-%d %H:%M:%S')
+    
+    def test_format_matches(self):
+        other = self.write('other.log', ["\n", f"{START:%d/%m/%Y %H:%M:%S} ERROR: Authentication failed\n"])
+        self.assertTrue(self.parser.format_matches(self.paths[0], '%Y-%m-%d %H:%M:%S'))
+        self.assertFalse(self.parser.format_matches(other, '%Y-%m-%d %H:%M:%S'))
+        self.assertTrue(self.parser.format_matches(other, '%d/%m/%Y %H:%M:%S'))
+        self.assertFalse(self.parser.format_matches(self.paths[0], '%unknown'))
+    
+    def test_chunk_window(self):
+        log_manager._init_parse_worker(self.parser)
+        queue_holder = []
+        with CountingExecutor(queue_holder) as executor:
+            queue = log_manager._ChunkQueue(executor, window=2)
+            queue_holder.append(queue)
+            chunks = split_file_chunks(self.paths[0], 1024)
+            self.assertGreater(len(chunks), 10)
+            entries = list(queue.entries(self.paths[0], chunks, None))
+        self.assertEqual([entry.message for entry in entries],
+                         [line.strip() for line in log_lines(400, 0)])
+        self.assertLessEqual(executor.max_pending, 2)
+        self.assertEqual(queue.pending, 0)
+    
+    def test_parallel_matches_serial(self):
+        serial = [(entry.timestamp, entry.message) for entry in self.parser.parse_multiple_log_files(self.paths)]
+        parallel = [(entry.timestamp, entry.message)
+                    for entry in self.parser.parse_multiple_log_files(self.paths, workers=2, chunk_size=4096)]
+        self.assertEqual(sorted(parallel), sorted(serial))
+        self.assertEqual([timestamp for timestamp, _ in parallel], [timestamp for timestamp, _ in serial])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import os
+import sys
+import random
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sketches import SpaceSaving, HyperLogLog, HLL_PRECISION
+
+def zipf_stream(length: int, items: int, seed: int):
+    """Відтворюваний потік з розподілом Ціпфа: кілька частих елементів і довгий хвіст"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, items + 1)]
+    return rng.choices([f'10.0.{index // 256}.{index % 256}' for index in range(items)], weights, k=length)
+
+class SpaceSavingTestCase(unittest.TestCase):
+    """Space-Saving: точність оцінок та об'єднання підсумків"""
+    
+    def assertGuarantees(self, summary: SpaceSaving, truth: Counter):
+        """Гарантії Space-Saving для підсумку потоку з частотами truth"""
+        total = sum(truth.values())
+        self.assertEqual(summary.total, total)
+        bound = total / summary.capacity
+        for item, count, error in summary.rows():
+            self.assertLessEqual(count - error, truth[item], item)
+            self.assertLessEqual(truth[item], count, item)
+            self.assertLessEqual(error, bound, item)
+        for item, frequency in truth.items():
+            if frequency > bound:
+                self.assertIn(item, summary.counts)
+            else:
+                self.assertLessEqual(frequency, max(summary.counts.get(item, 0), summary.floor))
+    
+    def test_exact_below_capacity(self):
+        stream = zipf_stream(5000, 50, seed=1)
+        summary = SpaceSaving(capacity=100)
+        for item in stream:
+            summary.add(item)
+        truth = Counter(stream)
+        self.assertEqual(summary.counts, dict(truth))
+        self.assertTrue(all(error == 0 for error in summary.errors.values()))
+        self.assertEqual(summary.floor, 0)
+        self.assertEqual([(item, count) for item, count, _ in summary.top(5)], truth.most_common(5))
+    
+    def test_guarantees_over_capacity(self):
+        stream = zipf_stream(50000, 5000, seed=2)
+        summary = SpaceSaving(capacity=200)
+        for item in stream:
+            summary.add(item)
+        truth = Counter(stream)
+        self.assertEqual(len(summary), 200)
+        self.assertGuarantees(summary, truth)
+        
+        # Найчастіші елементи потоку Ціпфа оцінюються впевнено
+        top = [item for item, _, _ in summary.top(3)]
+        self.assertEqual(set(top), {item for item, _ in truth.most_common(3)})
+    
+    def test_weighted_add(self):
+        summary = SpaceSaving(capacity=2)
+        summary.add('a', 5)
+        summary.add('b', 3)
+        summary.add('c', 2)
+        truth = Counter({'a': 5, 'b': 3, 'c': 2})
+        self.assertGuarantees(summary, truth)
+        self.assertEqual(summary.top(1), [('a', 5, 0)])
+        self.assertEqual(summary.counts['c'], 5)
+        self.assertEqual(summary.errors['c'], 3)
+    
+    def test_merge(self):
+        streams = [zipf_stream(20000, 3000, seed=seed) for seed in (3, 4, 5)]
+        summaries = []
+        for stream in streams:
+            summary = SpaceSaving(capacity=150)
+            for item in stream:
+                summary.add(item)
+            summaries.append(summary)
+        
+        merged = SpaceSaving.merge(summaries, capacity=150)
+        truth = Counter()
+        for stream in streams:
+            truth.update(stream)
+        self.assertLessEqual(len(merged), 150)
+        self.assertGuarantees(merged, truth)
+    
+    def test_merge_below_capacity_is_exact(self):
+        first, second = SpaceSaving(10), SpaceSaving(10)
+        for item in 'aab':
+            first.add(item)
+        for item in 'bbc':
+            second.add(item)
+        merged = SpaceSaving.merge([first, second], capacity=10)
+        self.assertEqual(merged.counts, {'a': 2, 'b': 3, 'c': 1})
+        self.assertEqual(merged.total, 6)
+        self.assertEqual(merged.floor, 0)
+    
+    def test_merge_is_repeatable(self):
+        # Годинні вікна зливаються знову при кожному запиті та при дозаписі тієї ж години
+        streams = [zipf_stream(10000, 2000, seed=seed) for seed in (6, 7, 8, 9)]
+        summaries = []
+        for stream in streams:
+            summary = SpaceSaving(capacity=100)
+            for item in stream:
+                summary.add(item)
+            summaries.append(summary)
+        
+        nested = SpaceSaving.merge([SpaceSaving.merge(summaries[:2], 100), SpaceSaving.merge(summaries[2:], 100)], 100)
+        truth = Counter()
+        for stream in streams:
+            truth.update(stream)
+        self.assertGuarantees(nested, truth)
+    
+    def test_from_rows_round_trip(self):
+        stream = zipf_stream(20000, 3000, seed=10)
+        summary = SpaceSaving(capacity=100)
+        for item in stream[:10000]:
+            summary.add(item)
+        restored = SpaceSaving.from_rows(summary.rows(), summary.total, summary.floor, capacity=100)
+        self.assertEqual(restored.counts, summary.counts)
+        self.assertEqual(restored.errors, summary.errors)
+        self.assertEqual(restored.floor, summary.floor)
+        
+        # Відновлений підсумок продовжує рахувати з тими ж гарантіями
+        for item in stream[10000:]:
+            restored.add(item)
+        self.assertGuarantees(restored, Counter(stream))
+    
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            SpaceSaving(capacity=0)
+
+def addresses(start: int, count: int):
+    """count різних IP-адрес, починаючи з номера start"""
+    return [f'{index >> 24}.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}'
+            for index in range(start, start + count)]
+
+class HyperLogLogTestCase(unittest.TestCase):
+    """HyperLogLog: точність оцінки, об'єднання та збереження регістрів"""
+    
+    def build(self, items, precision: int = HLL_PRECISION) -> HyperLogLog:
+        summary = HyperLogLog(precision)
+        for item in items:
+            summary.add(item)
+        return summary
+    
+    def assertWithinError(self, summary: HyperLogLog, expected: int, sigmas: float = 3.0):
+        """Оцінка в межах sigmas стандартних похибок (для фіксованого хешу результат відтворюваний)"""
+        self.assertLessEqual(abs(summary.estimate() - expected), sigmas * summary.standard_error * expected,
+                             f"оцінка {summary.estimate()}, очікувалось {expected}")
+    
+    def test_empty(self):
+        self.assertEqual(HyperLogLog().estimate(), 0)
+    
+    def test_small_cardinality(self):
+        # Linear counting: для малої кількості елементів оцінка майже точна
+        for count in (1, 10, 100):
+            summary = self.build(addresses(0, count))
+            self.assertLessEqual(abs(summary.estimate() - count), max(1, count // 50), count)
+    
+    def test_accuracy(self):
+        for count in (5000, 20000, 100000):
+            self.assertWithinError(self.build(addresses(count, count)), count)
+    
+    def test_lower_precision(self):
+        summary = self.build(addresses(0, 20000), precision=8)
+        self.assertAlmostEqual(summary.standard_error, 1.04 / 16)
+        self.assertWithinError(summary, 20000)
+    
+    def test_duplicates_do_not_change_estimate(self):
+        items = addresses(0, 3000)
+        once = self.build(items)
+        repeated = self.build(items * 3 + list(reversed(items)))
+        self.assertEqual(once.registers, repeated.registers)
+    
+    def test_merge_equals_union(self):
+        # Перекриття між вікнами (ті самі IP у сусідні години) не рахується двічі
+        windows = [addresses(start, 8000) for start in (0, 5000, 10000, 40000)]
+        union = self.build(item for window in windows for item in window)
+        merged = HyperLogLog.merge([self.build(window) for window in windows])
+        self.assertEqual(merged.registers, union.registers)
+        self.assertWithinError(merged, 26000)
+    
+    def test_merge_of_none_and_one(self):
+        self.assertEqual(HyperLogLog.merge([]).estimate(), 0)
+        single = self.build(addresses(0, 500))
+        self.assertEqual(HyperLogLog.merge([single]).registers, single.registers)
+    
+    def test_update(self):
+        first = self.build(addresses(0, 4000))
+        second = self.build(addresses(2000, 4000))
+        first.update(second)
+        self.assertEqual(first.registers, self.build(addresses(0, 6000)).registers)
+    
+    def test_precision_mismatch(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog.merge([HyperLogLog(10), HyperLogLog(12)])
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).update(HyperLogLog(10))
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(17)
+    
+    def test_bytes_round_trip(self):
+        summary = self.build(addresses(0, 10000))
+        restored = HyperLogLog.from_bytes(summary.to_bytes())
+        self.assertEqual(restored.precision, summary.precision)
+        self.assertEqual(restored.registers, summary.registers)
+        self.assertEqual(restored.estimate(), summary.estimate())
+        
+        small = HyperLogLog.from_bytes(self.build(addresses(0, 100), precision=6).to_bytes())
+        self.assertEqual(small.precision, 6)
+
+if __name__ == '__main__':
+    unittest.main()